@@ -1,12 +1,45 @@
+import dataclasses
 import os.path
 import pickle
+import sys
 from typing import Optional
-from pip._internal.utils.appdirs import user_cache_dir
 
 from datasail.reader.utils import DataSet
 from datasail.settings import KW_CACHE_DIR
 
 
+def get_cache_dir(**kwargs) -> str:
+    """
+    Get the directory to store cached data in.
+
+    Args:
+        **kwargs: Arguments to the program regarding caching
+
+    Returns:
+        The cache directory given by the user or the default cache directory of DataSAIL
+    """
+    return kwargs.get(KW_CACHE_DIR) or user_cache_dir("DataSAIL")
+
+
+def user_cache_dir(app_name: str) -> str:
+    """
+    Get the platform-specific directory for user-specific cache data of an application. This follows the same
+    conventions as pip, which has been used to determine the directory before, without importing pip.
+
+    Args:
+        app_name: Name of the application
+
+    Returns:
+        Path to the cache directory of the application
+    """
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(os.path.join("~", "AppData", "Local"))
+        return os.path.join(base, app_name, "Cache")
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~/Library/Caches"), app_name)
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), app_name)
+
+
 def load_from_cache(dataset: DataSet, **kwargs) -> Optional[DataSet]:
     """
     Load a dataset from cache.
@@ -20,9 +53,12 @@ def load_from_cache(dataset: DataSet, **kwargs) -> Optional[DataSet]:
     """
     if kwargs.get("cache", False):
         name = f"{hex(hash(dataset))[2:34]}.pkl"
-        cache_dir = kwargs.get(KW_CACHE_DIR, user_cache_dir("DataSAIL"))
+        cache_dir = get_cache_dir(**kwargs)
         if os.path.isfile(os.path.join(cache_dir, name)):
-            return pickle.load(open(os.path.join(cache_dir, name), "rb"))
+            # the payloads are not cached, they are taken from the dataset at hand
+            cached = pickle.load(open(os.path.join(cache_dir, name), "rb"))
+            cached.data, cached.molecules = dataset.data, dataset.molecules
+            return cached
 
 
 def store_to_cache(dataset: DataSet, **kwargs) -> None:
@@ -35,6 +71,6 @@ def store_to_cache(dataset: DataSet, **kwargs) -> None:
     """
     if kwargs.get("cache", False):
         name = f"{hex(hash(dataset))[2:34]}.pkl"
-        cache_dir = kwargs.get(KW_CACHE_DIR, user_cache_dir("DataSAIL"))
+        cache_dir = get_cache_dir(**kwargs)
         os.makedirs(cache_dir, exist_ok=True)
-        pickle.dump(dataset, open(os.path.join(cache_dir, name), "wb"))
+        pickle.dump(dataclasses.replace(dataset, data=None, molecules=None), open(os.path.join(cache_dir, name), "wb"))
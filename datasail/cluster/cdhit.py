@@ -5,7 +5,7 @@ from typing import Tuple, List, Dict, Optional
 import numpy as np
 
 from datasail.cluster.utils import cluster_param_binary_search, extract_fasta
-from datasail.parsers import MultiYAMLParser
+from datasail.parsers import get_yaml_parser
 from datasail.reader.utils import DataSet
 from datasail.settings import LOGGER, CDHIT, INSTALLED, CDHIT_EST
 
@@ -13,7 +13,8 @@ from datasail.settings import LOGGER, CDHIT, INSTALLED, CDHIT_EST
 def run_cdhit(
         dataset: DataSet,
         threads: int = 1,
-        log_dir: Optional[str] = None
+        log_dir: Optional[str] = None,
+        cache_dir: Optional[str] = None,
 ) -> Tuple[List[str], Dict[str, str], np.ndarray]:
     """
     Run the CD-HIT tool for protein input.
@@ -21,6 +22,7 @@ def run_cdhit(
     Args:
         dataset: DataSet holding all information on the dta to be clustered
         log_dir: Absolute path to the directory to store all the logs in
+        cache_dir: Directory to store the exported FASTA file in, a temporary directory is used if None
         threads: number of threads to use for one CD-HIT run
 
     Returns:
@@ -32,9 +34,9 @@ def run_cdhit(
     if not INSTALLED[CDHIT]:
         raise ValueError("CD-HIT is not installed.")
 
-    user_args = MultiYAMLParser(CDHIT).get_user_arguments(dataset.args, ["c", "n"])
+    user_args = get_yaml_parser(CDHIT).get_user_arguments(dataset.args, ["c", "n"])
     vals = (dataset.args.c, dataset.args.n)
-    extract_fasta(dataset)
+    extract_fasta(dataset, cache_dir)
 
     return cluster_param_binary_search(
         dataset,
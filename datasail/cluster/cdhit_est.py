@@ -5,7 +5,7 @@ from typing import Tuple, List, Dict, Optional
 import numpy as np
 
 from datasail.cluster.utils import cluster_param_binary_search, extract_fasta
-from datasail.parsers import MultiYAMLParser
+from datasail.parsers import get_yaml_parser
 from datasail.reader.utils import DataSet
 from datasail.settings import LOGGER, INSTALLED, CDHIT_EST, CDHIT
 
@@ -13,7 +13,8 @@ from datasail.settings import LOGGER, INSTALLED, CDHIT_EST, CDHIT
 def run_cdhit_est(
         dataset: DataSet,
         threads: int = 1,
-        log_dir: Optional[str] = None
+        log_dir: Optional[str] = None,
+        cache_dir: Optional[str] = None,
 ) -> Tuple[List[str], Dict[str, str], np.ndarray]:
     """
     Run the CD-HIT-EST tool for DNA or RNA input.
@@ -21,6 +22,7 @@ def run_cdhit_est(
     Args:
         dataset: DataSet holding all information on the dta to be clustered
         log_dir: Absolute path to the directory to store all the logs in
+        cache_dir: Directory to store the exported FASTA file in, a temporary directory is used if None
         threads: number of threads to use for one CD-HIT-EST run
 
     Returns:
@@ -32,9 +34,9 @@ def run_cdhit_est(
     if not INSTALLED[CDHIT_EST]:
         raise ValueError("CD-HIT-EST is not installed.")
 
-    user_args = MultiYAMLParser(CDHIT_EST).get_user_arguments(dataset.args, ["c", "n"])
+    user_args = get_yaml_parser(CDHIT_EST).get_user_arguments(dataset.args, ["c", "n"])
     vals = (dataset.args.c, dataset.args.n)
-    extract_fasta(dataset)
+    extract_fasta(dataset, cache_dir)
 
     return cluster_param_binary_search(
         dataset,
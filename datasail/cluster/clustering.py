@@ -3,20 +3,13 @@ import os
 from typing import Dict, Tuple, List, Union, Optional
 
 import numpy as np
-from sklearn.cluster import AffinityPropagation, AgglomerativeClustering, SpectralClustering
-
-from datasail.cluster.caching import load_from_cache, store_to_cache
-from datasail.cluster.cdhit import run_cdhit
-from datasail.cluster.cdhit_est import run_cdhit_est
-from datasail.cluster.ecfp import run_ecfp
-from datasail.cluster.foldseek import run_foldseek
-from datasail.cluster.mash import run_mash
-from datasail.cluster.mmseqs2 import run_mmseqs
+from scipy import sparse
+
+from datasail.cluster.caching import load_from_cache, store_to_cache, get_cache_dir
 from datasail.cluster.utils import heatmap
-from datasail.cluster.wlk import run_wlk
-from datasail.reader.utils import DataSet
+from datasail.reader.utils import DataSet, InteractionTable, is_matrix
 from datasail.report import whatever
-from datasail.settings import LOGGER, KW_THREADS, KW_LOGDIR, KW_OUTDIR, MAX_CLUSTERS, N_CLUSTERS
+from datasail.settings import LOGGER, KW_THREADS, KW_LOGDIR, KW_OUTDIR, KW_CACHE, MAX_CLUSTERS, N_CLUSTERS
 
 
 def cluster(dataset: DataSet, **kwargs) -> DataSet:
@@ -36,14 +29,15 @@ def cluster(dataset: DataSet, **kwargs) -> DataSet:
 
     if isinstance(dataset.similarity, str):  # compute the similarity
         dataset.cluster_names, dataset.cluster_map, dataset.cluster_similarity, dataset.cluster_weights = \
-            similarity_clustering(dataset, kwargs[KW_THREADS], kwargs[KW_LOGDIR])
+            similarity_clustering(dataset, kwargs[KW_THREADS], kwargs[KW_LOGDIR],
+                                  get_cache_dir(**kwargs) if kwargs.get(KW_CACHE, False) else None)
 
     elif isinstance(dataset.distance, str):  # compute the distance
         dataset.cluster_names, dataset.cluster_map, dataset.cluster_distance, dataset.cluster_weights = \
             distance_clustering(dataset, kwargs[KW_THREADS], kwargs[KW_LOGDIR])
 
     # if the similarity/distance is already given, store it
-    elif isinstance(dataset.similarity, np.ndarray) or isinstance(dataset.distance, np.ndarray):
+    elif is_matrix(dataset.similarity) or is_matrix(dataset.distance):
         dataset.cluster_names = dataset.names
         dataset.cluster_map = dict([(d, d) for d in dataset.names])
         dataset.cluster_similarity = dataset.similarity
@@ -54,8 +48,7 @@ def cluster(dataset: DataSet, **kwargs) -> DataSet:
         return dataset
 
     # if there are too many clusters, reduce their number based on some cluster algorithms.
-    if any(isinstance(m, np.ndarray) for m in
-           [dataset.similarity, dataset.cluster_similarity, dataset.cluster_distance]):
+    if any(is_matrix(m) for m in [dataset.similarity, dataset.cluster_similarity, dataset.cluster_distance]):
         num_old_cluster = len(dataset.cluster_names) + 1
         while MAX_CLUSTERS < len(dataset.cluster_names) < num_old_cluster:
             num_old_cluster = len(dataset.cluster_names)
@@ -79,7 +72,8 @@ def cluster(dataset: DataSet, **kwargs) -> DataSet:
 def similarity_clustering(
         dataset: DataSet,
         threads: int = 1,
-        log_dir: Optional[str] = None
+        log_dir: Optional[str] = None,
+        cache_dir: Optional[str] = None,
 ) -> Tuple[List[str], Dict[str, str], np.ndarray, Dict[str, float]]:
     """
     Compute the similarity based cluster based on a cluster method.
@@ -88,6 +82,7 @@ def similarity_clustering(
         dataset: Mapping from molecule names to molecule description (fasta, PDB, SMILES, ...)
         threads: number of threads to use for one CD-HIT run
         log_dir: Absolute path to the directory to store all the logs in
+        cache_dir: Directory to cache intermediate results such as parsed structures in, None to not cache them
 
     Returns:
         A tuple consisting of
@@ -97,18 +92,25 @@ def similarity_clustering(
           - Symmetric matrix of pairwise similarities between the current clusters
           - Mapping from current clusters to their weights
     """
+    # the algorithms are imported on demand as some of them depend on heavy packages such as RDKit or GraKeL
     if dataset.similarity.lower() == "wlk":
-        cluster_names, cluster_map, cluster_sim = run_wlk(dataset)
+        from datasail.cluster.wlk import run_wlk
+        cluster_names, cluster_map, cluster_sim = run_wlk(dataset, cache_dir=cache_dir)
     elif dataset.similarity.lower() == "mmseqs":
-        cluster_names, cluster_map, cluster_sim = run_mmseqs(dataset, threads, log_dir)
+        from datasail.cluster.mmseqs2 import run_mmseqs
+        cluster_names, cluster_map, cluster_sim = run_mmseqs(dataset, threads, log_dir, cache_dir)
     elif dataset.similarity.lower() == "foldseek":
+        from datasail.cluster.foldseek import run_foldseek
         cluster_names, cluster_map, cluster_sim = run_foldseek(dataset, threads, log_dir)
     elif dataset.similarity.lower() == "cdhit":
-        cluster_names, cluster_map, cluster_sim = run_cdhit(dataset, threads, log_dir)
+        from datasail.cluster.cdhit import run_cdhit
+        cluster_names, cluster_map, cluster_sim = run_cdhit(dataset, threads, log_dir, cache_dir)
     elif dataset.similarity.lower() == "cdhit_est":
-        cluster_names, cluster_map, cluster_sim = run_cdhit_est(dataset, threads, log_dir)
+        from datasail.cluster.cdhit_est import run_cdhit_est
+        cluster_names, cluster_map, cluster_sim = run_cdhit_est(dataset, threads, log_dir, cache_dir)
     elif dataset.similarity.lower() == "ecfp":
-        cluster_names, cluster_map, cluster_sim = run_ecfp(dataset)
+        from datasail.cluster.ecfp import run_ecfp
+        cluster_names, cluster_map, cluster_sim = run_ecfp(dataset, threads, cache_dir)
     else:
         raise ValueError(f"Unknown cluster method: {dataset.similarity}")
 
@@ -145,6 +147,7 @@ def distance_clustering(
           - Mapping from current clusters to their weights
     """
     if dataset.distance.lower() == "mash":
+        from datasail.cluster.mash import run_mash
         cluster_names, cluster_map, cluster_dist = run_mash(dataset, threads, log_dir)
     else:
         raise ValueError(f"Unknown cluster method: {dataset.distance}")
@@ -173,7 +176,7 @@ def stable_additional_clustering(dataset: DataSet, min_num_clusters: int = 10) -
         The dataset with updated clusters
     """
     # make a deep copy of the data as we might need to cluster this dataset multiple times as it is modified in add_c.
-    ds = copy.deepcopy(dataset)
+    ds = copy_dataset(dataset)
 
     if dataset.cluster_similarity is not None:  # stabilize affinity propagation
         # define lower, current, and upper value for damping value
@@ -186,7 +189,7 @@ def stable_additional_clustering(dataset: DataSet, min_num_clusters: int = 10) -
         while not conv:
             curr_d = (min_d + max_d) / 2
             min_d = curr_d
-            ds = copy.deepcopy(dataset)
+            ds = copy_dataset(dataset)
             ds, conv = additional_clustering(ds, damping=curr_d)
         return ds
     else:
@@ -198,11 +201,25 @@ def stable_additional_clustering(dataset: DataSet, min_num_clusters: int = 10) -
             else:
                 min_f = curr_f
             curr_f = (min_f + max_f) / 2
-            ds = copy.deepcopy(dataset)
+            ds = copy_dataset(dataset)
             ds, _ = additional_clustering(ds, dist_factor=min_f)
         return ds
 
 
+def copy_dataset(dataset: DataSet) -> DataSet:
+    """
+    Copy a dataset to cluster it again. Clustering does not modify the payloads of the entities, so they are shared
+    with the copy instead of duplicating sequences, SMILES strings, or file indices.
+
+    Args:
+        dataset: Dataset to copy
+
+    Returns:
+        A deep copy of the dataset sharing the payloads with the original one
+    """
+    return copy.deepcopy(dataset, {id(dataset.data): dataset.data})
+
+
 def additional_clustering(
         dataset: DataSet,
         damping: float = 0.5,
@@ -224,11 +241,17 @@ def additional_clustering(
     Returns:
         The dataset with updated clusters and a bool flag indicating convergence of the used clustering algorithm
     """
+    from sklearn.cluster import AgglomerativeClustering, SpectralClustering
+
     LOGGER.info(f"Cluster {len(dataset.cluster_names)} items based on "
                 f"{'similarities' if dataset.cluster_similarity is not None else 'distances'}")
     # set up the cluster algorithm for similarity or distance based cluster w/o specifying the number of clusters
     if dataset.cluster_similarity is not None:
-        cluster_matrix = np.array(dataset.cluster_similarity, dtype=float)
+        # sparse affinities are passed on as they are, spectral clustering does not need them densified
+        if sparse.issparse(dataset.cluster_similarity):
+            cluster_matrix = dataset.cluster_similarity.tocsr().astype(float)
+        else:
+            cluster_matrix = np.array(dataset.cluster_similarity, dtype=float)
         # ca = AffinityPropagation(
         #     affinity='precomputed',
         #     random_state=42,
@@ -265,7 +288,7 @@ def additional_clustering(
 def labels2clusters(
         labels: Union[List, np.ndarray],
         dataset: DataSet,
-        cluster_matrix: np.ndarray,
+        cluster_matrix: Union[np.ndarray, sparse.csr_matrix],
         converged: bool
 ) -> Tuple[DataSet, bool]:
     """
@@ -275,7 +298,7 @@ def labels2clusters(
     Args:
         labels: List of labels
         dataset: The dataset that is clustered
-        cluster_matrix: Matrix storing distance or similarity values
+        cluster_matrix: Dense or sparse matrix storing distance or similarity values
         converged: a boolean to forward whether the clustering converged
 
     Returns:
@@ -283,21 +306,25 @@ def labels2clusters(
     """
     # extract the names of the new clusters and compute a mapping from the element names to the clusters
     old_cluster_map = dict((y, x) for x, y in enumerate(dataset.cluster_names))
-    new_cluster_names = list(np.unique(labels))
+    new_cluster_names, label_index = np.unique(labels, return_inverse=True)
+    new_cluster_names = list(new_cluster_names)
     new_cluster_map = dict((n, labels[old_cluster_map[c]]) for n, c in dataset.cluster_map.items())
 
-    # compute the distance or similarity matrix for the new clusters as the average sim/dist between their members
-    new_cluster_matrix = np.zeros((len(new_cluster_names), len(new_cluster_names)))
-    cluster_count = np.zeros((len(new_cluster_names), len(new_cluster_names)))
-    for i in range(len(dataset.cluster_names)):
-        for j in range(i + 1, len(dataset.cluster_names)):
-            if labels[i] != labels[j]:
-                new_cluster_matrix[labels[i], labels[j]] += cluster_matrix[i, j]
-                cluster_count[labels[i], labels[j]] += 1
-
-                new_cluster_matrix[labels[j], labels[i]] += cluster_matrix[i, j]
-                cluster_count[labels[j], labels[i]] += 1
-    new_cluster_matrix /= (cluster_count + np.eye(max(labels) + 1))
+    # compute the distance or similarity matrix for the new clusters as the average sim/dist between their members.
+    # With the indicator matrix P of the assignments, P^T M P sums up the values between all pairs of clusters. Only
+    # the upper triangle of M is used to count every pair of members once.
+    num_old, num_new = len(dataset.cluster_names), len(new_cluster_names)
+    indicator = sparse.csr_matrix((np.ones(num_old), (np.arange(num_old), label_index)), shape=(num_old, num_new))
+    if sparse.issparse(cluster_matrix):
+        upper = sparse.triu(cluster_matrix, k=1, format="csr")
+    else:
+        upper = np.triu(np.asarray(cluster_matrix, dtype=float), k=1)
+    new_cluster_matrix = indicator.T @ upper @ indicator
+    new_cluster_matrix = new_cluster_matrix.toarray() if sparse.issparse(new_cluster_matrix) else new_cluster_matrix
+    new_cluster_matrix += new_cluster_matrix.T
+    np.fill_diagonal(new_cluster_matrix, 0)
+    sizes = np.bincount(label_index, minlength=num_new).astype(float)
+    new_cluster_matrix /= (np.outer(sizes, sizes) * (1 - np.eye(num_new)) + np.eye(num_new))
 
     # compute the mapping of new clusters to their weights as the sum of their members weights
     new_cluster_weights = {}
@@ -368,7 +395,7 @@ def force_clustering(dataset: DataSet) -> DataSet:
 
 
 def cluster_interactions(
-        inter: List[Tuple[str, str]],
+        inter: Union[InteractionTable, List[Tuple[str, str]]],
         e_dataset: DataSet,
         f_dataset: DataSet,
 ) -> np.ndarray:
@@ -376,23 +403,26 @@ def cluster_interactions(
     Based on cluster information, count interactions in an interaction matrix between the individual clusters.
 
     Args:
-        inter: List of pairs representing interactions
+        inter: Table of interactions
         e_dataset: Dataset of the e-dataset
         f_dataset: Dataset of the f-dataset
 
     Returns:
         Numpy array of matrix of interactions between two clusters
     """
+    inter = InteractionTable.from_pairs(inter)
     e_mapping = dict((y, x) for x, y in enumerate(e_dataset.cluster_names))
     f_mapping = dict((y, x) for x, y in enumerate(f_dataset.cluster_names))
 
-    output = np.zeros((len(e_dataset.cluster_names), len(f_dataset.cluster_names)))
-    for e, f in inter:
-        e_key = e_mapping[e_dataset.cluster_map[e_dataset.id_map[e]]]
-        f_key = f_mapping[f_dataset.cluster_map[f_dataset.id_map[f]]]
-        output[e_key][f_key] += 1
+    # map every entity in the vocabularies once to the index of its cluster
+    e_clusters = np.array([e_mapping[e_dataset.cluster_map[e_dataset.id_map[e]]] for e in inter.e_names.tolist()],
+                          dtype=np.int64)
+    f_clusters = np.array([f_mapping[f_dataset.cluster_map[f_dataset.id_map[f]]] for f in inter.f_names.tolist()],
+                          dtype=np.int64)
 
-    return output
+    num_e, num_f = len(e_dataset.cluster_names), len(f_dataset.cluster_names)
+    cells = e_clusters[inter.e_index] * num_f + f_clusters[inter.f_index]
+    return np.bincount(cells, minlength=num_e * num_f).reshape(num_e, num_f).astype(float)
 
 
 def reverse_clustering(cluster_split: Dict[str, str], name_cluster: Dict[str, str]) -> Dict[str, str]:
@@ -413,7 +443,7 @@ def reverse_interaction_clustering(
         inter_split: Dict[Tuple[str, str], str],
         e_name_cluster_map: Dict[str, str],
         f_name_cluster_map: Dict[str, str],
-        inter: List[Tuple[str, str]]
+        inter: Union[InteractionTable, List[Tuple[str, str]]],
 ) -> Dict[str, str]:
     """
     Revert the clustering of interactions.
@@ -422,12 +452,12 @@ def reverse_interaction_clustering(
         inter_split: The assignment of each cell of an interaction matrix to a split based on the cluster names.
         e_name_cluster_map: Mapping from sample names to cluster names for the e-dataset.
         f_name_cluster_map: Mapping from sample names to cluster names for the f-dataset.
-        inter: List of interactions as pairs of entity names from each dataset.
+        inter: Table of interactions between entities from each dataset.
 
     Returns:
 
     """
-    return {
-        (e_name, f_name): inter_split[e_name_cluster_map[e_name], f_name_cluster_map[f_name]]
-        for e_name, f_name in inter
-    }
+    inter = InteractionTable.from_pairs(inter)
+    e_clusters = inter.lookup(0, e_name_cluster_map).tolist()
+    f_clusters = inter.lookup(1, f_name_cluster_map).tolist()
+    return {pair: inter_split[cells] for pair, cells in zip(inter, zip(e_clusters, f_clusters))}
@@ -1,51 +1,63 @@
-from typing import Tuple, List, Dict
+import os
+from typing import Tuple, List, Dict, Iterable, Union, Optional
 
 import numpy as np
-from rdkit import Chem, DataStructs, RDLogger
+from rdkit import Chem, DataStructs
 from rdkit.Chem import AllChem
 from rdkit.Chem.Scaffolds.MurckoScaffold import MakeScaffoldGeneric
 from rdkit.Chem.rdchem import MolSanitizeException
+from scipy import sparse
 
+from datasail.cluster.fingerprint_store import FingerprintStore, FINGERPRINT_STORE_DIR
+from datasail.cluster.incremental import similarity_store_path, extend_similarities
+from datasail.cluster.tanimoto import tanimoto_matrix, tanimoto_graph, tanimoto_block, pack_bits
 from datasail.cluster.utils import read_molecule_encoding
+from datasail.reader.molecule_store import map_chunks, silent_rdkit
 from datasail.reader.utils import DataSet
 from datasail.settings import LOGGER
 
 
-def run_ecfp(dataset: DataSet) -> Tuple[List[str], Dict[str, str], np.ndarray]:
+ECFP_BITS = 1024
+
+
+def run_ecfp(
+        dataset: DataSet, threads: int = 1, cache_dir: Optional[str] = None
+) -> Tuple[List[str], Dict[str, str], Union[np.ndarray, sparse.csr_matrix]]:
     """
-    Compute 1024Bit-ECPFs for every molecule in the dataset and then compute pairwise Tanimoto-Scores of them.
+    Compute 1024Bit-ECPFs for every molecule in the dataset and then compute pairwise Tanimoto-Scores of them. The
+    scaffolds and fingerprints are computed in chunks in a pool of processes, every scaffold SMILES is computed once.
+    With a cache directory, the fingerprints are looked up in a persistent store and only missing ones are computed.
+    The dense similarity matrix of the previous run on the same dataset is extended by the rows of new scaffolds.
+    If a threshold or a number of neighbors is given in the tool arguments, the similarities are returned as sparse
+    graph of the similar pairs instead of a dense matrix.
 
     Args:
         dataset: The dataset to compute pairwise, elementwise similarities for
+        threads: Number of processes to compute scaffolds and fingerprints with and threads for the Tanimoto-Scores
+        cache_dir: Directory to store the fingerprints and similarities of the scaffolds in, None to not store them
 
     Returns:
         A tuple containing
           - the names of the clusters (cluster representatives)
           - the mapping from cluster members to the cluster names (cluster representatives)
-          - the similarity matrix of the clusters (a symmetric matrix filled with 1s)
+          - the dense or sparse similarity matrix of the clusters
     """
-    lg = RDLogger.logger()
-    lg.setLevel(RDLogger.CRITICAL)
     if dataset.type != "M":
         raise ValueError("ECFP with Tanimoto-scores can only be applied to molecular data.")
 
-    scaffolds = {}
     LOGGER.info("Start ECFP clustering")
 
-    invalid_mols = []
+    # send the binary molecules to the workers if they are stored, this skips parsing the SMILES strings again
+    inputs = []
     for name in dataset.names:
-        scaffold = read_molecule_encoding(dataset.data[name])
-        if scaffold is None:
-            bo, bc = "{", "}"
-            LOGGER.warning(f"RDKit cannot parse {name} {bo}{dataset.data[name]}{bc}")
-            invalid_mols.append(name)
-            continue
-        try:
-            scaffolds[name] = MakeScaffoldGeneric(scaffold)
-        except MolSanitizeException:
-            LOGGER.warning(f"RDKit cannot parse {name} ({dataset.data[name]})")
-            invalid_mols.append(name)
-            continue
+        record = None if dataset.molecules is None else dataset.molecules.record(dataset.data[name])
+        inputs.append(record[2] if record is not None and record[2] is not None else dataset.data[name])
+    scaffolds = dict(zip(dataset.names, (s for chunk in map_chunks(scaffold_chunk, inputs, threads) for s in chunk)))
+
+    invalid_mols = [name for name, scaffold in scaffolds.items() if scaffold is None]
+    for name in invalid_mols:
+        LOGGER.warning(f"RDKit cannot parse {name} ({dataset.data[name]})")
+        scaffolds.pop(name)
     for invalid_name in invalid_mols:  # obsolete code?
         dataset.names.remove(invalid_name)
         dataset.data.pop(invalid_name)
@@ -56,27 +68,40 @@ def run_ecfp(dataset: DataSet) -> Tuple[List[str], Dict[str, str], np.ndarray]:
         for pop in poppable:
             dataset.id_map.pop(pop)
 
-    fps = []
-    cluster_names = list(set(Chem.MolToSmiles(s) for s in list(scaffolds.values())))
-    for scaffold in cluster_names:
-        fps.append(AllChem.GetMorganFingerprintAsBitVect(Chem.MolFromSmiles(scaffold), 2, nBits=1024))
+    cluster_names = list(dict.fromkeys(scaffolds.values()))
+    if cache_dir is None:
+        fps = compute_fingerprints(cluster_names, threads)
+    else:
+        store = FingerprintStore(
+            os.path.join(cache_dir, FINGERPRINT_STORE_DIR, f"ecfp_{ECFP_BITS}"), (ECFP_BITS + 63) // 64)
+        fps = store.fingerprints(cluster_names, lambda scaffolds: compute_fingerprints(scaffolds, threads))
+        LOGGER.info(f"Loaded {store.hits} fingerprints from the cache and computed {store.misses}")
 
     LOGGER.info(f"Reduced {len(dataset.names)} molecules to {len(cluster_names)}")
 
     LOGGER.info("Compute Tanimoto Coefficients")
 
-    count = len(cluster_names)
-    sim_matrix = np.zeros((count, count))
-    for i in range(count):
-        sim_matrix[i, i] = 1
-        sim_matrix[i, :i] = DataStructs.BulkTanimotoSimilarity(fps[i], fps[:i])
-        sim_matrix[:i, i] = sim_matrix[i, :i]
+    threshold, neighbors = (0.0, 0) if dataset.args is None else (dataset.args.threshold, dataset.args.neighbors)
+    if threshold > 0 or neighbors > 0:
+        sim_matrix = tanimoto_graph(fps, threshold, neighbors, num_threads=threads)
+        LOGGER.info(f"Stored {(sim_matrix.nnz - len(cluster_names)) // 2} similar pairs of scaffolds")
+    elif cache_dir is not None:
+        # extend the matrix of the previous run on this dataset by the rows of new scaffolds
+        def compute_block(new: List[int]) -> np.ndarray:
+            block = tanimoto_block(fps[new], fps, dtype=np.float32, num_threads=threads)
+            block[np.arange(len(new)), new] = 1
+            return block
 
-    cluster_map = dict((name, Chem.MolToSmiles(scaffolds[name])) for name in dataset.names)
+        path = similarity_store_path(cache_dir, f"ecfp_{ECFP_BITS}", dataset.location)
+        sim_matrix = extend_similarities(path, cluster_names, compute_block, dtype=np.float32)
+    else:
+        sim_matrix = tanimoto_matrix(fps, dtype=np.float32, num_threads=threads)
+
+    cluster_map = dict((name, scaffolds[name]) for name in dataset.names)
     """
     cluster_indices = dict((n, i) for i, n in enumerate(cluster_names))
     element_sim_matrix = np.ones((len(dataset.names), len(dataset.names)))
-    smiles_scaff_map = dict((k, Chem.MolToSmiles(v)) for k, v in scaffolds.items())
+    smiles_scaff_map = scaffolds
     for i in range(len(dataset.names)):
         for j in range(i + 1, len(dataset.names)):
             element_sim_matrix[i, j] = sim_matrix[
@@ -87,3 +112,77 @@ def run_ecfp(dataset: DataSet) -> Tuple[List[str], Dict[str, str], np.ndarray]:
     dataset.similarity = element_sim_matrix
     """
     return cluster_names, cluster_map, sim_matrix
+
+
+def pack_fingerprints(fps: Iterable[DataStructs.ExplicitBitVect], num_bits: int = ECFP_BITS) -> np.ndarray:
+    """
+    Pack RDKit bit vectors into a matrix of 64-bit words to compute Tanimoto-Scores on them with numpy.
+
+    Args:
+        fps: The fingerprints to pack
+        num_bits: Length of the fingerprints in bits
+
+    Returns:
+        Array of shape (n, num_bits / 64) storing one fingerprint per row
+    """
+    packed = [pack_bits(DataStructs.BitVectToBinaryText(fp), num_bits) for fp in fps]
+    if len(packed) == 0:
+        return np.zeros((0, (num_bits + 63) // 64), dtype=np.uint64)
+    return np.stack(packed)
+
+
+def scaffold_chunk(molecules: List[Union[str, bytes]]) -> List[Optional[str]]:
+    """
+    Compute the canonical SMILES of the generic Murcko scaffolds of a chunk of molecules.
+
+    Args:
+        molecules: Either the SMILES strings or the binary RDKit representations of the molecules
+
+    Returns:
+        The SMILES strings of the scaffolds, None for molecules that RDKit cannot parse
+    """
+    scaffolds = []
+    with silent_rdkit():
+        for molecule in molecules:
+            mol = Chem.Mol(molecule) if isinstance(molecule, bytes) else read_molecule_encoding(molecule)
+            if mol is None:
+                scaffolds.append(None)
+                continue
+            try:
+                scaffolds.append(Chem.MolToSmiles(MakeScaffoldGeneric(mol)))
+            except MolSanitizeException:
+                scaffolds.append(None)
+    return scaffolds
+
+
+def compute_fingerprints(scaffolds: List[str], threads: int = 1) -> np.ndarray:
+    """
+    Compute the packed ECFPs of scaffolds in chunks in a pool of processes.
+
+    Args:
+        scaffolds: SMILES strings of the scaffolds
+        threads: Number of processes to use
+
+    Returns:
+        Array of shape (n, ECFP_BITS / 64) storing one fingerprint per row
+    """
+    return np.concatenate(
+        [np.zeros((0, (ECFP_BITS + 63) // 64), dtype=np.uint64)] + map_chunks(fingerprint_chunk, scaffolds, threads)
+    )
+
+
+def fingerprint_chunk(scaffolds: List[str]) -> np.ndarray:
+    """
+    Compute the packed ECFPs of a chunk of scaffolds.
+
+    Args:
+        scaffolds: SMILES strings of the scaffolds
+
+    Returns:
+        Array of shape (n, ECFP_BITS / 64) storing one fingerprint per row
+    """
+    with silent_rdkit():
+        return pack_fingerprints(
+            AllChem.GetMorganFingerprintAsBitVect(Chem.MolFromSmiles(scaffold), 2, nBits=ECFP_BITS)
+            for scaffold in scaffolds
+        )
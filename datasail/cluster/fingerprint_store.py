@@ -0,0 +1,131 @@
+import os
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from datasail.settings import LOGGER
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FINGERPRINT_STORE_DIR = "fingerprints"
+
+
+class FingerprintStore:
+    """
+    Store of packed fingerprints on disk, keyed by the canonical SMILES of the scaffolds they are computed for. The
+    fingerprints are stored as rows of uint64 words in a binary file that is memory-mapped for reading. The keys are
+    stored in an index file with one SMILES string per line, the line number is the row of the fingerprint.
+
+    Both files are only appended to. Writers hold a lock while appending and write the fingerprints before their keys,
+    so readers never see a key without its fingerprint and concurrent readers need no lock. Incomplete lines of a
+    crashed writer are ignored by readers and overwritten by the next writer.
+    """
+
+    def __init__(self, path: str, num_words: int) -> None:
+        """
+        Open the store in a directory. The files are created when the first fingerprints are added.
+
+        Args:
+            path: Directory to store the fingerprints in
+            num_words: Number of uint64 words of every fingerprint
+        """
+        self.path = path
+        self.num_words = num_words
+        self.data_file = os.path.join(path, "fingerprints.bin")
+        self.index_file = os.path.join(path, "index.txt")
+        self.lock_file = os.path.join(path, "lock")
+        self.hits = 0
+        self.misses = 0
+
+    def read_index(self) -> Tuple[Dict[str, int], int]:
+        """
+        Read the keys of all complete lines of the index.
+
+        Returns:
+            A mapping from the keys to their rows and the number of bytes of complete lines in the index file
+        """
+        if not os.path.isfile(self.index_file):
+            return {}, 0
+        with open(self.index_file, "rb") as data:
+            content = data.read()
+        size = content.rfind(b"\n") + 1
+        keys = content[:size].decode().split("\n")[:-1]
+        return dict((key, row) for row, key in enumerate(keys)), size
+
+    def read(self, rows: List[int], count: int) -> np.ndarray:
+        """
+        Read fingerprints from the memory-mapped data file.
+
+        Args:
+            rows: Rows of the fingerprints to read
+            count: Number of rows in the index, only this part of the file is mapped
+
+        Returns:
+            Array of shape (len(rows), num_words) with the requested fingerprints
+        """
+        if len(rows) == 0:
+            return np.zeros((0, self.num_words), dtype=np.uint64)
+        fps = np.memmap(self.data_file, dtype=np.uint64, mode="r", shape=(count, self.num_words))
+        return np.asarray(fps[rows])
+
+    def fingerprints(self, keys: List[str], compute: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Get the fingerprints of a list of keys. Fingerprints that are not in the store are computed and added.
+
+        Args:
+            keys: Unique keys to get the fingerprints for
+            compute: Function computing the packed fingerprints of a list of keys
+
+        Returns:
+            Array of shape (len(keys), num_words) with the fingerprints in the order of the keys
+        """
+        index, _ = self.read_index()
+        found = [i for i, key in enumerate(keys) if key in index]
+        missing = [i for i, key in enumerate(keys) if key not in index]
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        fps = np.empty((len(keys), self.num_words), dtype=np.uint64)
+        fps[found] = self.read([index[keys[i]] for i in found], len(index))
+        if len(missing) > 0:
+            fps[missing] = compute([keys[i] for i in missing])
+            self.add([keys[i] for i in missing], fps[missing])
+        return fps
+
+    def add(self, keys: List[str], fps: np.ndarray) -> None:
+        """
+        Append fingerprints to the store. Keys added by another writer in the meantime are skipped. Failing to write
+        the store only costs time in the next run.
+
+        Args:
+            keys: Keys of the fingerprints, must not contain line breaks
+            fps: Array of shape (len(keys), num_words) with the fingerprints to add
+        """
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(self.lock_file, "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                index, size = self.read_index()
+                new = [i for i, key in enumerate(keys) if key not in index]
+                if len(new) == 0:
+                    return
+
+                # write the fingerprints behind the last indexed row, this drops rows of crashed writers
+                with open(self.data_file, "r+b" if os.path.isfile(self.data_file) else "w+b") as data:
+                    data.seek(len(index) * self.num_words * 8)
+                    data.write(np.ascontiguousarray(fps[new], dtype=np.uint64).tobytes())
+                    data.truncate()
+                    data.flush()
+                    os.fsync(data.fileno())
+
+                # only now, the keys are visible to readers
+                with open(self.index_file, "r+b" if os.path.isfile(self.index_file) else "w+b") as data:
+                    data.seek(size)
+                    data.write("".join(keys[i] + "\n" for i in new).encode())
+                    data.truncate()
+        except OSError:
+            LOGGER.info(f"Cannot store the fingerprints in {self.path}.")
@@ -4,7 +4,8 @@ from typing import Tuple, List, Dict, Optional
 
 import numpy as np
 
-from datasail.parsers import MultiYAMLParser
+from datasail.parsers import get_yaml_parser
+from datasail.reader.structures import MMCIF_FORMATS
 from datasail.reader.utils import DataSet
 from datasail.settings import LOGGER, FOLDSEEK, INSTALLED
 
@@ -30,7 +31,7 @@ def run_foldseek(
     """
     if not INSTALLED[FOLDSEEK]:
         raise ValueError("Foldseek is not installed.")
-    user_args = MultiYAMLParser(FOLDSEEK).get_user_arguments(dataset.args, [])
+    user_args = get_yaml_parser(FOLDSEEK).get_user_arguments(dataset.args, [])
 
     results_folder = "fs_results"
 
@@ -70,8 +71,8 @@ def run_foldseek(
                 q1 = "_".join(q1.split("_")[:-1])
             if "_" in q2 and "." in q2 and q2.rindex("_") > q2.index("."):
                 q2 = "_".join(q2.split("_")[:-1])
-            q1 = q1.replace(".pdb", "")
-            q2 = q2.replace(".pdb", "")
+            for suffix in (".pdb",) + MMCIF_FORMATS:
+                q1, q2 = q1.replace(suffix, ""), q2.replace(suffix, "")
             cluster_sim[namap[q1], namap[q2]] = sim
             cluster_sim[namap[q2], namap[q1]] = sim
 
@@ -0,0 +1,85 @@
+import hashlib
+import os
+import zipfile
+from typing import Callable, List, Optional, Type
+
+import numpy as np
+
+from datasail.reader.utils import read_binary_matrix
+from datasail.settings import LOGGER, UNK_LOCATION
+
+SIMILARITY_STORE_DIR = "similarities"
+
+
+def similarity_store_path(cache_dir: Optional[str], method: str, location: str) -> Optional[str]:
+    """
+    Get the path to store the last similarity matrix that has been computed for a dataset with a method. Datasets are
+    identified by their location, so a dataset that grows over time reuses the similarities of its previous version.
+    Datasets without a known location, e.g., given as dictionary or generator, cannot be identified and are not stored.
+
+    Args:
+        cache_dir: Directory to cache the matrix in, None to not cache it
+        method: Name of the similarity method including all parameters that change the similarities
+        location: Location of the dataset
+
+    Returns:
+        The path to the NPZ file storing the matrix or None if no cache directory or location is given
+    """
+    if cache_dir is None or location == UNK_LOCATION:
+        return None
+    digest = hashlib.sha1(f"{method}\n{location}".encode()).hexdigest()
+    return os.path.join(cache_dir, SIMILARITY_STORE_DIR, f"{digest}.npz")
+
+
+def extend_similarities(
+        path: Optional[str],
+        keys: List[str],
+        compute_block: Callable[[List[int]], np.ndarray],
+        dtype: Type = np.float32,
+) -> np.ndarray:
+    """
+    Compute a similarity matrix by extending the matrix of a previous run. The similarities between entities that have
+    been in the previous matrix are copied from it, only the rows of new entities are computed, i.e., the new-vs-all
+    and new-vs-new blocks. This requires the similarity of two entities to be independent of the other entities. The
+    extended matrix replaces the previous one, entities that are not in the current dataset are dropped.
+
+    Args:
+        path: Path to the NPZ file storing the previous matrix and the keys of its rows, None to compute all rows
+        keys: Keys of the entities in the order of the matrix, equal keys must describe equal entities
+        compute_block: Function computing the similarities of the entities at the given positions to all entities as
+            array of shape (len(positions), len(keys))
+        dtype: Datatype of the similarity matrix
+
+    Returns:
+        Symmetric matrix of shape (len(keys), len(keys)) with the pairwise similarities
+    """
+    cached_keys, cached = [], None
+    if path is not None and os.path.isfile(path):
+        try:
+            cached_keys, cached = read_binary_matrix(path)
+        except (ValueError, OSError, zipfile.BadZipFile):
+            LOGGER.info(f"Cannot read the cached similarities from {path}, they are recomputed.")
+    positions = dict((key, i) for i, key in enumerate(cached_keys))
+    old = [i for i, key in enumerate(keys) if key in positions]
+    new = [i for i, key in enumerate(keys) if key not in positions]
+
+    matrix = np.empty((len(keys), len(keys)), dtype=dtype)
+    if len(old) > 0:
+        cached_pos = [positions[keys[i]] for i in old]
+        matrix[np.ix_(old, old)] = cached[np.ix_(cached_pos, cached_pos)]
+    if len(new) > 0:
+        block = compute_block(new)
+        matrix[new, :] = block
+        matrix[:, new] = block.T
+    LOGGER.info(f"Reused the similarities of {len(old)} entities and computed the ones of {len(new)} new entities")
+
+    # release the memory-mapped file before replacing it
+    cached = None
+    if path is not None and list(keys) != list(cached_keys):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            np.savez(path + ".tmp.npz", matrix=matrix, names=np.array(keys, dtype=str))
+            os.replace(path + ".tmp.npz", path)
+        except OSError:
+            LOGGER.info(f"Cannot store the similarities in {os.path.dirname(path)}.")
+    return matrix
@@ -4,9 +4,9 @@ from typing import Tuple, List, Dict, Optional
 
 import numpy as np
 
-from datasail.parsers import MultiYAMLParser
+from datasail.parsers import get_yaml_parser
 from datasail.reader.utils import DataSet
-from datasail.settings import LOGGER, INSTALLED, MASH, MASH_DIST, MASH_SKETCH
+from datasail.settings import LOGGER, INSTALLED, MASH, MASH_DIST, MASH_SKETCH, FORM_GENOMES
 
 
 def run_mash(
@@ -30,13 +30,24 @@ def run_mash(
     """
     if not INSTALLED[MASH]:
         raise ValueError("MASH is not installed.")
-    user_args_sketch = MultiYAMLParser(MASH_SKETCH).get_user_arguments(dataset.args[0], [])
-    user_args_dist = MultiYAMLParser(MASH_DIST).get_user_arguments(dataset.args[1], [])
+    user_args_sketch = get_yaml_parser(MASH_SKETCH).get_user_arguments(dataset.args[0], [])
+    user_args_dist = get_yaml_parser(MASH_DIST).get_user_arguments(dataset.args[1], [])
 
     results_folder = "mash_results"
-    cmd = f"mkdir {results_folder} && " \
-          f"cd mash_results && " \
-          f"mash sketch -s 10000 -p {threads} -o ./cluster {os.path.join('..', dataset.location, '*.fna')} " \
+    if os.path.exists(results_folder):
+        shutil.rmtree(results_folder, ignore_errors=True)
+    os.makedirs(results_folder)
+
+    if dataset.format == FORM_GENOMES:
+        # sketch only the deduplicated genomes in the order of the names to align the distance matrix with them
+        with open(os.path.join(results_folder, "genomes.txt"), "w") as out:
+            out.writelines(f"{dataset.data[name]}\n" for name in dataset.names)
+        sketch_input = "-l genomes.txt"
+    else:
+        sketch_input = os.path.join('..', dataset.location, '*.fna')
+
+    cmd = f"cd {results_folder} && " \
+          f"mash sketch -s 10000 -p {threads} -o ./cluster {sketch_input} " \
           f"{user_args_sketch} && " \
           f"mash dist -p {threads} -t cluster.msh cluster.msh > cluster.tsv {user_args_dist}"
 
@@ -45,9 +56,6 @@ def run_mash(
     else:
         cmd += f"> {os.path.join(log_dir, f'{dataset.get_name()}_mash.log')}"
 
-    if os.path.exists(results_folder):
-        cmd = f"rm -rf {results_folder} && " + cmd
-
     LOGGER.info("Start MASH clustering")
     LOGGER.info(cmd)
     os.system(cmd)
@@ -5,12 +5,14 @@ import shutil
 import numpy as np
 
 from datasail.cluster.utils import cluster_param_binary_search, extract_fasta
-from datasail.parsers import MultiYAMLParser
+from datasail.parsers import get_yaml_parser
 from datasail.reader.utils import DataSet
 from datasail.settings import LOGGER, MMSEQS2, INSTALLED
 
 
-def run_mmseqs(dataset: DataSet, threads: int, log_dir: Optional[str]) -> Tuple[List[str], Dict[str, str], np.ndarray]:
+def run_mmseqs(
+        dataset: DataSet, threads: int, log_dir: Optional[str], cache_dir: Optional[str] = None
+) -> Tuple[List[str], Dict[str, str], np.ndarray]:
     """
     Run mmseqs in the commandline and read in the results into clusters.
 
@@ -18,6 +20,7 @@ def run_mmseqs(dataset: DataSet, threads: int, log_dir: Optional[str]) -> Tuple[
         dataset: DataSet holding all information on the dta to be clustered
         threads: number of threads to use for one CD-HIT run
         log_dir: Absolute path to the directory to store all the logs in
+        cache_dir: Directory to store the exported FASTA file in, a temporary directory is used if None
 
     Returns:
         A tuple containing
@@ -28,9 +31,9 @@ def run_mmseqs(dataset: DataSet, threads: int, log_dir: Optional[str]) -> Tuple[
     if not INSTALLED[MMSEQS2]:
         raise ValueError("MMseqs is not installed.")
 
-    user_args = MultiYAMLParser(MMSEQS2).get_user_arguments(dataset.args, ["c"])
+    user_args = get_yaml_parser(MMSEQS2).get_user_arguments(dataset.args, ["c"])
     vals = (dataset.args.c,)
-    extract_fasta(dataset)
+    extract_fasta(dataset, cache_dir)
 
     return cluster_param_binary_search(
         dataset,
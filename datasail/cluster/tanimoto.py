@@ -0,0 +1,242 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Type, Tuple
+
+import numpy as np
+from scipy import sparse
+
+# number of fingerprints per side of a tile, a tile of 256 x 256 1024-bit fingerprints needs 8MB of intermediate memory
+TILE_SIZE = 256
+
+# slack on the popcount bounds to not prune pairs whose similarity is the threshold up to rounding errors
+BOUND_SLACK = 1e-6
+
+# number of set bits for every byte value, used if numpy does not provide a popcount (numpy < 2.0)
+_BYTE_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+
+def popcount(x: np.ndarray) -> np.ndarray:
+    """
+    Count the set bits of every 64-bit word of an array.
+
+    Args:
+        x: Array of uint64 words
+
+    Returns:
+        Array of the same shape with the number of set bits per word
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    return _BYTE_POPCOUNT[x.view(np.uint8)].reshape(*x.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+def pack_bits(bits: Union[bytes, np.ndarray], num_bits: int) -> np.ndarray:
+    """
+    Pack a binary fingerprint into 64-bit words. The order of the bits does not matter as long as it is the same for
+    all fingerprints as only the number of shared bits is used.
+
+    Args:
+        bits: Either the bytes of the packed fingerprint or an array of 0s and 1s
+        num_bits: Length of the fingerprint in bits
+
+    Returns:
+        Array of uint64 words storing the fingerprint, padded with zeros to full words
+    """
+    if isinstance(bits, np.ndarray):
+        bits = np.packbits(bits.astype(bool)).tobytes()
+    words = np.zeros((num_bits + 63) // 64, dtype=np.uint64)
+    words.view(np.uint8)[:len(bits)] = np.frombuffer(bits, dtype=np.uint8)
+    return words
+
+
+def tile_similarity(a: np.ndarray, b: np.ndarray, count_a: np.ndarray, count_b: np.ndarray) -> np.ndarray:
+    """
+    Compute the Tanimoto similarities between two tiles of packed fingerprints.
+
+    Args:
+        a: Array of shape (n, words) storing the first tile of fingerprints
+        b: Array of shape (m, words) storing the second tile of fingerprints
+        count_a: Number of set bits of the fingerprints in a
+        count_b: Number of set bits of the fingerprints in b
+
+    Returns:
+        Array of shape (n, m) with the similarities as float32, 0 for pairs of empty fingerprints
+    """
+    shared = popcount(a[:, None, :] & b[None, :, :]).sum(axis=2, dtype=np.int32)
+    union = count_a[:, None] + count_b[None, :] - shared
+    return np.divide(shared, union, out=np.zeros(shared.shape, dtype=np.float32), where=union > 0)
+
+
+def tanimoto_matrix(
+        fps: np.ndarray,
+        dtype: Type = np.float32,
+        num_threads: int = 1,
+        tile_size: int = TILE_SIZE,
+) -> np.ndarray:
+    """
+    Compute the pairwise Tanimoto similarities of packed binary fingerprints. The matrix is computed in tiles that fit
+    into the CPU cache and only tiles on or above the diagonal are computed, they are mirrored into the lower triangle.
+    The tiles are distributed over a thread pool, numpy releases the GIL while counting bits. Two different empty
+    fingerprints have a similarity of 0, like in RDKit, but the diagonal is always set to the maximal similarity.
+
+    Args:
+        fps: Array of shape (n, words) of uint64 words storing one fingerprint per row
+        dtype: Type of the output, either a float type or np.uint8 to quantize the similarities into 0, ..., 255
+        num_threads: Number of threads to compute tiles in
+        tile_size: Number of fingerprints per side of a tile
+
+    Returns:
+        Symmetric matrix of shape (n, n) with the pairwise similarities
+    """
+    fps = np.ascontiguousarray(fps, dtype=np.uint64)
+    count = len(fps)
+    bit_counts = popcount(fps).sum(axis=1, dtype=np.int32)
+    output = np.empty((count, count), dtype=dtype)
+    quantize = np.issubdtype(output.dtype, np.integer)
+
+    def compute_tile_row(start: int) -> None:
+        end = min(start + tile_size, count)
+        for col_start in range(start, count, tile_size):
+            col_end = min(col_start + tile_size, count)
+            sim = tile_similarity(
+                fps[start:end], fps[col_start:col_end], bit_counts[start:end], bit_counts[col_start:col_end])
+            if quantize:
+                sim = np.rint(sim * 255)
+            output[start:end, col_start:col_end] = sim
+            output[col_start:col_end, start:end] = sim.T
+
+    with ThreadPoolExecutor(max_workers=max(num_threads, 1)) as executor:
+        list(executor.map(compute_tile_row, range(0, count, tile_size)))
+    np.fill_diagonal(output, 255 if quantize else 1)
+    return output
+
+
+def tanimoto_block(
+        rows: np.ndarray,
+        cols: np.ndarray,
+        dtype: Type = np.float32,
+        num_threads: int = 1,
+        tile_size: int = TILE_SIZE,
+) -> np.ndarray:
+    """
+    Compute the Tanimoto similarities between two sets of packed binary fingerprints, e.g., of new fingerprints to
+    all fingerprints of a dataset. Like for full matrices, the block is computed in tiles in a thread pool.
+
+    Args:
+        rows: Array of shape (n, words) storing the fingerprints of the rows
+        cols: Array of shape (m, words) storing the fingerprints of the columns
+        dtype: Type of the output, either a float type or np.uint8 to quantize the similarities into 0, ..., 255
+        num_threads: Number of threads to compute tiles in
+        tile_size: Number of fingerprints per side of a tile
+
+    Returns:
+        Matrix of shape (n, m) with the similarities, pairs of empty fingerprints have a similarity of 0
+    """
+    rows = np.ascontiguousarray(rows, dtype=np.uint64)
+    cols = np.ascontiguousarray(cols, dtype=np.uint64)
+    row_counts = popcount(rows).sum(axis=1, dtype=np.int32)
+    col_counts = popcount(cols).sum(axis=1, dtype=np.int32)
+    output = np.empty((len(rows), len(cols)), dtype=dtype)
+    quantize = np.issubdtype(output.dtype, np.integer)
+
+    def compute_tile_row(start: int) -> None:
+        end = min(start + tile_size, len(rows))
+        for col_start in range(0, len(cols), tile_size):
+            col_end = min(col_start + tile_size, len(cols))
+            sim = tile_similarity(
+                rows[start:end], cols[col_start:col_end], row_counts[start:end], col_counts[col_start:col_end])
+            output[start:end, col_start:col_end] = np.rint(sim * 255) if quantize else sim
+
+    with ThreadPoolExecutor(max_workers=max(num_threads, 1)) as executor:
+        list(executor.map(compute_tile_row, range(0, len(rows), tile_size)))
+    return output
+
+
+def tanimoto_graph(
+        fps: np.ndarray,
+        threshold: float = 0.0,
+        neighbors: int = 0,
+        num_threads: int = 1,
+        tile_size: int = TILE_SIZE,
+) -> sparse.csr_matrix:
+    """
+    Compute a sparse graph of the Tanimoto similarities of packed binary fingerprints. Only pairs with a similarity of
+    at least the threshold are stored and, if a number of neighbors is given, only the most similar neighbors of every
+    fingerprint. The graph is symmetric, a pair is stored if one of the fingerprints is a neighbor of the other.
+
+    As the Tanimoto similarity of two fingerprints is at most the ratio of their bit counts, the fingerprints are sorted
+    by their bit counts and tiles of pairs whose bit counts are too different to reach the threshold are not computed.
+    If a number of neighbors is given, only the most similar pairs found so far are kept per fingerprint while iterating
+    over the tiles, so the memory does not grow with the number of pairs above the threshold.
+
+    Args:
+        fps: Array of shape (n, words) of uint64 words storing one fingerprint per row
+        threshold: Minimal similarity of a pair to be stored
+        neighbors: Number of most similar neighbors to store per fingerprint, 0 to store all pairs above the threshold
+        num_threads: Number of threads to compute tiles in
+        tile_size: Number of fingerprints per side of a tile
+
+    Returns:
+        Symmetric sparse matrix of shape (n, n) with the similarities of the stored pairs and 1s on the diagonal
+    """
+    fps = np.ascontiguousarray(fps, dtype=np.uint64)
+    count = len(fps)
+    bit_counts = popcount(fps).sum(axis=1, dtype=np.int32)
+    order = np.argsort(bit_counts, kind="stable")
+    fps, bit_counts = fps[order], bit_counts[order]
+
+    def compute_tile_row(start: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        end = min(start + tile_size, count)
+        # only fingerprints with a bit count in [threshold * min, max / threshold] of this tile can be similar enough
+        first = np.searchsorted(bit_counts, threshold * bit_counts[start] - BOUND_SLACK, side="left")
+        last = count if threshold == 0 else \
+            np.searchsorted(bit_counts, bit_counts[end - 1] / threshold + BOUND_SLACK, side="right")
+        if neighbors > 0:
+            return select_neighbors(start, end, first, last)
+        # without neighbor selection, the upper triangle is enough, it is mirrored later
+        first = max(first, start)
+        rows, cols, values = [], [], []
+        for col_start in range(first, last, tile_size):
+            col_end = min(col_start + tile_size, last)
+            sim = tile_similarity(
+                fps[start:end], fps[col_start:col_end], bit_counts[start:end], bit_counts[col_start:col_end])
+            row, col = np.nonzero((sim >= threshold) & (sim > 0))
+            row, col = row + start, col + col_start
+            mask = col > row
+            rows.append(row[mask])
+            cols.append(col[mask])
+            values.append(sim[row[mask] - start, col[mask] - col_start])
+        if len(rows) == 0:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.float32)
+        return np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+
+    def select_neighbors(start: int, end: int, first: int, last: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # keep the best pairs seen so far per row and merge them with every column tile, so the memory is bounded by
+        # the tile size times the number of neighbors plus the tile size, pairs that cannot be stored have a value of -1
+        best_cols = np.zeros((end - start, 0), dtype=np.intp)
+        best_values = np.zeros((end - start, 0), dtype=np.float32)
+        for col_start in range(first, last, tile_size):
+            col_end = min(col_start + tile_size, last)
+            sim = tile_similarity(
+                fps[start:end], fps[col_start:col_end], bit_counts[start:end], bit_counts[col_start:col_end])
+            sim[(sim < threshold) | (sim == 0)] = -1
+            diagonal = np.arange(max(start, col_start), min(end, col_end))
+            sim[diagonal - start, diagonal - col_start] = -1
+            best_values = np.concatenate([best_values, sim], axis=1)
+            best_cols = np.concatenate(
+                [best_cols, np.broadcast_to(np.arange(col_start, col_end), sim.shape)], axis=1)
+            if best_values.shape[1] > neighbors:
+                top = np.argpartition(-best_values, neighbors - 1, axis=1)[:, :neighbors]
+                best_values = np.take_along_axis(best_values, top, axis=1)
+                best_cols = np.take_along_axis(best_cols, top, axis=1)
+        row, slot = np.nonzero(best_values > 0)
+        return row + start, best_cols[row, slot], best_values[row, slot]
+
+    with ThreadPoolExecutor(max_workers=max(num_threads, 1)) as executor:
+        tiles = list(executor.map(compute_tile_row, range(0, count, tile_size)))
+
+    # map the sorted fingerprints back to the input order
+    rows = np.concatenate([order[tile[0]] for tile in tiles] + [np.arange(count)])
+    cols = np.concatenate([order[tile[1]] for tile in tiles] + [np.arange(count)])
+    values = np.concatenate([tile[2] for tile in tiles] + [np.ones(count, dtype=np.float32)])
+    graph = sparse.csr_matrix((values, (rows, cols)), shape=(count, count), dtype=np.float32)
+    return graph.maximum(graph.T).tocsr()
@@ -1,13 +1,21 @@
+import hashlib
 import os
-from typing import Tuple, List, Dict, Callable, Optional
+from itertools import islice
+from typing import Tuple, List, Dict, Callable, Optional, Generator, TYPE_CHECKING
 
 import numpy as np
-import rdkit
-from matplotlib import pyplot as plt
-from rdkit import Chem
 
+from datasail.reader.compression import is_compressed, spill_dir, strip_compression
 from datasail.reader.utils import DataSet
-from datasail.settings import LOGGER, UNK_LOCATION
+from datasail.settings import LOGGER, FASTA_FORMATS
+
+if TYPE_CHECKING:
+    from rdkit import Chem
+
+FASTA_STORE_DIR = "fasta"
+
+# number of records encoded and written at once when exporting sequences into a FASTA file
+FASTA_CHUNK_SIZE = 10000
 
 
 def cluster_param_binary_search(
@@ -136,6 +144,8 @@ def heatmap(matrix: np.ndarray, output_file: str) -> None:
         matrix: A 2D numpy array of shape (M, N).
         output_file: Filename to store the matrix in.
     """
+    from matplotlib import pyplot as plt
+
     fig, ax = plt.subplots()
     im = ax.imshow(matrix)
     ax.figure.colorbar(im, ax=ax)
@@ -144,21 +154,54 @@ def heatmap(matrix: np.ndarray, output_file: str) -> None:
     plt.clf()
 
 
-def extract_fasta(dataset: DataSet) -> None:
+def extract_fasta(dataset: DataSet, cache_dir: Optional[str] = None) -> None:
     """
-    Extract the protein sequences from the dataset into a FASTA file that serves as input for CD-HIT or MMseqs2.
+    Extract the protein sequences from the dataset into a FASTA file that serves as input for CD-HIT or MMseqs2. Plain
+    FASTA files are used as they are, all other inputs (e.g., dictionaries, TSV, or compressed files) are exported once
+    into a file that is addressed by a hash of its content. Therefore, the export is shared between all trials and runs
+    and, if a cache directory is given, also between invocations on the same data.
 
     Args:
         dataset: The dataset to extract the amino acid sequences from
+        cache_dir: Directory to store the exported FASTA files in, a temporary directory is used if None
+    """
+    location = dataset.location
+    if os.path.isdir(location) or (os.path.isfile(location) and not is_compressed(location)
+                                   and location.split(".")[-1].lower() in FASTA_FORMATS):
+        return
+
+    digest = hashlib.sha1()
+    for chunk in fasta_chunks(dataset.data):
+        digest.update(chunk)
+
+    # keep the name of the input, it determines the names of the output files
+    folder = os.path.join(cache_dir or spill_dir(), FASTA_STORE_DIR, digest.hexdigest())
+    path = os.path.join(folder, os.path.splitext(os.path.basename(strip_compression(location)))[0] + ".fasta")
+    if not os.path.isfile(path):
+        os.makedirs(folder, exist_ok=True)
+        with open(path + ".tmp", "wb") as out:
+            for chunk in fasta_chunks(dataset.data):
+                out.write(chunk)
+        os.replace(path + ".tmp", path)
+    dataset.location = path
+
+
+def fasta_chunks(data: Dict[str, str]) -> Generator[bytes, None, None]:
     """
-    if not os.path.exists(dataset.location):
-        dataset.location = dataset.location + (".fasta" if dataset.location.endswith(UNK_LOCATION) else "")
-        with open(dataset.location, "w") as out:
-            for idx, seq in dataset.data.items():
-                print(f">{idx}\n{seq}", file=out)
+    Encode the records of a mapping from IDs to sequences into FASTA format in chunks of records.
 
+    Args:
+        data: Mapping from sequence IDs to sequences
 
-def read_molecule_encoding(encoding: str) -> Optional[rdkit.Chem.rdchem.Mol]:
+    Yields:
+        Encoded FASTA records of one chunk
+    """
+    records = iter(data.items())
+    while chunk := list(islice(records, FASTA_CHUNK_SIZE)):
+        yield "".join(f">{idx}\n{seq}\n" for idx, seq in chunk).encode()
+
+
+def read_molecule_encoding(encoding: str) -> Optional["Chem.Mol"]:
     """
     Detect and read the encoding of a molecule. For FASTA and Sequence input, the user must be able to specify the type
     of sequence encoded:
@@ -171,4 +214,6 @@ def read_molecule_encoding(encoding: str) -> Optional[rdkit.Chem.rdchem.Mol]:
         The molecule or None if encoding is not readable or mol is invalid.
     """
     # TODO: Read FASTA-, HELM-, MOL2-, MOL-, PDB-, PGN-, SVG-, Sequence-, SMARTS-, SMILES-, TPL-, XYZ-strings
+    from rdkit import Chem
+
     return Chem.MolFromSmiles(encoding)
@@ -1,13 +1,15 @@
 import os
-from typing import Dict, Tuple, List, Union
-import math
+from typing import Dict, Tuple, List, Union, Optional
 
 from grakel import Graph, WeisfeilerLehman, VertexHistogram
 import numpy as np
 from rdkit.Chem import MolFromSmiles
+from scipy.spatial.distance import cdist
 
-from datasail.reader.utils import DataSet
-from datasail.settings import LOGGER
+from datasail.cluster.incremental import similarity_store_path, extend_similarities
+from datasail.reader.structures import load_structure
+from datasail.reader.utils import DataSet, file_digest
+from datasail.settings import LOGGER, FORM_PDB
 
 Point = Tuple[float, float, float]
 
@@ -17,13 +19,16 @@ node_encoding = {
 }
 
 
-def run_wlk(dataset: DataSet, n_iter: int = 4) -> Tuple[List[str], Dict[str, str], np.ndarray]:
+def run_wlk(
+        dataset: DataSet, n_iter: int = 4, cache_dir: Optional[str] = None
+) -> Tuple[List[str], Dict[str, str], np.ndarray]:
     """
     Run Weisfeiler-Lehman kernel-based cluster on the input. As a result, every molecule will form its own cluster
 
     Args:
         dataset: The dataset to compute pairwise, elementwise similarities for
         n_iter: number of iterations in Weisfeiler-Lehman kernels
+        cache_dir: Directory to cache parsed structures and the similarities in, None to not cache them
 
     Returns:
         A tuple containing
@@ -36,13 +41,29 @@ def run_wlk(dataset: DataSet, n_iter: int = 4) -> Tuple[List[str], Dict[str, str
 
     LOGGER.info("Start WLK clustering")
 
-    if os.path.isfile(list(dataset.data.values())[1]):  # read PDB files into grakel graph objects
-        graphs = [pdb_to_grakel(dataset.data[name]) for name in dataset.names]
+    # datasets that have not been created by a reader have no format, they are checked based on their first payload
+    pdb_input = dataset.format == FORM_PDB or \
+        (dataset.format is None and os.path.isfile(next(iter(dataset.data.values()))))
+    if pdb_input:  # read PDB files into grakel graph objects
+        graphs = [pdb_to_grakel(dataset.data[name], cache_dir=cache_dir) for name in dataset.names]
+    elif dataset.molecules is not None:  # reuse the molecules parsed when reading the data
+        graphs = [mol_to_grakel(dataset.molecules.mol(dataset.data[name])) for name in dataset.names]
     else:  # read molecules from SMILES to grakel graph objects
         graphs = [mol_to_grakel(MolFromSmiles(dataset.data[name])) for name in dataset.names]
 
     # compute similarity metric and the mapping from element names to cluster names
-    cluster_sim = run_wl_kernel(graphs, n_iter)
+    if cache_dir is None:
+        cluster_sim = run_wl_kernel(graphs, n_iter)
+    else:
+        # the normalized kernel of two graphs does not depend on the other graphs, so the matrix of the previous run on
+        # this dataset is extended by the rows of new graphs, PDB files are identified by their content
+        if pdb_input:
+            keys = [file_digest(dataset.data[name]).hex() for name in dataset.names]
+        else:
+            keys = [dataset.data[name] for name in dataset.names]
+        path = similarity_store_path(cache_dir, f"wlk_{n_iter}", dataset.location)
+        cluster_sim = extend_similarities(
+            path, keys, lambda new: run_wl_kernel_block(graphs, new, n_iter), dtype=np.float64)
     cluster_map = dict((name, name) for name in dataset.names)
 
     return dataset.names, cluster_map, cluster_sim
@@ -66,6 +87,24 @@ def run_wl_kernel(graph_list: List[Graph], n_iter=4) -> np.ndarray:
     return result
 
 
+def run_wl_kernel_block(graph_list: List[Graph], rows: List[int], n_iter=4) -> np.ndarray:
+    """
+    Run the Weisfeiler-Lehman algorithm to compute the similarities of some graphs to all input graphs. The kernel is
+    fitted on all graphs, but only the requested rows are computed.
+
+    Args:
+        graph_list: List of grakel-graphs to compute similarities to
+        rows: Indices of the graphs to compute the similarities for
+        n_iter: number of iterations in Weisfeiler-Lehman kernels
+
+    Returns:
+        2D-numpy array of shape (len(rows), len(graph_list)) storing the similarities
+    """
+    gk = WeisfeilerLehman(n_iter=n_iter, base_graph_kernel=VertexHistogram, normalize=True)
+    gk.fit(graph_list)
+    return gk.transform([graph_list[i] for i in rows])
+
+
 def mol_to_grakel(mol) -> Graph:
     """
     Convert an RDKit molecule into a grakel graph to apply Weisfeiler-Lehman kernels later.
@@ -97,19 +136,24 @@ def mol_to_grakel(mol) -> Graph:
 class PDBStructure:
     """Structure class"""
 
-    def __init__(self, filename: str) -> None:
+    def __init__(self, filename: str, cache_dir: Optional[str] = None) -> None:
         """
-        Read the $C_{\alpha}$ atoms from a PDB file.
+        Read the $C_{\\alpha}$ atoms from a (gzipped) PDB or mmCIF file. Residues are identified by their number, if
+        multiple residues share a number, the last one is used.
 
         Args:
             filename: PDB filename to read from
+            cache_dir: Directory to cache the parsed structure in, None to not cache it
         """
-        self.residues = {}
-        with open(filename, "r") as in_file:
-            for line in in_file.readlines():
-                if line.startswith("ATOM") and line[12:16].strip() == "CA":
-                    res = Residue(line)
-                    self.residues[res.num] = res
+        structure = load_structure(filename, cache_dir)
+        nums = structure.res_nums
+        _, first = np.unique(nums, return_index=True)
+        _, last = np.unique(nums[::-1], return_index=True)
+        order = np.argsort(first)
+        last = len(nums) - 1 - last[order]
+        self.nums = nums[first[order]]
+        self.names = structure.res_names[last]
+        self.coords = structure.coords[last]
 
     def get_edges(self, threshold: float = 7) -> List[Tuple[int, int]]:
         """
@@ -121,9 +165,8 @@ class PDBStructure:
         Returns:
             A list of edges given by their residue number
         """
-        coords = [(res.num, (res.x, res.y, res.z)) for res in self.residues.values()]
-        return [(coords[i][0], coords[j][0]) for i in range(len(coords)) for j in range(len(coords)) if
-                math.dist(coords[i][1], coords[j][1]) < threshold]
+        starts, ends = np.nonzero(cdist(self.coords, self.coords) < threshold)
+        return list(zip(self.nums[starts].tolist(), self.nums[ends].tolist()))
 
     def get_nodes(self) -> Dict[int, int]:
         """
@@ -132,23 +175,24 @@ class PDBStructure:
         Returns:
             Dict mapping residue ids to a numerical encodings of the represented amino acids
         """
-        return dict(
-            [(res.num, (node_encoding.get(res.name.lower(), 20))) for i, res in enumerate(self.residues.values())])
+        return dict((num, node_encoding.get(name.lower(), 20)) for num, name in
+                    zip(self.nums.tolist(), self.names.tolist()))
 
 
-def pdb_to_grakel(pdb: Union[str, PDBStructure], threshold: float = 7) -> Graph:
+def pdb_to_grakel(pdb: Union[str, PDBStructure], threshold: float = 7, cache_dir: Optional[str] = None) -> Graph:
     """
     Convert a PDB file into a grakel graph to compute WLKs over them.
 
     Args:
         pdb: Either PDB structure or filepath to PDB file
         threshold: Distance threshold to apply when computing the graphs
+        cache_dir: Directory to cache the parsed structure in, None to not cache it
 
     Returns:
         A grakel graph based on the PDB structure
     """
     if isinstance(pdb, str):
-        pdb = PDBStructure(pdb)
+        pdb = PDBStructure(pdb, cache_dir)
 
     tmp_edges = pdb.get_edges(threshold)
     edges = {}
@@ -158,20 +202,3 @@ def pdb_to_grakel(pdb: Union[str, PDBStructure], threshold: float = 7) -> Graph:
         edges[start].append(end)
 
     return Graph(edges, node_labels=pdb.get_nodes())
-
-
-class Residue:
-    """Residue class"""
-
-    def __init__(self, line: str) -> None:
-        """
-        Read in the important information for a residue based on the line of the C-alpha atom.
-
-        Args:
-            line: Line to read from.
-        """
-        self.name = line[17:20].strip()
-        self.num = int(line[22:26].strip())
-        self.x = float(line[30:38].strip())
-        self.y = float(line[38:46].strip())
-        self.z = float(line[46:54].strip())
@@ -1,11 +1,12 @@
 import argparse
 import os
+from functools import lru_cache
 from pydoc import locate
-from typing import Dict, List, Sequence
+from typing import Dict, List, Sequence, Tuple
 
 import yaml
 
-from datasail.argparse_patch import insert_patch
+from datasail.argparse_patch import insert_patch, remove_patch
 from datasail.settings import *
 from datasail.version import __version__
 
@@ -33,6 +34,14 @@ def parse_datasail_args(args) -> Dict[str, object]:
         dest=KW_OUTDIR,
         help="Output directory to store the splits in.",
     )
+    parser.add_argument(
+        "--output-format",
+        default=OUTPUT_TSV,
+        type=str,
+        choices=OUTPUT_FORMATS,
+        dest=KW_OUTPUT_FORMAT,
+        help="File format to store the split and cluster assignments in. Parquet and Arrow require pyarrow."
+    )
     parser.add_argument(
         "-i",
         "--inter",
@@ -42,6 +51,32 @@ def parse_datasail_args(args) -> Dict[str, object]:
         help="Path to TSV file of interactions between two entities. The first entry in each line has to match an "
              "entry from the e-entity, the second matches one of the f-entity."
     )
+    parser.add_argument(
+        "--weighted-inter",
+        default=False,
+        action='store_true',
+        dest=KW_WEIGHTED_INTER,
+        help="Weight the entities by the sum of the values of their interactions instead of the number of "
+             "interactions. The values are read from the third column of the interaction file."
+    )
+    parser.add_argument(
+        "--dedup-key",
+        default=DEDUP_INCHIKEY,
+        type=str,
+        choices=DEDUP_KEYS,
+        dest=KW_DEDUP_KEY,
+        help="Identity to detect duplicate molecules by. InChIKeys are the most reliable, canonical SMILES are faster "
+             "to compute, and the connectivity layer of the InChIKey also merges stereoisomers."
+    )
+    parser.add_argument(
+        "--matrix-dtype",
+        default=None,
+        type=str,
+        choices=MATRIX_DTYPES,
+        dest=KW_MATRIX_DTYPE,
+        help="Datatype to read similarity and distance matrices from files as. float32 halves the memory footprint of "
+             "large matrices. By default, text files are read as float64 and binary files keep their datatype."
+    )
     parser.add_argument(
         "--to-sec",
         default=100,
@@ -274,7 +309,7 @@ def parse_datasail_args(args) -> Dict[str, object]:
         help="Maximal distance of two samples from the second dataset in the same split."
     )
     args = insert_patch(args)
-    return vars(parser.parse_args(args))
+    return remove_patch(**vars(parser.parse_args(args)))
 
 
 class MultiYAMLParser(argparse.ArgumentParser):
@@ -289,6 +324,10 @@ class MultiYAMLParser(argparse.ArgumentParser):
         if algo_name is not None:
             self.add_yaml_arguments(YAML_FILE_NAMES[algo_name])
 
+        # defaults and option names are fixed once all arguments are added, compute them once for all user arguments
+        self.defaults = self.parse_args([])
+        self.action_map = {action.dest: action.option_strings[0] for action in self._actions}
+
     def parse_args(self, args: Optional[Sequence[str]] = ...) -> argparse.Namespace:
         """
         Parse the arguments provided by the user. This prepends some preprocessing to the arguments before sending them
@@ -315,25 +354,8 @@ class MultiYAMLParser(argparse.ArgumentParser):
         Args:
             yaml_filepath: Path to the YAML file to read the arguments from.
         """
-        with open(os.path.join(os.path.dirname(os.path.realpath(__file__)), yaml_filepath), "r") as data:
-            data = yaml.safe_load(data)
-        for name, values in data.items():
-            kwargs = {"dest": name.replace("-", "_"), "type": locate(values["type"])}
-            if kwargs["type"] == bool:
-                if not values["default"]:
-                    kwargs.update({"action": "store_true", "default": False})
-                else:
-                    kwargs.update({"action": "store_false", "default": True})
-                del kwargs["type"]
-            else:
-                if values["cardinality"] != 0:
-                    kwargs["nargs"] = values["cardinality"]
-                if values["default"] is not None:
-                    kwargs["default"] = values["default"]
-            super().add_argument(
-                *values["calls"],
-                **kwargs,
-            )
+        for calls, kwargs in load_yaml_arguments(yaml_filepath):
+            super().add_argument(*calls, **kwargs)
 
     def get_user_arguments(self, args: argparse.Namespace, ds_args: List[str]) -> str:
         """
@@ -346,14 +368,60 @@ class MultiYAMLParser(argparse.ArgumentParser):
         Returns:
             String representation of the arguments that the user provided for the program to be passed to subprograms.
         """
-        cleaned_args = namespace_diff(args, self.parse_args([]))
-        action_map = {action.dest: action.option_strings[0] for action in self._actions}
+        cleaned_args = namespace_diff(args, self.defaults)
 
         for key in ds_args:
             if key in cleaned_args:
                 del cleaned_args[key]
 
-        return " ".join([f"{action_map[key]} {value}" for key, value in cleaned_args.items()])
+        return " ".join([f"{self.action_map[key]} {value}" for key, value in cleaned_args.items()])
+
+
+@lru_cache(maxsize=None)
+def get_yaml_parser(algo_name: str) -> MultiYAMLParser:
+    """
+    Get the argument parser for an algorithm. The parsers are built once per process and shared between all calls as
+    parsing arguments does not change them.
+
+    Args:
+        algo_name: Name of the algorithm to parse arguments for.
+
+    Returns:
+        The argument parser for the algorithm.
+    """
+    return MultiYAMLParser(algo_name)
+
+
+@lru_cache(maxsize=None)
+def load_yaml_arguments(yaml_filepath: str) -> Tuple[Tuple[Tuple[str, ...], Dict[str, object]], ...]:
+    """
+    Read the specification of the arguments of a tool from a YAML file and convert it into arguments for argparse. The
+    specifications are read only once per process.
+
+    Args:
+        yaml_filepath: Path to the YAML file to read the arguments from, relative to the package.
+
+    Returns:
+        Pairs of the option strings and the keyword arguments to add every argument with.
+    """
+    with open(os.path.join(os.path.dirname(os.path.realpath(__file__)), yaml_filepath), "r") as data:
+        data = yaml.safe_load(data)
+    arguments = []
+    for name, values in data.items():
+        kwargs = {"dest": name.replace("-", "_"), "type": locate(values["type"])}
+        if kwargs["type"] == bool:
+            if not values["default"]:
+                kwargs.update({"action": "store_true", "default": False})
+            else:
+                kwargs.update({"action": "store_false", "default": True})
+            del kwargs["type"]
+        else:
+            if values["cardinality"] != 0:
+                kwargs["nargs"] = values["cardinality"]
+            if values["default"] is not None:
+                kwargs["default"] = values["default"]
+        arguments.append((tuple(values["calls"]), kwargs))
+    return tuple(arguments)
 
 
 def namespace_diff(a: argparse.Namespace, b: argparse.Namespace) -> dict:
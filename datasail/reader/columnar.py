@@ -0,0 +1,79 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.feather as feather
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+
+PARQUET_FORMATS = (".parquet", ".pq")
+ARROW_FORMATS = (".arrow", ".feather", ".ipc")
+COLUMNAR_FORMATS = PARQUET_FORMATS + ARROW_FORMATS
+
+
+def is_columnar(path: str) -> bool:
+    """
+    Check if a file stores a table in a columnar format based on its extension.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        True if the file is a Parquet or Arrow IPC (Feather) file
+    """
+    return str(path).lower().endswith(COLUMNAR_FORMATS)
+
+
+def check_pyarrow(path: str) -> None:
+    """
+    Make sure that pyarrow is available to read or write a columnar file.
+
+    Args:
+        path: Path to the columnar file
+    """
+    if pyarrow is None:
+        raise ValueError(f"Reading and writing Parquet or Arrow files such as {path} requires the pyarrow package.")
+
+
+def read_columnar(path: str, num_columns: int = 2) -> Tuple[np.ndarray, ...]:
+    """
+    Read the first columns of a Parquet or Arrow IPC file. Only the requested columns are loaded. The files are
+    memory-mapped, so numeric columns without missing values are converted into numpy arrays without copying them.
+    Unlike TSV files, the column names are stored in the schema, so no row is skipped as header.
+
+    Args:
+        path: Path to the columnar file
+        num_columns: Number of leading columns to read
+
+    Returns:
+        The requested columns of the file
+    """
+    check_pyarrow(path)
+    if path.lower().endswith(PARQUET_FORMATS):
+        columns = parquet.ParquetFile(path).schema_arrow.names[:num_columns]
+        table = parquet.read_table(path, columns=columns, memory_map=True)
+    else:
+        table = feather.read_table(path, columns=list(range(num_columns)), memory_map=True)
+    if table.num_columns < num_columns:
+        raise ValueError(f"The table in {path} has {table.num_columns} columns, but {num_columns} are required.")
+    return tuple(column.to_numpy() for column in table.columns)
+
+
+def write_columnar(df: pd.DataFrame, path: str) -> None:
+    """
+    Write a table into a Parquet or Arrow IPC file depending on the extension of the path.
+
+    Args:
+        df: Table to store
+        path: Path to the output file
+    """
+    check_pyarrow(path)
+    table = pyarrow.Table.from_pandas(df, preserve_index=False)
+    if path.lower().endswith(PARQUET_FORMATS):
+        parquet.write_table(table, path)
+    else:
+        feather.write_feather(table, path)
@@ -0,0 +1,84 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import tempfile
+from typing import IO, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_SUFFIXES = (".gz", ".bz2", ".xz", ".zst")
+
+# temporary directory holding intermediate files such as spooled inputs, removed when DataSAIL exits
+_SPILL_DIR: Optional[tempfile.TemporaryDirectory] = None
+
+
+def is_compressed(path: str) -> bool:
+    """
+    Check if a file is compressed based on its extension.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        True if the file is compressed with gzip, bzip2, xz, or zstd
+    """
+    return str(path).lower().endswith(COMPRESSION_SUFFIXES)
+
+
+def strip_compression(path: str) -> str:
+    """
+    Remove the compression extension from a filename to detect the format of the compressed content.
+
+    Args:
+        path: Filename
+
+    Returns:
+        The filename without the compression extension, e.g., "seqs.fasta" for "seqs.fasta.gz"
+    """
+    return os.path.splitext(path)[0] if is_compressed(path) else path
+
+
+def open_file(path: str, mode: str = "rt") -> IO:
+    """
+    Open a file for reading and decompress it on the fly if it is compressed.
+
+    Args:
+        path: Path to the file
+        mode: Mode to open the file in, either "rt" or "rb"
+
+    Returns:
+        A stream of the (decompressed) content of the file
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".gz":
+        return gzip.open(path, mode)
+    if suffix == ".bz2":
+        return bz2.open(path, mode)
+    if suffix == ".xz":
+        return lzma.open(path, mode)
+    if suffix == ".zst":
+        if zstandard is None:
+            raise ValueError(f"Reading zstd-compressed files such as {path} requires the zstandard package.")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.TextIOWrapper(stream) if "t" in mode else stream
+    return open(path, mode)
+
+
+def spill_dir() -> str:
+    """
+    Get the temporary directory to store intermediate files of this run in. The directory is created on first use and
+    removed when DataSAIL exits.
+
+    Returns:
+        Path to the temporary directory
+    """
+    global _SPILL_DIR
+    if _SPILL_DIR is None:
+        _SPILL_DIR = tempfile.TemporaryDirectory(prefix="datasail_")
+    return _SPILL_DIR.name
+
@@ -0,0 +1,126 @@
+import hashlib
+import mmap
+import os
+from typing import Dict, Union
+
+from datasail.reader.compression import is_compressed, open_file
+from datasail.reader.file_index import FileIndex, Index, load_file_index
+
+FASTA_INDEX_SUFFIX = ".fidx"
+FASTA_INDEX_HEADER = "#datasail-fasta-index"
+
+# characters that are part of the file but not of the sequence itself
+_WHITESPACE = b" \t\r\n"
+
+
+class FastaIndex(FileIndex):
+    """
+    Memory-mapped view on a FASTA file. Only the byte ranges of the records are kept in memory, the sequences are read
+    from the file whenever they are accessed. The mapping from sequence IDs to byte ranges is stored next to the FASTA
+    file, so subsequent runs on the same file do not have to scan it again.
+    """
+
+    index_suffix = FASTA_INDEX_SUFFIX
+    index_header = FASTA_INDEX_HEADER
+
+    @staticmethod
+    def build_index(path: str) -> Index:
+        return build_fasta_index(path)
+
+    def decode(self, raw: bytes) -> str:
+        return raw.translate(None, _WHITESPACE).decode("ascii")
+
+    def digest(self, key: str) -> bytes:
+        """
+        Compute a digest of a sequence that is equal for two sequences iff the sequences are equal.
+
+        Args:
+            key: ID of the sequence
+
+        Returns:
+            SHA1 digest of the sequence
+        """
+        return hashlib.sha1(self.raw(key).translate(None, _WHITESPACE)).digest()
+
+
+def open_fasta(path: str) -> Union[FastaIndex, Dict[str, str]]:
+    """
+    Open a FASTA file. Plain files are indexed and memory-mapped, compressed files cannot be accessed randomly and are
+    decompressed on the fly while reading all sequences into memory.
+
+    Args:
+        path: Path to the (compressed) FASTA file
+
+    Returns:
+        Mapping from sequence IDs to sequences
+    """
+    if is_compressed(path):
+        return read_fasta(path)
+    return FastaIndex(path)
+
+
+def read_fasta(path: str) -> Dict[str, str]:
+    """
+    Read all sequences from a (compressed) FASTA file in one streaming pass.
+
+    Args:
+        path: Path to the FASTA file
+
+    Returns:
+        Mapping from sequence IDs to sequences
+    """
+    seqs, name, parts = {}, None, []
+    with open_file(path, "rt") as data:
+        for line in data:
+            if line.startswith(">"):
+                if name is not None:
+                    seqs[name] = "".join(parts)
+                name, parts = line[1:].rstrip(), []
+            elif name is not None:
+                parts.append("".join(line.split()))
+    if name is not None:
+        seqs[name] = "".join(parts)
+    return seqs
+
+
+def build_fasta_index(path: str) -> Index:
+    """
+    Scan a FASTA file once and compute the byte ranges of all sequences in it.
+
+    Args:
+        path: Path to the FASTA file
+
+    Returns:
+        Mapping from sequence IDs to the start and end offset of their sequences in the file
+    """
+    index = {}
+    if os.path.getsize(path) == 0:
+        return index
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        pos = 0 if mm[:1] == b">" else mm.find(b"\n>")
+        while pos != -1:
+            if mm[pos:pos + 1] == b"\n":
+                pos += 1
+            header_end = mm.find(b"\n", pos)
+            if header_end == -1:
+                header_end = size
+            entry_id = mm[pos + 1:header_end].rstrip().decode()
+            next_pos = mm.find(b"\n>", header_end)
+            index[entry_id] = (header_end, size if next_pos == -1 else next_pos)
+            pos = next_pos
+    return index
+
+
+def load_fasta_index(path: str) -> Index:
+    """
+    Load the sidecar offset index of a FASTA file. If there is no index or the FASTA file changed since the index has
+    been created, a new one is built and stored next to the FASTA file (if the directory is writable).
+
+    Args:
+        path: Path to the FASTA file
+
+    Returns:
+        Mapping from sequence IDs to the start and end offset of their sequences in the file
+    """
+    return load_file_index(path, FASTA_INDEX_SUFFIX, FASTA_INDEX_HEADER, build_fasta_index)
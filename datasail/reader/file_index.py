@@ -0,0 +1,184 @@
+import hashlib
+import mmap
+import os
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+from typing import Dict, Tuple, Iterator, Optional, Callable
+
+from datasail.settings import LOGGER
+
+Index = Dict[str, Tuple[int, int]]
+
+
+class FileIndex(MutableMapping, ABC):
+    """
+    Memory-mapped view on a file storing one payload per entity. Only the byte ranges of the payloads are kept in
+    memory, the payloads are read from the file whenever they are accessed. The mapping from IDs to byte ranges is
+    stored next to the file, so subsequent runs on the same file do not have to scan it again. Subclasses define how
+    a file is scanned and how the raw bytes are decoded.
+    """
+
+    index_suffix = ".idx"
+    index_header = "#datasail-index"
+
+    def __init__(self, path: str, index: Optional[Index] = None) -> None:
+        """
+        Open a file and load or build the offset index for it.
+
+        Args:
+            path: Path to the file
+            index: Mapping from IDs to the byte ranges of their payloads, computed if not given
+        """
+        self.path = os.path.abspath(path)
+        self._mmap = None
+        self._handle = None
+        self._index = index if index is not None else \
+            load_file_index(self.path, self.index_suffix, self.index_header, self.build_index)
+
+    def __getitem__(self, key: str) -> str:
+        return self.decode(self.raw(key))
+
+    def __setitem__(self, key: str, value: str) -> None:
+        raise TypeError(f"Entries in a {type(self).__name__} are read-only.")
+
+    def __delitem__(self, key: str) -> None:
+        del self._index[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __hash__(self) -> int:
+        return hash((self.signature(), tuple(self._index.items())))
+
+    def __getstate__(self) -> dict:
+        # memory maps cannot be pickled or deep-copied, they are reopened lazily
+        state = self.__dict__.copy()
+        state["_mmap"], state["_handle"] = None, None
+        return state
+
+    def __del__(self) -> None:
+        self.close()
+
+    @staticmethod
+    @abstractmethod
+    def build_index(path: str) -> Index:
+        """
+        Scan a file once and compute the byte ranges of all payloads in it.
+
+        Args:
+            path: Path to the file
+
+        Returns:
+            Mapping from IDs to the start and end offset of their payloads in the file
+        """
+
+    def signature(self) -> Tuple:
+        """
+        Identify the content of the file without reading it. Like for the sidecar index, a file is considered unchanged
+        as long as its size and modification time are the same.
+
+        Returns:
+            Tuple of the path, the size, and the modification time of the file
+        """
+        stat = os.stat(self.path)
+        return self.path, stat.st_size, stat.st_mtime_ns
+
+    def decode(self, raw: bytes) -> str:
+        """
+        Convert the raw bytes of a payload into the payload.
+
+        Args:
+            raw: Bytes of the payload as stored in the file
+
+        Returns:
+            The payload
+        """
+        return raw.decode()
+
+    def _map(self):
+        """
+        Get the memory map of the file and open it if necessary.
+
+        Returns:
+            The memory-mapped content of the file
+        """
+        if self._mmap is None:
+            self._handle = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def close(self) -> None:
+        """
+        Release the memory map and the file handle.
+        """
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._handle.close()
+            self._mmap, self._handle = None, None
+
+    def raw(self, key: str) -> bytes:
+        """
+        Get the raw bytes of a payload as stored in the file.
+
+        Args:
+            key: ID of the entity
+
+        Returns:
+            The bytes of the payload
+        """
+        start, end = self._index[key]
+        return self._map()[start:end]
+
+    def digest(self, key: str) -> bytes:
+        """
+        Compute a digest of a payload that is equal for two payloads iff the payloads are equal.
+
+        Args:
+            key: ID of the entity
+
+        Returns:
+            SHA1 digest of the payload
+        """
+        return hashlib.sha1(self.decode(self.raw(key)).encode()).digest()
+
+
+def load_file_index(path: str, suffix: str, header: str, build: Callable[[str], Index]) -> Index:
+    """
+    Load the sidecar offset index of a file. If there is no index or the file changed since the index has been
+    created, a new one is built and stored next to the file (if the directory is writable).
+
+    Args:
+        path: Path to the indexed file
+        suffix: Suffix of the sidecar index file
+        header: Header identifying the type of the index
+        build: Function to compute the index of the file
+
+    Returns:
+        Mapping from IDs to the start and end offset of their payloads in the file
+    """
+    stat = os.stat(path)
+    signature = f"{header}\t{stat.st_size}\t{stat.st_mtime_ns}"
+    index_path = path + suffix
+
+    if os.path.isfile(index_path):
+        with open(index_path, "r") as data:
+            if data.readline().rstrip("\n") == signature:
+                index = {}
+                for line in data:
+                    entry_id, start, end = line.rstrip("\n").rsplit("\t", 2)
+                    index[entry_id] = (int(start), int(end))
+                return index
+
+    index = build(path)
+    try:
+        # write to a temporary file first to never leave a truncated index behind
+        with open(index_path + ".tmp", "w") as out:
+            out.write(signature + "\n")
+            out.writelines(f"{entry_id}\t{start}\t{end}\n" for entry_id, (start, end) in index.items())
+        os.replace(index_path + ".tmp", index_path)
+    except OSError:
+        LOGGER.info(f"Cannot store the index next to {path}, it will be recomputed in the next run.")
+    return index
@@ -0,0 +1,286 @@
+import hashlib
+import math
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple, List, TypeVar
+
+from rdkit import Chem, rdBase
+
+from datasail.settings import LOGGER, DEDUP_INCHIKEY, DEDUP_SMILES, DEDUP_CONNECTIVITY
+
+MOLECULE_STORE_DIR = "molecules"
+
+# smallest number of molecules to send to a worker process, smaller chunks do not pay off the communication
+MIN_CHUNK_SIZE = 1000
+
+T = TypeVar("T")
+
+# canonical SMILES, InChIKey (None if not computed), and (optionally) the binary representation of the RDKit molecule
+MoleculeRecord = Tuple[str, Optional[str], Optional[bytes]]
+
+
+@contextmanager
+def silent_rdkit() -> Iterator[None]:
+    """
+    Suppress the warnings and errors RDKit logs for every invalid molecule. The previous log levels are restored when
+    leaving the context, so the logging of the calling process is not changed.
+    """
+    block = rdBase.BlockLogs()
+    try:
+        yield
+    finally:
+        del block
+
+
+def parse_molecule(encoding: str, keep_mol: bool = False, with_inchi: bool = True) -> Optional[MoleculeRecord]:
+    """
+    Parse a molecule once and extract all representations that are used later on.
+
+    Args:
+        encoding: SMILES string of the molecule
+        keep_mol: Flag indicating to keep the binary representation of the parsed RDKit molecule
+        with_inchi: Flag indicating to compute the InChIKey, which is the most expensive part of parsing
+
+    Returns:
+        The record of the molecule or None if RDKit cannot parse the molecule
+    """
+    mol = Chem.MolFromSmiles(encoding)
+    if mol is None:
+        return None
+    return (
+        Chem.MolToSmiles(mol),
+        Chem.MolToInchiKey(mol) if with_inchi else None,
+        mol.ToBinary() if keep_mol else None,
+    )
+
+
+def parse_molecule_chunk(
+        encodings: List[str], keep_mol: bool = False, with_inchi: bool = True
+) -> List[Optional[MoleculeRecord]]:
+    """
+    Parse a chunk of molecules, this is the unit of work of one worker process.
+
+    Args:
+        encodings: SMILES strings of the molecules
+        keep_mol: Flag indicating to keep the binary representations of the parsed RDKit molecules
+        with_inchi: Flag indicating to compute the InChIKeys
+
+    Returns:
+        The records of the molecules in the same order as the input
+    """
+    with silent_rdkit():
+        return [parse_molecule(encoding, keep_mol, with_inchi) for encoding in encodings]
+
+
+def map_chunks(
+        func: Callable[[list], T], items: list, threads: int = 1, chunk_size: Optional[int] = None
+) -> List[T]:
+    """
+    Apply a function to chunks of items, in a pool of processes if multiple threads are given. Every process gets
+    about four chunks, but chunks are never smaller than MIN_CHUNK_SIZE to pay off the communication.
+
+    Args:
+        func: Function processing a chunk of items, must be picklable
+        items: The items to process
+        threads: Number of processes to use
+        chunk_size: Number of items per chunk, by default, every process gets about four chunks
+
+    Returns:
+        The results of the chunks in the order of the items
+    """
+    if chunk_size is None:
+        chunk_size = max(MIN_CHUNK_SIZE, math.ceil(len(items) / (4 * max(threads, 1))))
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    if threads > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(threads, len(chunks))) as executor:
+            results = list(executor.map(func, chunks))
+    else:
+        results = [func(chunk) for chunk in chunks]
+    return results
+
+
+class MoleculeStore:
+    """
+    Store of parsed molecules of a dataset. Every molecule is parsed by RDKit only once and all consumers (duplicate
+    removal, ECFP, WLK) read the canonical representations from here. If a cache directory is given, the store is
+    persisted there, so later runs on the same molecules do not have to parse them at all.
+    """
+
+    def __init__(self, keep_mols: bool = False, path: Optional[str] = None, with_inchi: bool = True) -> None:
+        """
+        Create an empty store.
+
+        Args:
+            keep_mols: Flag indicating to keep the binary RDKit molecules to skip parsing when accessing molecules
+            path: Path to persist the store at, None to keep it in memory only
+            with_inchi: Flag indicating to compute InChIKeys while parsing, otherwise they are computed on access
+        """
+        self.keep_mols = keep_mols
+        self.path = path
+        self.with_inchi = with_inchi
+        self._records: Dict[str, Optional[MoleculeRecord]] = {}
+
+    @classmethod
+    def for_encodings(
+            cls,
+            encodings: Iterable[str],
+            cache_dir: Optional[str] = None,
+            keep_mols: bool = False,
+            with_inchi: bool = True,
+            num_threads: int = 1,
+    ) -> "MoleculeStore":
+        """
+        Build the store for a set of molecules or load it from the cache directory if it has been built before.
+
+        Args:
+            encodings: SMILES strings of the molecules of the dataset
+            cache_dir: Directory to persist the store in, None to not persist it
+            keep_mols: Flag indicating to keep the binary RDKit molecules
+            with_inchi: Flag indicating to compute the InChIKeys of all molecules while parsing
+            num_threads: Number of processes to parse the molecules with
+
+        Returns:
+            The store holding all given molecules
+        """
+        encodings = list(encodings)
+        path = None
+        if cache_dir is not None:
+            digest = hashlib.sha1("\n".join(sorted(set(encodings))).encode()).hexdigest()
+            path = os.path.join(cache_dir, MOLECULE_STORE_DIR, f"{digest}.pkl")
+            if os.path.isfile(path):
+                with open(path, "rb") as data:
+                    store = pickle.load(data)
+                if (store.keep_mols or not keep_mols) and (store.with_inchi or not with_inchi):
+                    LOGGER.info(f"Loaded {len(store)} parsed molecules from cache")
+                    return store
+
+        store = cls(keep_mols, path, with_inchi)
+        store.parse(encodings, num_threads)
+        store.save()
+        return store
+
+    def __deepcopy__(self, memo: dict) -> "MoleculeStore":
+        # the store only caches parsing results, copies of a dataset can safely share it
+        return self
+
+    def __contains__(self, encoding: str) -> bool:
+        return encoding in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def parse(self, encodings: Iterable[str], num_threads: int = 1, chunk_size: Optional[int] = None) -> None:
+        """
+        Parse all molecules that are not in the store yet. With multiple threads, the molecules are split into chunks
+        that are parsed in a pool of processes.
+
+        Args:
+            encodings: SMILES strings of the molecules to add
+            num_threads: Number of processes to parse the molecules with
+            chunk_size: Number of molecules per task, by default, every process gets about four chunks
+        """
+        todo = list(dict.fromkeys(encoding for encoding in encodings if encoding not in self._records))
+        parse_chunk = partial(parse_molecule_chunk, keep_mol=self.keep_mols, with_inchi=self.with_inchi)
+        records = (record for chunk in map_chunks(parse_chunk, todo, num_threads, chunk_size) for record in chunk)
+        self._records.update(zip(todo, records))
+
+    def record(self, encoding: str) -> Optional[MoleculeRecord]:
+        """
+        Get the record of a molecule and parse it if it is not in the store yet.
+
+        Args:
+            encoding: SMILES string of the molecule
+
+        Returns:
+            The record of the molecule or None if RDKit cannot parse it
+        """
+        if encoding not in self._records:
+            self._records[encoding] = parse_molecule(encoding, self.keep_mols, self.with_inchi)
+        return self._records[encoding]
+
+    def canonical(self, encoding: str) -> Optional[str]:
+        """
+        Get the canonical SMILES of a molecule.
+
+        Args:
+            encoding: SMILES string of the molecule
+
+        Returns:
+            The canonical SMILES or None if RDKit cannot parse the molecule
+        """
+        record = self.record(encoding)
+        return None if record is None else record[0]
+
+    def inchikey(self, encoding: str) -> Optional[str]:
+        """
+        Get the InChIKey of a molecule. If the store has been built without InChIKeys, it is computed now.
+
+        Args:
+            encoding: SMILES string of the molecule
+
+        Returns:
+            The InChIKey or None if RDKit cannot parse the molecule
+        """
+        record = self.record(encoding)
+        if record is None:
+            return None
+        if record[1] is None:
+            record = (record[0], Chem.MolToInchiKey(self.mol(encoding)), record[2])
+            self._records[encoding] = record
+        return record[1]
+
+    def key(self, encoding: str, kind: str = DEDUP_INCHIKEY) -> Optional[str]:
+        """
+        Get the identity of a molecule to detect duplicates by. Molecules that InChI cannot describe fall back to their
+        canonical SMILES.
+
+        Args:
+            encoding: SMILES string of the molecule
+            kind: Type of identity, either the InChIKey, the canonical SMILES, or the connectivity layer of the InChIKey
+
+        Returns:
+            The identity of the molecule or None if RDKit cannot parse the molecule
+        """
+        if kind not in {DEDUP_INCHIKEY, DEDUP_SMILES, DEDUP_CONNECTIVITY}:
+            raise ValueError(f"Unknown identity to detect duplicate molecules by: {kind}")
+        canonical = self.canonical(encoding)
+        if canonical is None or kind == DEDUP_SMILES:
+            return canonical
+        inchikey = self.inchikey(encoding)
+        if not inchikey:
+            return canonical
+        return inchikey[:14] if kind == DEDUP_CONNECTIVITY else inchikey
+
+    def mol(self, encoding: str) -> Optional[Chem.Mol]:
+        """
+        Get a fresh RDKit molecule. If the binary molecule is stored, this skips parsing the SMILES string.
+
+        Args:
+            encoding: SMILES string of the molecule
+
+        Returns:
+            The RDKit molecule or None if RDKit cannot parse the molecule
+        """
+        record = self.record(encoding)
+        if record is None:
+            return None
+        if record[2] is not None:
+            return Chem.Mol(record[2])
+        return Chem.MolFromSmiles(record[0])
+
+    def save(self) -> None:
+        """
+        Persist the store if it has a path. Failing to write the store only costs time in the next run.
+        """
+        if self.path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "wb") as out:
+                pickle.dump(self, out)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError:
+            LOGGER.info(f"Cannot store the parsed molecules in {os.path.dirname(self.path)}.")
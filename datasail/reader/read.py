@@ -1,14 +1,15 @@
+from functools import partial
 from typing import List, Callable, Generator
 
+from datasail.cluster.caching import get_cache_dir
 from datasail.reader.read_genomes import read_genome_data
-from datasail.reader.read_molecules import read_molecule_data
 from datasail.reader.read_other import read_other_data
 from datasail.reader.read_proteins import read_protein_data
-from datasail.reader.utils import read_csv, DataSet
+from datasail.reader.utils import read_columns, DataSet, InteractionTable
 from datasail.settings import *
 
 
-def read_data(**kwargs) -> Tuple[DataSet, DataSet, Optional[List[Tuple[str, str]]]]:
+def read_data(**kwargs) -> Tuple[DataSet, DataSet, Optional[InteractionTable]]:
     """
     Read data from the input arguments.
 
@@ -16,27 +17,32 @@ def read_data(**kwargs) -> Tuple[DataSet, DataSet, Optional[List[Tuple[str, str]
         **kwargs: Arguments from commandline
 
     Returns:
-        Two datasets storing the information on the input entities and a list of interactions between
+        Two datasets storing the information on the input entities and a table of interactions between them
     """
     # TODO: Semantic checks of arguments
+    weighted = kwargs.get(KW_WEIGHTED_INTER, False)
     if kwargs[KW_INTER] is None:
         inter = None
     elif isinstance(kwargs[KW_INTER], str):
-        inter = list(tuple(x) for x in read_csv(kwargs[KW_INTER]))
-    elif isinstance(kwargs[KW_INTER], list):
-        inter = kwargs[KW_INTER]
+        inter = InteractionTable.from_columns(*read_columns(kwargs[KW_INTER], 3 if weighted else 2, 2))
+    elif isinstance(kwargs[KW_INTER], (list, InteractionTable)):
+        inter = InteractionTable.from_pairs(kwargs[KW_INTER], weighted)
     elif isinstance(kwargs[KW_INTER], Callable):
-        inter = kwargs[KW_INTER]()
+        inter = InteractionTable.from_pairs(kwargs[KW_INTER](), weighted)
     elif isinstance(kwargs[KW_INTER], Generator):
-        inter = list(kwargs[KW_INTER])
+        inter = InteractionTable.from_pairs(kwargs[KW_INTER], weighted)
     else:
         raise ValueError()
 
-    e_dataset = read_data_type(kwargs[KW_E_TYPE])(
+    threads = kwargs.get(KW_THREADS, 1)
+    cache_dir = get_cache_dir(**kwargs) if kwargs.get(KW_CACHE, False) else None
+    dedup_key = kwargs.get(KW_DEDUP_KEY, DEDUP_INCHIKEY)
+    matrix_dtype = kwargs.get(KW_MATRIX_DTYPE, None)
+    e_dataset = read_data_type(kwargs[KW_E_TYPE], threads, cache_dir, dedup_key, matrix_dtype)(
         kwargs[KW_E_DATA], kwargs[KW_E_WEIGHTS], kwargs[KW_E_SIM], kwargs[KW_E_DIST], kwargs[KW_E_MAX_SIM],
         kwargs[KW_E_MAX_DIST], inter, 0, kwargs[KW_E_ARGS],
     )
-    f_dataset = read_data_type(kwargs[KW_F_TYPE])(
+    f_dataset = read_data_type(kwargs[KW_F_TYPE], threads, cache_dir, dedup_key, matrix_dtype)(
         kwargs[KW_F_DATA], kwargs[KW_F_WEIGHTS], kwargs[KW_F_SIM], kwargs[KW_F_DIST], kwargs[KW_F_MAX_SIM],
         kwargs[KW_F_MAX_DIST], inter, 1, kwargs[KW_F_ARGS],
     )
@@ -44,24 +50,39 @@ def read_data(**kwargs) -> Tuple[DataSet, DataSet, Optional[List[Tuple[str, str]
     return e_dataset, f_dataset, inter
 
 
-def read_data_type(data_type: chr) -> Callable:
+def read_data_type(
+        data_type: chr,
+        num_threads: int = 1,
+        cache_dir: Optional[str] = None,
+        dedup_key: str = DEDUP_INCHIKEY,
+        matrix_dtype: Optional[str] = None,
+) -> Callable:
     """
     Convert single-letter representation of the type of data to handle to the full name.
 
     Args:
         data_type: Single letter representation of the type of data
+        num_threads: Number of threads the reader may use, if it supports parallel reading
+        cache_dir: Directory to persist intermediate results of reading in, None to not persist them
+        dedup_key: Identity to detect duplicate molecules by
+        matrix_dtype: Datatype to read similarity and distance matrices from files as, None to keep their datatype
 
     Returns:
         full name of the type of data
     """
     if data_type == "P":
-        return read_protein_data
+        return partial(read_protein_data, cache_dir=cache_dir, matrix_dtype=matrix_dtype)
     elif data_type == "M":
-        return read_molecule_data
+        # RDKit is only imported when molecules are read
+        from datasail.reader.read_molecules import read_molecule_data
+        return partial(
+            read_molecule_data, num_threads=num_threads, cache_dir=cache_dir, dedup_key=dedup_key,
+            matrix_dtype=matrix_dtype,
+        )
     elif data_type == "G":
-        return read_genome_data
+        return partial(read_genome_data, num_threads=num_threads, matrix_dtype=matrix_dtype)
     elif data_type == "O":
-        return read_other_data
+        return partial(read_other_data, matrix_dtype=matrix_dtype)
     else:
         return read_none_data
 
@@ -1,9 +1,13 @@
 import os
 from typing import List, Tuple, Optional, Generator, Callable, Iterable, Union
 
-from datasail.reader.read_molecules import remove_duplicate_values
-from datasail.reader.read_proteins import parse_fasta
-from datasail.reader.utils import DataSet, read_data, DATA_INPUT, MATRIX_INPUT, read_folder, read_csv
+from datasail.reader.compression import strip_compression
+from datasail.reader.fasta import open_fasta
+from datasail.reader.file_index import FileIndex
+from datasail.reader.read_proteins import payload_digests
+from datasail.reader.tsv import open_tsv, open_entries, spool_tsv
+from datasail.reader.utils import DataSet, read_data, DATA_INPUT, MATRIX_INPUT, read_folder, \
+    InteractionTable, file_digests, remove_duplicate_values
 from datasail.settings import G_TYPE, UNK_LOCATION, FORM_FASTA, FASTA_FORMATS, FORM_GENOMES
 
 
@@ -14,9 +18,11 @@ def read_genome_data(
         dist: MATRIX_INPUT = None,
         max_sim: float = 1.0,
         max_dist: float = 1.0,
-        inter: Optional[List[Tuple[str, str]]] = None,
+        inter: Optional[Union[InteractionTable, List[Tuple[str, str]]]] = None,
         index: Optional[int] = None,
         tool_args: str = "",
+        num_threads: int = 1,
+        matrix_dtype: Optional[str] = None,
 ) -> DataSet:
     """
     Read in genomic data, compute the weights, and distances or similarities of every entity.
@@ -31,16 +37,18 @@ def read_genome_data(
         inter: Interaction, alternative way to compute weights
         index: Index of the entities in the interaction file
         tool_args: Additional arguments for the tool
+        num_threads: Number of threads to hash the files of a folder of genomes in
+        matrix_dtype: Datatype to read similarity and distance matrices from files as, None to keep their datatype
 
     Returns:
         A dataset storing all information on that datatype
     """
     dataset = DataSet(type=G_TYPE, location=UNK_LOCATION, format=FORM_FASTA)
     if isinstance(data, str):
-        if data.split(".")[-1].lower() in FASTA_FORMATS:
-            dataset.data = parse_fasta(data)
+        if strip_compression(data).split(".")[-1].lower() in FASTA_FORMATS:
+            dataset.data = open_fasta(data)
         elif os.path.isfile(data):
-            dataset.data = dict(read_csv(data))
+            dataset.data = open_tsv(data)
         elif os.path.isdir(data):
             dataset.data = dict(read_folder(data))
             dataset.format = FORM_GENOMES
@@ -49,15 +57,19 @@ def read_genome_data(
         dataset.location = data
     elif isinstance(data, Union[list, tuple]) and isinstance(data[0], Iterable) and len(data[0]) == 2:
         dataset.data = dict(data)
-    elif isinstance(data, dict):
+    elif isinstance(data, (dict, FileIndex)):
         dataset.data = data
     elif isinstance(data, Callable):
-        dataset.data = data()
+        dataset.data = open_entries(data())
     elif isinstance(data, Generator):
-        dataset.data = dict(data)
+        dataset.data = spool_tsv(data)
     else:
         raise ValueError()
 
-    dataset = read_data(weights, sim, dist, max_sim, max_dist, inter, index, tool_args, dataset)
-    dataset = remove_duplicate_values(dataset, dataset.data)
+    dataset = read_data(weights, sim, dist, max_sim, max_dist, inter, index, tool_args, dataset, matrix_dtype)
+    if dataset.format == FORM_GENOMES:
+        # merge byte-identical genomes before they are sketched by MASH, independent of their filenames
+        dataset = remove_duplicate_values(dataset, file_digests(dataset.data, num_threads))
+    else:
+        dataset = remove_duplicate_values(dataset, payload_digests(dataset.data))
     return dataset
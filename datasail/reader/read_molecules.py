@@ -1,13 +1,20 @@
 import os
-from typing import List, Tuple, Optional, Callable, Generator, Union, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Optional, Callable, Generator, Union, Iterable, Dict
 
-import numpy as np
 from rdkit import Chem
 from rdkit.Chem import MolFromMol2File, MolFromMolFile, MolFromPDBFile, MolFromPNGFile, \
-    MolFromTPLFile, MolFromXYZFile
+    MolFromTPLFile, MolFromXYZFile, MolFromMol2Block, MolFromMolBlock, MolFromPDBBlock, MolFromPNGString, \
+    MolFromTPLBlock, MolFromXYZBlock
 
-from datasail.reader.utils import read_csv, DataSet, read_data, DATA_INPUT, MATRIX_INPUT
-from datasail.settings import M_TYPE, UNK_LOCATION, FORM_SMILES
+from datasail.reader.columnar import is_columnar
+from datasail.reader.compression import is_compressed, open_file, strip_compression
+from datasail.reader.file_index import FileIndex
+from datasail.reader.molecule_store import MoleculeStore
+from datasail.reader.tsv import open_tsv, open_entries, spool_tsv
+from datasail.reader.utils import DataSet, read_data, DATA_INPUT, MATRIX_INPUT, InteractionTable, \
+    remove_duplicate_values
+from datasail.settings import M_TYPE, UNK_LOCATION, FORM_SMILES, LOGGER, ECFP, WLK, DEDUP_INCHIKEY, DEDUP_SMILES
 
 
 mol_reader = {
@@ -20,6 +27,16 @@ mol_reader = {
     "xyz": MolFromXYZFile,
 }
 
+# readers for the decompressed content of compressed molecule files
+mol_block_reader = {
+    "mol2": MolFromMol2Block,
+    "mol": MolFromMolBlock,
+    "pdb": MolFromPDBBlock,
+    "png": MolFromPNGString,
+    "tpl": MolFromTPLBlock,
+    "xyz": MolFromXYZBlock,
+}
+
 
 def read_molecule_data(
         data: DATA_INPUT,
@@ -28,9 +45,13 @@ def read_molecule_data(
         dist: MATRIX_INPUT = None,
         max_sim: float = 1.0,
         max_dist: float = 1.0,
-        inter: Optional[List[Tuple[str, str]]] = None,
+        inter: Optional[Union[InteractionTable, List[Tuple[str, str]]]] = None,
         index: Optional[int] = None,
         tool_args: str = "",
+        num_threads: int = 1,
+        cache_dir: Optional[str] = None,
+        dedup_key: str = DEDUP_INCHIKEY,
+        matrix_dtype: Optional[str] = None,
 ) -> DataSet:
     """
     Read in molecular data, compute the weights, and distances or similarities of every entity.
@@ -45,65 +66,154 @@ def read_molecule_data(
         inter: Interaction, alternative way to compute weights
         index: Index of the entities in the interaction file
         tool_args: Additional arguments for the tool
+        num_threads: Number of processes to use to parse the molecules
+        cache_dir: Directory to persist the parsed molecules in, None to not persist them
+        dedup_key: Identity to detect duplicate molecules by, either inchikey, smiles, or connectivity
+        matrix_dtype: Datatype to read similarity and distance matrices from files as, None to keep their datatype
 
     Returns:
         A dataset storing all information on that datatype
     """
     dataset = DataSet(type=M_TYPE, format=FORM_SMILES, location=UNK_LOCATION)
     if isinstance(data, str):
-        if data.lower().endswith(".tsv"):
-            dataset.data = dict(read_csv(data))
+        if strip_compression(data).lower().endswith(".tsv") or is_columnar(data):
+            dataset.data = open_tsv(data)
         elif os.path.isdir(data):
-            dataset.data = {}
-            for file in os.listdir(data):
-                ending = file.split(".")[-1]
-                if ending != "sdf":
-                    dataset.data[os.path.basename(file)] = mol_reader[ending](os.path.join(data, file))
-                else:
-                    suppl = Chem.SDMolSupplier(os.path.join(data, file))
-                    for i, mol in enumerate(suppl):
-                        dataset.data[f"{os.path.basename(file)}_{i}"] = mol
+            dataset.data = read_molecule_folder(data, num_threads)
         else:
             raise ValueError()
         dataset.location = data
     elif isinstance(data, Union[list, tuple]) and isinstance(data[0], Iterable) and len(data[0]) == 2:
         dataset.data = dict(data)
-    elif isinstance(data, dict):
+    elif isinstance(data, (dict, FileIndex)):
         dataset.data = data
     elif isinstance(data, Callable):
-        dataset.data = data()
+        dataset.data = open_entries(data())
     elif isinstance(data, Generator):
-        dataset.data = dict(data)
+        dataset.data = spool_tsv(data)
     else:
         raise ValueError()
 
-    dataset = read_data(weights, sim, dist, max_sim, max_dist, inter, index, tool_args, dataset)
-    dataset = remove_molecule_duplicates(dataset)
+    dataset = read_data(weights, sim, dist, max_sim, max_dist, inter, index, tool_args, dataset, matrix_dtype)
+
+    # parse every molecule once, the RDKit molecules are only kept if a graph- or fingerprint-based method needs them
+    keep_mols = isinstance(dataset.similarity, str) and dataset.similarity.lower() in [ECFP, WLK]
+    dataset.molecules = MoleculeStore.for_encodings(
+        dataset.data.values(), cache_dir, keep_mols, with_inchi=dedup_key != DEDUP_SMILES, num_threads=num_threads)
+    dataset = remove_molecule_duplicates(dataset, dedup_key)
 
     return dataset
 
 
-def remove_molecule_duplicates(dataset: DataSet) -> DataSet:
+def read_molecule_folder(folder: str, num_threads: int = 1) -> Dict[str, str]:
+    """
+    Read all molecule files from a folder and convert the molecules into canonical SMILES. The files are parsed in
+    parallel, one file per task. Molecules from SDF files are named by the file and their index in the file, all
+    other files store one molecule that is named like the file. Compressed files are decompressed on the fly.
+
+    Args:
+        folder: Path to the folder storing the molecule files
+        num_threads: Number of processes to use for parsing
+
+    Returns:
+        Mapping from molecule names to their canonical SMILES
+    """
+    files, skipped = [], 0
+    for file in sorted(os.listdir(folder)):
+        if molecule_format(file) in mol_reader or molecule_format(file) == "sdf":
+            files.append(os.path.join(folder, file))
+        else:
+            skipped += 1
+    if skipped > 0:
+        LOGGER.warning(f"Skipped {skipped} files in {folder} with unknown molecule formats.")
+
+    if num_threads > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=min(num_threads, len(files))) as executor:
+            results = list(executor.map(parse_molecule_file, files))
+    else:
+        results = [parse_molecule_file(file) for file in files]
+
+    smiles, failed = {}, []
+    for parsed, failures in results:
+        smiles.update(parsed)
+        failed += failures
+    if len(failed) > 0:
+        LOGGER.warning(f"RDKit could not parse {len(failed)} of {len(smiles) + len(failed)} molecules in {folder}, "
+                       f"they are ignored. The first ones are: {', '.join(failed[:10])}")
+    return smiles
+
+
+def parse_molecule_file(filepath: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    Parse the molecules in one file into canonical SMILES.
+
+    Args:
+        filepath: Path to the molecule file
+
+    Returns:
+        The names and SMILES of the molecules that could be parsed and the names of the ones that could not be parsed
+    """
+    filename = strip_compression(os.path.basename(filepath))
+    mol_format = molecule_format(filename)
+    if mol_format == "sdf":
+        if is_compressed(filepath):
+            with open_file(filepath, "rb") as data:
+                molecules = [(f"{filename}_{i}", mol) for i, mol in enumerate(Chem.ForwardSDMolSupplier(data))]
+        else:
+            molecules = ((f"{filename}_{i}", mol) for i, mol in enumerate(Chem.SDMolSupplier(filepath)))
+    elif is_compressed(filepath):
+        with open_file(filepath, "rb" if mol_format == "png" else "rt") as data:
+            molecules = [(filename, mol_block_reader[mol_format](data.read()))]
+    else:
+        molecules = [(filename, mol_reader[mol_format](filepath))]
+
+    parsed, failed = [], []
+    for name, mol in molecules:
+        if mol is None:
+            failed.append(name)
+        else:
+            parsed.append((name, Chem.MolToSmiles(mol)))
+    return parsed, failed
+
+
+def molecule_format(filename: str) -> str:
+    """
+    Get the format of a molecule file from its extension, ignoring compression extensions.
+
+    Args:
+        filename: Name of the file
+
+    Returns:
+        The lower-case extension of the (decompressed) file
+    """
+    return strip_compression(filename).split(".")[-1].lower()
+
+
+def remove_molecule_duplicates(dataset: DataSet, dedup_key: str = DEDUP_INCHIKEY) -> DataSet:
     """
     Remove duplicates from molecular input data by checking if the input molecules are the same. If a molecule cannot
     be read by RDKit, it will be considered unique and survive the check.
 
     Args:
         dataset: The dataset to remove duplicates from
+        dedup_key: Identity to detect duplicate molecules by, either inchikey, smiles, or connectivity
 
     Returns:
         Update arguments as teh location of the data might change and an ID-Map file might be added.
     """
 
+    if dataset.molecules is None:
+        dataset.molecules = MoleculeStore.for_encodings(dataset.data.values(), with_inchi=dedup_key != DEDUP_SMILES)
+
     # Extract invalid molecules
     non_mols = []
     valid_mols = dict()
     for k, mol in dataset.data.items():
-        molecule = Chem.MolFromSmiles(mol)
-        if molecule is None:
+        key = dataset.molecules.key(mol, dedup_key)
+        if key is None:
             non_mols.append(k)
         else:
-            valid_mols[k] = Chem.MolToInchi(molecule)
+            valid_mols[k] = key
 
     return remove_duplicate_values(dataset, valid_mols)
 
@@ -113,33 +223,3 @@ def remove_molecule_duplicates(dataset: DataSet) -> DataSet:
     # id_map.update({k: k for k in non_mols})
 
     # return id_map
-
-
-def remove_duplicate_values(dataset, data) -> DataSet:
-    tmp = dict()
-    for idx, mol in data.items():
-        if mol not in tmp:
-            tmp[mol] = []
-        tmp[mol].append(idx)
-    dataset.id_map = {idx: ids[0] for ids in tmp.values() for idx in ids}
-
-    ids = set()
-    for i, name in enumerate(dataset.names):
-        if name not in dataset.id_map:
-            ids.add(i)
-            continue
-        if dataset.id_map[name] != name:
-            dataset.weights[dataset.id_map[name]] += dataset.weights[name]
-            del dataset.data[name]
-            del dataset.weights[name]
-            ids.add(i)
-    dataset.names = [name for i, name in enumerate(dataset.names) if i not in ids]
-    ids = list(ids)
-    if isinstance(dataset.similarity, np.ndarray):
-        dataset.similarity = np.delete(dataset.similarity, ids, axis=0)
-        dataset.similarity = np.delete(dataset.similarity, ids, axis=1)
-    if isinstance(dataset.distance, np.ndarray):
-        dataset.distance = np.delete(dataset.distance, ids, axis=0)
-        dataset.distance = np.delete(dataset.distance, ids, axis=1)
-
-    return dataset
@@ -1,9 +1,11 @@
 import os
-from typing import List, Tuple, Optional, Generator, Callable
+from typing import Union, List, Tuple, Optional, Generator, Callable
 
+from datasail.reader.file_index import FileIndex
 from datasail.reader.read_genomes import read_folder
-from datasail.reader.read_molecules import remove_duplicate_values
-from datasail.reader.utils import DataSet, read_data, DATA_INPUT, MATRIX_INPUT
+from datasail.reader.read_proteins import payload_digests
+from datasail.reader.utils import DataSet, read_data, DATA_INPUT, MATRIX_INPUT, InteractionTable, \
+    remove_duplicate_values
 from datasail.settings import O_TYPE, UNK_LOCATION, FORM_OTHER
 
 
@@ -15,10 +17,11 @@ def read_other_data(
         max_sim: float = 1.0,
         max_dist: float = 1.0,
         id_map: Optional[str] = None,
-        inter: Optional[List[Tuple[str, str]]] = None,
+        inter: Optional[Union[InteractionTable, List[Tuple[str, str]]]] = None,
         index: Optional[int] = None,
         tool_args: str = "",
-) -> Tuple[DataSet, Optional[List[Tuple[str, str]]]]:
+        matrix_dtype: Optional[str] = None,
+) -> DataSet:
     """
     Read in other data, i.e., non-protein, non-molecular, and non-genomic data, compute the weights, and distances or
     similarities of every entity.
@@ -34,6 +37,7 @@ def read_other_data(
         inter: Interaction, alternative way to compute weights
         index: Index of the entities in the interaction file
         tool_args: Additional arguments for the tool
+        matrix_dtype: Datatype to read similarity and distance matrices from files as, None to keep their datatype
 
     Returns:
         A dataset storing all information on that datatype
@@ -45,7 +49,7 @@ def read_other_data(
             dataset.location = data
         else:
             raise ValueError()
-    elif isinstance(data, dict):
+    elif isinstance(data, (dict, FileIndex)):
         dataset.data = data
     elif isinstance(data, Callable):
         dataset.data = data()
@@ -54,7 +58,7 @@ def read_other_data(
     else:
         raise ValueError()
 
-    dataset, inter = read_data(weights, sim, dist, max_sim, max_dist, inter, index, tool_args, dataset)
-    dataset = remove_duplicate_values(dataset, dataset.data)
+    dataset = read_data(weights, sim, dist, max_sim, max_dist, inter, index, tool_args, dataset, matrix_dtype)
+    dataset = remove_duplicate_values(dataset, payload_digests(dataset.data))
 
-    return dataset, inter
+    return dataset
@@ -1,11 +1,17 @@
+import hashlib
 import os
 from typing import Generator, Tuple, Dict, List, Optional, Set, Callable, Union, Iterable
 
 import numpy as np
 
-from datasail.reader.read_molecules import remove_duplicate_values
-from datasail.reader.utils import read_csv, DataSet, read_data, read_folder, DATA_INPUT, MATRIX_INPUT
-from datasail.settings import P_TYPE, UNK_LOCATION, FORM_PDB, FORM_FASTA, FASTA_FORMATS
+from datasail.reader.compression import strip_compression
+from datasail.reader.fasta import open_fasta
+from datasail.reader.file_index import FileIndex
+from datasail.reader.structures import load_structure, MMCIF_FORMATS
+from datasail.reader.tsv import open_tsv, open_entries, spool_tsv
+from datasail.reader.utils import DataSet, read_data, read_folder, DATA_INPUT, MATRIX_INPUT, \
+    InteractionTable, remove_duplicate_values
+from datasail.settings import LOGGER, P_TYPE, UNK_LOCATION, FORM_PDB, FORM_FASTA, FASTA_FORMATS
 
 
 def read_protein_data(
@@ -15,9 +21,11 @@ def read_protein_data(
         dist: MATRIX_INPUT = None,
         max_sim: float = 1.0,
         max_dist: float = 1.0,
-        inter: Optional[List[Tuple[str, str]]] = None,
+        inter: Optional[Union[InteractionTable, List[Tuple[str, str]]]] = None,
         index: Optional[int] = None,
         tool_args: str = "",
+        cache_dir: Optional[str] = None,
+        matrix_dtype: Optional[str] = None,
 ) -> DataSet:
     """
     Read in protein data, compute the weights, and distances or similarities of every entity.
@@ -32,36 +40,41 @@ def read_protein_data(
         inter: Interaction, alternative way to compute weights
         index: Index of the entities in the interaction file
         tool_args: Additional arguments for the tool
+        cache_dir: Directory to cache parsed structures in, None to not cache them
+        matrix_dtype: Datatype to read similarity and distance matrices from files as, None to keep their datatype
 
     Returns:
         A dataset storing all information on that datatype
     """
     dataset = DataSet(type=P_TYPE, location=UNK_LOCATION)
     if isinstance(data, str):
-        if data.split(".")[-1].lower() in FASTA_FORMATS:
-            dataset.data = parse_fasta(data)
+        if strip_compression(data).split(".")[-1].lower() in FASTA_FORMATS:
+            dataset.data = open_fasta(data)
         elif os.path.isfile(data):
-            dataset.data = dict(read_csv(data))
+            dataset.data = open_tsv(data)
         elif os.path.isdir(data):
-            dataset.data = dict(read_folder(data, ".pdb"))
+            dataset.data = dict(read_folder(data, (".pdb",) + MMCIF_FORMATS))
         else:
             raise ValueError()
         dataset.location = data
     elif isinstance(data, Union[list, tuple]) and isinstance(data[0], Iterable) and len(data[0]) == 2:
         dataset.data = dict(data)
-    elif isinstance(data, dict):
+    elif isinstance(data, (dict, FileIndex)):
         dataset.data = data
     elif isinstance(data, Callable):
-        dataset.data = data()
+        dataset.data = open_entries(data())
     elif isinstance(data, Generator):
-        dataset.data = dict(data)
+        dataset.data = spool_tsv(data)
     else:
         raise ValueError()
 
     dataset.format = FORM_PDB if os.path.exists(next(iter(dataset.data.values()))) else FORM_FASTA
 
-    dataset = read_data(weights, sim, dist, max_sim, max_dist, inter, index, tool_args, dataset)
-    dataset = remove_duplicate_values(dataset, dataset.data)
+    dataset = read_data(weights, sim, dist, max_sim, max_dist, inter, index, tool_args, dataset, matrix_dtype)
+    if dataset.format == FORM_PDB:
+        dataset = remove_duplicate_values(dataset, structure_digests(dataset.data, cache_dir))
+    else:
+        dataset = remove_duplicate_values(dataset, payload_digests(dataset.data))
 
     return dataset
 
@@ -76,29 +89,73 @@ def parse_fasta(path: str = None) -> Dict[str, str]:
     Returns:
         Dictionary mapping sequences IDs to amino acid sequences
     """
-    seq_map = {}
+    return dict(open_fasta(path).items())
+
+
+def payload_digests(data: Dict[str, str]) -> Dict[str, Union[str, bytes]]:
+    """
+    Replace the payloads of a file index (e.g., the sequences of a FASTA file) by digests of them to deduplicate them
+    without holding all payloads in memory. Other inputs are returned as they are.
+
+    Args:
+        data: Mapping from IDs to payloads
+
+    Returns:
+        Mapping from IDs to values that are equal iff the payloads are equal
+    """
+    if not isinstance(data, FileIndex):
+        return data
+    return dict((k, data.digest(k)) for k in data)
+
+
+def structure_digests(data: Dict[str, str], cache_dir: Optional[str] = None) -> Dict[str, bytes]:
+    """
+    Replace the paths to PDB files by digests of the chain sequences in them to deduplicate the structures in one pass.
+    Structures without any chain (e.g., files with only ligands) are keyed by their path and never merged.
 
-    with open(path, "r") as fasta:
-        for line in fasta.readlines():
-            line = line.strip()
-            if len(line) == 0:
-                continue
-            if line[0] == '>':
-                entry_id = line[1:]  # .replace(" ", "_")
-                seq_map[entry_id] = ''
-            else:
-                seq_map[entry_id] += line
+    Args:
+        data: Mapping from structure names to the paths of their PDB files
+        cache_dir: Directory to cache parsed structures in, None to not cache them
 
-    return seq_map
+    Returns:
+        Mapping from structure names to values that are equal iff the structures have the same chain sequences
+    """
+    digests = {}
+    for k, v in data.items():
+        pdb_seqs = extract_pdb_seqs(v, cache_dir)
+        if len(pdb_seqs) == 0:
+            LOGGER.warning(f"No C-alpha atoms found in {v}, {k} is not deduplicated.")
+            digests[k] = b"path:" + os.path.abspath(v).encode()
+        else:
+            digests[k] = structure_digest(pdb_seqs.values())
+    return digests
 
 
-def check_pdb_pair(pdb_seqs1: List[str], pdb_seqs2: List[str]) -> bool:
+def structure_digest(pdb_seqs: Iterable[str]) -> bytes:
+    """
+    Compute a canonical digest of the multiset of chain sequences of a structure. Two structures have the same digest
+    iff their chain sequences can be matched one-to-one, independent of the order and naming of the chains.
+
+    Args:
+        pdb_seqs: Amino acid sequences of the chains of a structure
+
+    Returns:
+        SHA1 digest of the sorted chain sequences
+    """
+    return hashlib.sha1("\n".join(sorted(pdb_seqs)).encode()).digest()
+
+
+def check_pdb_pair(
+        pdb_seqs1: List[str], pdb_seqs2: List[str], equality: Optional[Callable[[str, str], float]] = None
+) -> bool:
     """
-    Entry point for the comparison of two PDB files.
+    Entry point for the comparison of two PDB files. For exact equality, the multisets of chain sequences are compared
+    directly. Custom equality functions are matched by recursive search.
 
     Args:
-        pdb_seqs1: filepath to the first PDB file
-        pdb_seqs2: filepath to the second PDB file
+        pdb_seqs1: Amino acid sequences of the chains of the first PDB file
+        pdb_seqs2: Amino acid sequences of the chains of the second PDB file
+        equality: Function returning 1 for two matching sequences and 0 otherwise, None for exact equality
 
     Returns:
         A boolean flag indicating (dis-)similarity of the two PDB files.
@@ -106,7 +163,10 @@ def check_pdb_pair(pdb_seqs1: List[str], pdb_seqs2: List[str]) -> bool:
     if len(pdb_seqs1) != len(pdb_seqs2):
         # If the number of sequence does not match, the PDB files cannot describe the same protein
         return False
-    return check_pdb_pair_rec(pdb_seqs1, pdb_seqs2, 0, set(), np.full((len(pdb_seqs1), len(pdb_seqs1)), -1))
+    if equality is None:
+        return sorted(pdb_seqs1) == sorted(pdb_seqs2)
+    return check_pdb_pair_rec(
+        pdb_seqs1, pdb_seqs2, 0, set(), np.full((len(pdb_seqs1), len(pdb_seqs1)), -1), equality)
 
 
 def check_pdb_pair_rec(
@@ -114,7 +174,8 @@ def check_pdb_pair_rec(
         pdb_seqs2: List[str],
         index1: int,
         blocked: Set[int],
-        dp_table: np.ndarray
+        dp_table: np.ndarray,
+        equality: Optional[Callable[[str, str], float]] = None,
 ) -> bool:
     """
     Check if two pdb files contain the same protein. This is done in recursive manner by finding a match for one
@@ -127,6 +188,7 @@ def check_pdb_pair_rec(
         index1: The index of the sequence in pdb_seqs1 looking for a mate in pdb_seqs2.
         blocked: List of indices already assigned in higher iteration of the recursion
         dp_table: Table of already computed sequence similarities
+        equality: Function returning 1 for two matching sequences and 0 otherwise, exact equality by default
 
     Returns:
         True if the two lists of amino acid sequences from the two files can be matched, otherwise False
@@ -141,12 +203,12 @@ def check_pdb_pair_rec(
 
         # ... and check if they match the current sequence from pdb_seqs1
         if dp_table[index1, index] == -1:
-            dp_table[index1, index] = seqs_equality(pdb_seqs1[index1], pdb_seqs2[index])
+            dp_table[index1, index] = (equality or seqs_equality)(pdb_seqs1[index1], pdb_seqs2[index])
 
         # if I found a match, go deeper recursively and check if I can match the rest as well
         if dp_table[index1, index] == 1:
             blocked.add(index)
-            if check_pdb_pair_rec(pdb_seqs1, pdb_seqs2, index + 1, blocked, dp_table):
+            if check_pdb_pair_rec(pdb_seqs1, pdb_seqs2, index1 + 1, blocked, dp_table, equality):
                 return True
             blocked.remove(index)
     return False
@@ -166,22 +228,15 @@ def seqs_equality(seq1: str, seq2: str) -> float:
     return 1.0 if seq1 == seq2 else 0.0
 
 
-def extract_pdb_seqs(pdb_file: str) -> Dict[str, str]:
+def extract_pdb_seqs(pdb_file: str, cache_dir: Optional[str] = None) -> Dict[str, str]:
     """
-    Extract all amino acid sequences from a PDB file.
+    Extract all amino acid sequences from a (gzipped) PDB or mmCIF file.
 
     Args:
         pdb_file: filepath to the PDB file in question.
+        cache_dir: Directory to cache the parsed structure in, None to not cache it
 
     Returns:
         A dictionary of all chain ids mapping to their amino acid sequence.
     """
-    seqs = {}
-    with open(pdb_file, "r") as pdb:
-        for line in pdb.readlines():
-            if line.startswith("ATOM") and line[12:16].strip() == "CA":
-                res_num = line[20:22].strip()
-                if res_num not in seqs:
-                    seqs[res_num] = ""
-                seqs[res_num] += line[17:20].strip()
-    return seqs
+    return load_structure(pdb_file, cache_dir).sequences()
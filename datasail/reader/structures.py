@@ -0,0 +1,184 @@
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+from datasail.reader.compression import open_file, strip_compression
+from datasail.settings import LOGGER
+
+STRUCTURE_STORE_DIR = "structures"
+
+# version of the parsers, part of the keys of cached structures to not reuse structures parsed by older versions
+STRUCTURE_STORE_VERSION = b"2"
+MMCIF_FORMATS = (".cif", ".mmcif")
+
+# width of the records in a PDB file, longer lines only contain optional columns that are not read
+_PDB_LINE_WIDTH = 80
+
+# values in CIF files are either quoted or separated by whitespace, a quote only ends a value if whitespace follows
+_CIF_TOKEN = re.compile(r"""'(.*?)'(?=\s|$)|"(.*?)"(?=\s|$)|(\S+)""", re.MULTILINE)
+
+
+@dataclass
+class Structure:
+    """
+    The $C_{\\alpha}$ atoms of a protein structure stored column-wise, i.e., one array per property with one entry per
+    residue in the order of the file.
+    """
+    res_names: np.ndarray
+    res_nums: np.ndarray
+    chains: np.ndarray
+    coords: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.res_names)
+
+    def sequences(self) -> Dict[str, str]:
+        """
+        Get the sequences of all chains as concatenations of the three-letter codes of their residues.
+
+        Returns:
+            A dictionary mapping chain IDs to their sequences in the order of appearance in the file
+        """
+        seqs = {}
+        for chain, name in zip(self.chains.tolist(), self.res_names.tolist()):
+            seqs[chain] = seqs.get(chain, "") + name
+        return seqs
+
+
+def load_structure(path: str, cache_dir: Optional[str] = None) -> Structure:
+    """
+    Load the $C_{\\alpha}$ atoms of a (compressed) PDB or mmCIF file. If a cache directory is given, the parsed arrays
+    are stored there under a hash of the decompressed content of the file, so later runs do not parse the same structure
+    again.
+
+    Args:
+        path: Path to the structure file
+        cache_dir: Directory to cache parsed structures in, None to not cache them
+
+    Returns:
+        The parsed structure
+    """
+    with open_file(path, "rb") as data:
+        content = data.read()
+
+    cache_path = None
+    if cache_dir is not None:
+        digest = hashlib.sha1(STRUCTURE_STORE_VERSION + b"\n" + content).hexdigest()
+        cache_path = os.path.join(cache_dir, STRUCTURE_STORE_DIR, f"{digest}.npz")
+        if os.path.isfile(cache_path):
+            with np.load(cache_path) as arrays:
+                return Structure(**{key: arrays[key] for key in arrays.files})
+
+    if strip_compression(path).lower().endswith(MMCIF_FORMATS):
+        structure = parse_mmcif(content)
+    else:
+        structure = parse_pdb(content)
+
+    if cache_path is not None:
+        save_structure(structure, cache_path)
+    return structure
+
+
+def save_structure(structure: Structure, path: str) -> None:
+    """
+    Store a structure as NPZ file. Failing to write the file only costs time in the next run.
+
+    Args:
+        structure: Structure to store
+        path: Path to store the structure at
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as out:
+            np.savez(out, **structure.__dict__)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        LOGGER.info(f"Cannot store the parsed structure in {os.path.dirname(path)}.")
+
+
+def parse_pdb(content: bytes) -> Structure:
+    """
+    Parse the $C_{\\alpha}$ atoms from the content of a PDB file. All lines are converted into a fixed-width byte matrix
+    at once and the columns are extracted and converted by slicing that matrix.
+
+    Args:
+        content: Content of the PDB file
+
+    Returns:
+        The parsed structure
+    """
+    lines = np.array(content.splitlines(), dtype=f"S{_PDB_LINE_WIDTH}")
+    lines = lines[np.char.startswith(lines, b"ATOM")]
+    lines = lines[np.char.strip(_pdb_column(lines, 12, 16)) == b"CA"]
+    return Structure(
+        res_names=np.char.strip(_pdb_column(lines, 17, 20)).astype(str),
+        res_nums=_pdb_column(lines, 22, 26).astype(np.int64),
+        chains=np.char.strip(_pdb_column(lines, 20, 22)).astype(str),
+        coords=np.stack([_pdb_column(lines, s, s + 8).astype(np.float64) for s in (30, 38, 46)], axis=1),
+    )
+
+
+def parse_mmcif(content: bytes) -> Structure:
+    """
+    Parse the $C_{\\alpha}$ atoms from the content of an mmCIF file. The atom_site loop is split into a token matrix at
+    once and the columns are selected from that matrix. Author-defined chain IDs and residue numbers are preferred
+    over label ones as they match the ones in PDB files. Only the first model of files with multiple models is read.
+
+    Args:
+        content: Content of the mmCIF file
+
+    Returns:
+        The parsed structure
+    """
+    fields, rows = [], []
+    for line in content.decode().splitlines():
+        if line.startswith("_atom_site."):
+            fields.append(line.split()[0][len("_atom_site."):])
+        elif len(fields) > 0:
+            if line.startswith(("#", "loop_", "_")):
+                break
+            rows.append(line)
+    if len(fields) == 0:
+        raise ValueError("The mmCIF file does not contain an atom_site table.")
+
+    tokens = [quoted or double_quoted or plain for quoted, double_quoted, plain in _CIF_TOKEN.findall("\n".join(rows))]
+    if len(tokens) % len(fields) != 0:
+        raise ValueError("The atom_site table of the mmCIF file has rows with a different number of values.")
+    table = np.array(tokens, dtype=str).reshape(-1, len(fields))
+    index = dict((field, i) for i, field in enumerate(fields))
+
+    def column(*names: str) -> np.ndarray:
+        for name in names:
+            if name in index:
+                return table[:, index[name]]
+        raise ValueError(f"The atom_site table of the mmCIF file does not contain {' or '.join(names)}.")
+
+    if "pdbx_PDB_model_num" in index and len(table) > 0:
+        table = table[column("pdbx_PDB_model_num") == table[0, index["pdbx_PDB_model_num"]]]
+    table = table[(column("group_PDB") == "ATOM") & (column("auth_atom_id", "label_atom_id") == "CA")]
+    return Structure(
+        res_names=column("auth_comp_id", "label_comp_id"),
+        res_nums=column("auth_seq_id", "label_seq_id").astype(np.int64),
+        chains=column("auth_asym_id", "label_asym_id"),
+        coords=np.stack([column(f"Cartn_{axis}").astype(np.float64) for axis in "xyz"], axis=1),
+    )
+
+
+def _pdb_column(lines: np.ndarray, start: int, end: int) -> np.ndarray:
+    """
+    Extract a fixed-width column from PDB lines.
+
+    Args:
+        lines: Array of lines as fixed-width byte strings
+        start: Start of the column (inclusive)
+        end: End of the column (exclusive)
+
+    Returns:
+        Array of byte strings holding the column
+    """
+    chars = lines.view(np.uint8).reshape(len(lines), _PDB_LINE_WIDTH)
+    return np.ascontiguousarray(chars[:, start:end]).view(f"S{end - start}").ravel()
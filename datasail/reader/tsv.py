@@ -0,0 +1,166 @@
+import hashlib
+import os
+import tempfile
+from itertools import islice
+from typing import Dict, Union, Iterable, Tuple, Any, Optional
+
+import numpy as np
+
+from datasail.reader.columnar import is_columnar
+from datasail.reader.compression import is_compressed, spill_dir
+from datasail.reader.file_index import FileIndex, Index
+from datasail.reader.utils import read_columns
+
+TSV_INDEX_SUFFIX = ".tidx"
+TSV_INDEX_HEADER = "#datasail-tsv-index"
+
+# number of entries collected before they are written to a spool file at once
+SPOOL_CHUNK_SIZE = 10000
+
+
+class TsvIndex(FileIndex):
+    """
+    Memory-mapped view on a TSV file mapping IDs in the first column to payloads in the second column, e.g., SMILES
+    strings, sequences, or paths. Only the byte ranges of the payloads are kept in memory, the payloads are read from
+    the file whenever they are accessed. As for the other TSV inputs, the first line is considered a header.
+    """
+
+    index_suffix = TSV_INDEX_SUFFIX
+    index_header = TSV_INDEX_HEADER
+
+    def __init__(self, path: str, index: Optional[Index] = None, content_digest: Optional[str] = None) -> None:
+        """
+        Open a TSV file and load or build the offset index for it.
+
+        Args:
+            path: Path to the TSV file
+            index: Mapping from IDs to the byte ranges of their payloads, computed if not given
+            content_digest: Digest of the content of the file, used to identify it instead of its path and stat
+        """
+        super().__init__(path, index)
+        self.content_digest = content_digest
+
+    @staticmethod
+    def build_index(path: str) -> Index:
+        return build_tsv_index(path)
+
+    def signature(self) -> Tuple:
+        """
+        Identify the content of the file. Spooled files are stored under a new temporary path in every run, so they are
+        identified by the digest of their content computed while writing them.
+
+        Returns:
+            The content digest if known, otherwise the path, size, and modification time of the file
+        """
+        if self.content_digest is not None:
+            return self.content_digest,
+        return super().signature()
+
+
+def open_tsv(path: str) -> Union[TsvIndex, Dict[str, str]]:
+    """
+    Open a TSV file mapping IDs to payloads. Plain files are indexed and memory-mapped, compressed files cannot be
+    accessed randomly and are decompressed on the fly while reading the first two columns into memory. Parquet and
+    Arrow files are read column-wise into memory as well. IDs and payloads are strings, independent of the format.
+
+    Args:
+        path: Path to the (compressed) TSV, Parquet, or Arrow file
+
+    Returns:
+        Mapping from the IDs in the first column to the values in the second column
+    """
+    if is_compressed(path) or is_columnar(path):
+        return dict(zip(*read_columns(path, id_columns=2)))
+    return TsvIndex(path)
+
+
+def open_entries(entries: Any) -> Union[Dict[str, str], FileIndex]:
+    """
+    Open the entities returned by a user-provided function. Mappings are kept as they are, all other iterables of
+    pairs (e.g., generators) are spooled to disk instead of being materialized in memory.
+
+    Args:
+        entries: Mapping from IDs to payloads or iterable of pairs of IDs and payloads
+
+    Returns:
+        Mapping from IDs to payloads
+    """
+    if isinstance(entries, (dict, FileIndex)):
+        return entries
+    return spool_tsv(entries)
+
+
+def spool_tsv(entries: Iterable[Tuple[Any, Any]], chunk_size: int = SPOOL_CHUNK_SIZE) -> TsvIndex:
+    """
+    Write pairs of IDs and payloads chunk-wise into a temporary TSV file and open it as index. The offsets are
+    recorded while writing, so neither the payloads nor the file have to be held in memory or scanned again. Only the
+    IDs and the offsets of their payloads stay resident. If an ID occurs multiple times, the last payload is used. The
+    content is hashed while writing, so spooling the same entries twice results in equal hashes of the indices.
+
+    Args:
+        entries: Iterable of pairs of IDs and payloads, e.g., a generator over a database cursor
+        chunk_size: Number of entries to collect before writing them to disk
+
+    Returns:
+        Memory-mapped view on the spooled entries
+    """
+    path = os.path.join(tempfile.mkdtemp(dir=spill_dir()), "entries.tsv")
+    header = b"ID\tPayload\n"
+    index, offset = {}, len(header)
+    content_digest = hashlib.sha1(header)
+    entries = iter(entries)
+    with open(path, "wb") as out:
+        out.write(header)
+        while chunk := list(islice(entries, chunk_size)):
+            lines = []
+            for key, value in chunk:
+                key, value = str(key), str(value).encode()
+                if "\t" in key or "\n" in key or b"\t" in value or b"\n" in value:
+                    raise ValueError(f"The ID and payload of {key} must not contain tabs or linebreaks.")
+                offset += len(key.encode()) + 1
+                index[key] = (offset, offset + len(value))
+                offset += len(value) + 1
+                lines.append(f"{key}\t".encode() + value + b"\n")
+            lines = b"".join(lines)
+            content_digest.update(lines)
+            out.write(lines)
+    return TsvIndex(path, index, content_digest.hexdigest())
+
+
+def build_tsv_index(path: str) -> Index:
+    """
+    Scan a TSV file once and compute the byte ranges of the second column of every row. Line and field boundaries are
+    located for the whole file at once, only the IDs are decoded row by row.
+
+    Args:
+        path: Path to the TSV file
+
+    Returns:
+        Mapping from the IDs in the first column to the start and end offset of the values in the second column
+    """
+    if os.path.getsize(path) == 0:
+        return {}
+    content = np.memmap(path, dtype=np.uint8, mode="r")
+    ends = np.flatnonzero(content == ord("\n"))
+    if len(ends) == 0 or ends[-1] != len(content) - 1:
+        ends = np.append(ends, len(content))
+    starts = np.concatenate([[0], ends[:-1] + 1])[1:]  # skip the header
+    ends = ends[1:]
+
+    # skip rows without a second column, e.g., empty lines
+    tabs = np.append(np.flatnonzero(content == ord("\t")), len(content))
+    first = np.searchsorted(tabs, starts)
+    valid = tabs[first] < ends
+    starts, ends, first = starts[valid], ends[valid], first[valid]
+
+    # the value ends at the next tab or the end of the line, excluding the carriage return of Windows linebreaks
+    value_starts = tabs[first] + 1
+    value_ends = np.minimum(tabs[np.minimum(first + 1, len(tabs) - 1)], ends)
+    value_ends -= (value_ends > value_starts) & (content[np.maximum(value_ends - 1, 0)] == ord("\r"))
+
+    index = {}
+    for start, key_end, value_start, value_end in zip(
+            starts.tolist(), tabs[first].tolist(), value_starts.tolist(), value_ends.tolist()):
+        index[content[start:key_end].tobytes().decode()] = (value_start, value_end)
+    del content
+    return index
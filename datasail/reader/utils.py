@@ -1,11 +1,18 @@
+import hashlib
 import os
+import struct
+import zipfile
 from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, fields
-from typing import Generator, Tuple, List, Optional, Dict, Union, Any, Callable
+from typing import Generator, Tuple, List, Optional, Dict, Union, Any, Callable, Iterable, Iterator
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
 
+from datasail.reader.columnar import is_columnar, read_columnar
+from datasail.reader.compression import open_file, strip_compression
 from datasail.reader.validate import validate_user_args
 from datasail.settings import get_default
 
@@ -13,6 +20,13 @@ DATA_INPUT = Optional[Union[str, Dict[str, str], Callable[..., Dict[str, str]],
 MATRIX_INPUT = Optional[Union[str, Tuple[List[str], np.ndarray], Callable[..., Tuple[List[str], np.ndarray]]]]
 DictMap = Dict[str, List[Dict[str, str]]]
 
+MATRIX_BINARY_FORMATS = (".npy", ".npz")
+MATRIX_PAIRS_FORMATS = (".pairs",)
+MATRIX_NAMES_SUFFIX = ".names"
+
+# number of bytes read at once when hashing the content of files
+FILE_DIGEST_BLOCK_SIZE = 1 << 20
+
 
 @dataclass
 class DataSet:
@@ -27,11 +41,12 @@ class DataSet:
     location: Optional[str] = None
     weights: Optional[Dict[str, float]] = None
     cluster_weights: Optional[Dict[str, float]] = None
-    similarity: Optional[Union[np.ndarray, str]] = None
-    cluster_similarity: Optional[Union[np.ndarray, str]] = None
+    similarity: Optional[Union[np.ndarray, sparse.csr_matrix, str]] = None
+    cluster_similarity: Optional[Union[np.ndarray, sparse.csr_matrix, str]] = None
     distance: Optional[Union[np.ndarray, str]] = None
     cluster_distance: Optional[Union[np.ndarray, str]] = None
     threshold: Optional[float] = None
+    molecules: Optional[Any] = None  # MoleculeStore of molecular datasets, not part of the hash
 
     def __hash__(self) -> int:
         """
@@ -42,7 +57,7 @@ class DataSet:
             The cluster-insensitive hash-value of the instance.
         """
         hash_val = 0
-        for field in filter(lambda f: "cluster" not in f.name, fields(DataSet)):
+        for field in filter(lambda f: "cluster" not in f.name and f.name != "molecules", fields(DataSet)):
             obj = getattr(self, field.name)
             if obj is None:
                 hv = 0
@@ -50,7 +65,7 @@ class DataSet:
                 hv = hash(tuple(obj.items()))
             elif isinstance(obj, list):
                 hv = hash(tuple(obj))
-            elif isinstance(obj, np.ndarray):
+            elif is_matrix(obj):
                 hv = 0  # hash(str(obj.data))
             elif isinstance(obj, Namespace):
                 hv = hash(tuple(obj.__dict__.items()))
@@ -98,54 +113,375 @@ class DataSet:
                 permute(self.cluster_names, self.cluster_similarity, self.cluster_distance)
 
 
+@dataclass
+class InteractionTable:
+    """
+    Interactions between e-entities and f-entities. Instead of pairs of names, every interaction is stored as two
+    integer indices into vocabularies of entity names. The table is built once when reading the input and all later
+    stages (weight counting, deduplication, clustering, and output mapping) operate on the index arrays. Optionally,
+    every interaction carries a value (e.g., a measured affinity) that is used to weight the entities.
+    """
+    e_names: np.ndarray
+    f_names: np.ndarray
+    e_index: np.ndarray
+    f_index: np.ndarray
+    values: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_columns(
+            cls, e_column: Iterable, f_column: Iterable, values: Optional[Iterable] = None
+    ) -> "InteractionTable":
+        """
+        Build an interaction table from two columns of entity names.
+
+        Args:
+            e_column: Names of the e-entities, one per interaction
+            f_column: Names of the f-entities, one per interaction
+            values: Values of the interactions to weight the entities by, None to weight all interactions equally
+
+        Returns:
+            The interaction table storing the interactions
+        """
+        e_index, e_names = pd.factorize(np.asarray(e_column, dtype=object))
+        f_index, f_names = pd.factorize(np.asarray(f_column, dtype=object))
+        if values is not None:
+            values = np.asarray(values, dtype=float)
+            if len(values) != len(e_index):
+                raise ValueError("The number of interaction values does not match the number of interactions.")
+        return cls(e_names, f_names, e_index.astype(np.int32), f_index.astype(np.int32), values)
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple], weighted: bool = False) -> "InteractionTable":
+        """
+        Build an interaction table from pairs of entity names.
+
+        Args:
+            pairs: Interactions given as pairs of e-entity and f-entity names, or as triples with an additional value
+            weighted: Flag indicating to read the third entry of every interaction as its value
+
+        Returns:
+            The interaction table storing the interactions
+        """
+        if isinstance(pairs, InteractionTable):
+            return pairs
+        pairs = list(pairs)
+        if len(pairs) == 0:
+            return cls.from_columns([], [], [] if weighted else None)
+        if weighted:
+            if any(len(p) < 3 for p in pairs):
+                raise ValueError("Weighted interactions have to be given as triples of two names and a value.")
+            return cls.from_columns(*zip(*((p[0], p[1], p[2]) for p in pairs)))
+        e_column, f_column = zip(*((p[0], p[1]) for p in pairs))
+        return cls.from_columns(e_column, f_column)
+
+    def __len__(self) -> int:
+        return len(self.e_index)
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return zip(self.e_names[self.e_index].tolist(), self.f_names[self.f_index].tolist())
+
+    def names(self, mode: int) -> np.ndarray:
+        """
+        Get the names of the entities of all interactions for one side of the interactions.
+
+        Args:
+            mode: Position to read the names from, 0 for the e-entities and 1 for the f-entities
+
+        Returns:
+            Array of names, one per interaction
+        """
+        return self.e_names[self.e_index] if mode == 0 else self.f_names[self.f_index]
+
+    def count(self, mode: int) -> Dict[str, Union[int, float]]:
+        """
+        Count the interactions every entity participates in. If the table stores values for the interactions, the
+        values are summed up instead. Both is done in a single pass over the interactions.
+
+        Args:
+            mode: Position to count the entities in, 0 for the e-entities and 1 for the f-entities
+
+        Returns:
+            Mapping from entity names to the number (or summed value) of interactions they participate in
+        """
+        names, index = (self.e_names, self.e_index) if mode == 0 else (self.f_names, self.f_index)
+        counts = np.bincount(index, minlength=len(names))
+        # entities are kept based on their occurrences, a total value of zero is still a valid weight
+        present = counts > 0
+        if self.values is not None:
+            counts = np.bincount(index, weights=self.values, minlength=len(names))
+        return dict(zip(names[present].tolist(), counts[present].tolist()))
+
+    def map_names(
+            self, e_map: Optional[Dict[str, str]] = None, f_map: Optional[Dict[str, str]] = None
+    ) -> "InteractionTable":
+        """
+        Rename the entities, e.g., to their representatives after deduplication. Interactions of which at least one
+        entity has no mapping are dropped. The mappings are only evaluated once per name in the vocabularies.
+
+        Args:
+            e_map: Mapping of the names of the e-entities, None to keep them as they are
+            f_map: Mapping of the names of the f-entities, None to keep them as they are
+
+        Returns:
+            A new interaction table with the mapped entity names
+        """
+        e_names, e_index = _map_vocabulary(self.e_names, self.e_index, e_map)
+        f_names, f_index = _map_vocabulary(self.f_names, self.f_index, f_map)
+        keep = (e_index != -1) & (f_index != -1)
+        values = self.values[keep] if self.values is not None else None
+        return InteractionTable(e_names, f_names, e_index[keep], f_index[keep], values)
+
+    def lookup(self, mode: int, mapping: Dict[str, Any], default: Any = None) -> np.ndarray:
+        """
+        Evaluate a mapping on the names of all interactions of one side. The mapping is only evaluated once per name in
+        the vocabulary and then broadcast to the interactions.
+
+        Args:
+            mode: Position to read the names from, 0 for the e-entities and 1 for the f-entities
+            mapping: Mapping to apply to the names
+            default: Value to use for names that are not in the mapping
+
+        Returns:
+            Array of mapped values, one per interaction
+        """
+        names, index = (self.e_names, self.e_index) if mode == 0 else (self.f_names, self.f_index)
+        values = np.empty(len(names), dtype=object)
+        values[:] = [mapping.get(n, default) for n in names.tolist()]
+        return values[index]
+
+
+def _map_vocabulary(
+        names: np.ndarray, index: np.ndarray, mapping: Optional[Dict[str, str]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Map the vocabulary of one side of an interaction table and translate the indices of the interactions.
+
+    Args:
+        names: Vocabulary of entity names
+        index: Indices of the interactions into the vocabulary
+        mapping: Mapping to apply to the vocabulary, None for the identity
+
+    Returns:
+        The new vocabulary and the translated indices, -1 for entities without mapping
+    """
+    if mapping is None:
+        return names, index
+    mapped = np.empty(len(names), dtype=object)
+    mapped[:] = [mapping.get(n, None) for n in names.tolist()]
+    translation, new_names = pd.factorize(mapped)
+    return new_names, translation.astype(np.int32)[index]
+
+
+def is_matrix(obj: Any) -> bool:
+    """
+    Check if an object is a dense or sparse matrix of similarities or distances.
+
+    Args:
+        obj: Object to check
+
+    Returns:
+        True if the object is a numpy array or a scipy sparse matrix
+    """
+    return isinstance(obj, np.ndarray) or sparse.issparse(obj)
+
+
 def permute(names, similarity=None, distance=None):
     permutation = np.random.permutation(len(names))
     names = [names[x] for x in permutation]
-    if isinstance(similarity, np.ndarray):
-        similarity = similarity[permutation, :]
-        similarity = similarity[:, permutation]
-    if isinstance(distance, np.ndarray):
-        distance = distance[permutation, :]
-        distance = distance[:, permutation]
+    similarity, distance = permute_matrix(similarity, permutation), permute_matrix(distance, permutation)
     return names, similarity, distance
 
 
-def count_inter(inter: List[Tuple[str, str]], mode: int) -> Generator[Tuple[str, int], None, None]:
+def permute_matrix(matrix: Any, permutation: np.ndarray) -> Any:
+    """
+    Apply a permutation to the rows and columns of a matrix. Anything that is not a matrix is returned unchanged.
+
+    Args:
+        matrix: Dense or sparse matrix to permute
+        permutation: New order of the rows and columns
+
+    Returns:
+        The permuted matrix
+    """
+    if sparse.issparse(matrix):
+        return matrix.tocsr()[permutation][:, permutation]
+    if isinstance(matrix, np.ndarray):
+        # permute rows and columns at once to not copy (memory-mapped) matrices twice
+        return matrix[np.ix_(permutation, permutation)]
+    return matrix
+
+
+def count_inter(
+        inter: Union[InteractionTable, List[Tuple[str, str]]], mode: int
+) -> Generator[Tuple[str, Union[int, float]], None, None]:
     """
-    Count interactions per entity in a set of interactions.
+    Count interactions per entity in a set of interactions. If the interactions carry values, the values are summed up
+    per entity instead.
 
     Args:
         inter: List of pairwise interactions of entities
         mode: Position where to read the data from, first or second entity
 
     Yields:
-        Pairs of entity name and the number of interactions they participate in
+        Pairs of entity name and the number (or summed value) of interactions they participate in
     """
-    tmp = list(zip(*inter))
-    keys = set(tmp[mode])
-    for key in keys:
-        yield key, tmp[mode].count(key)
+    yield from InteractionTable.from_pairs(inter).count(mode).items()
 
 
-def read_clustering_file(filepath: str, sep: str = "\t") -> Tuple[List[str], np.ndarray]:
+def read_clustering_file(
+        filepath: str, sep: str = "\t", dtype: Optional[np.dtype] = None, default_names: Optional[List[str]] = None,
+) -> Tuple[List[str], np.ndarray]:
     """
-    Read a similarity or distance matrix from a file.
+    Read a similarity or distance matrix from a file. Text files store one row per line, starting with the name of the
+    entity, and a header line. Binary files (.npy and .npz) are memory-mapped, so only the parts of the matrix that are
+    accessed are read from disk. Files ending in .pairs store a sparse matrix as triplets of two names and a value.
+    Text files may be compressed, they are decompressed on the fly.
 
     Args:
-        filepath: Path to the file storing the matrix in CSV format
+        filepath: Path to the file storing the matrix in CSV, NPY, NPZ, or PAIRS format
         sep: Separator used to separate the values of the matrix
+        dtype: Datatype of the matrix, e.g. np.float32 to halve the memory footprint. If None, text files are read as
+            float64 and binary files keep the datatype they have been stored with.
+        default_names: Names to use for binary matrices that come without names
 
     Returns:
         A list of names of the entities and their pairwise interactions in and numpy array
     """
-    names = []
-    measures = []
-    with open(filepath, "r") as data:
-        for line in data.readlines()[1:]:
-            parts = line.strip().split(sep)
-            names.append(parts[0])
-            measures.append([float(x) for x in parts[1:]])
-    return names, np.array(measures)
+    if filepath.endswith(MATRIX_BINARY_FORMATS):
+        return read_binary_matrix(filepath, dtype, default_names)
+    if strip_compression(filepath).endswith(MATRIX_BINARY_FORMATS):
+        raise ValueError(f"Binary matrices cannot be memory-mapped from compressed files such as {filepath}. Store "
+                         f"them with np.savez_compressed instead.")
+    if strip_compression(filepath).endswith(MATRIX_PAIRS_FORMATS):
+        return read_pairs_matrix(filepath, dtype, default_names)
+    df = pd.read_csv(filepath, sep=sep, header=None, skiprows=1, index_col=0, dtype={0: str})
+    # trailing separators at the end of the lines produce additional empty columns
+    return df.index.tolist(), df.iloc[:, :len(df)].to_numpy(dtype=dtype or np.float64)
+
+
+def read_binary_matrix(
+        filepath: str, dtype: Optional[np.dtype] = None, default_names: Optional[List[str]] = None,
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Memory-map a matrix stored by numpy. The names of the entities are either stored in an array called "names" within
+    an NPZ file or in a sidecar file with one name per line that has the same name as the matrix but the suffix
+    ".names". Members of NPZ files can only be memory-mapped if the archive is not compressed (np.savez instead of
+    np.savez_compressed), compressed members are loaded into memory. NPZ files written by scipy.sparse.save_npz are
+    read as sparse matrices.
+
+    Args:
+        filepath: Path to the NPY or NPZ file
+        dtype: Datatype of the matrix, None to keep the stored datatype. Converting the matrix loads it into memory.
+        default_names: Names to use if neither the file nor a sidecar file provides names
+
+    Returns:
+        A list of names of the entities and the memory-mapped matrix
+    """
+    names = None
+    if filepath.endswith(".npz"):
+        with zipfile.ZipFile(filepath) as archive:
+            members = {os.path.splitext(info.filename)[0]: info for info in archive.infolist()}
+            if "names" in members:
+                names = np.load(archive.open(members.pop("names")), allow_pickle=False).tolist()
+            if {"format", "shape", "data"}.issubset(members):
+                matrix = sparse.load_npz(filepath).tocsr()
+            elif len(members) != 1 and "matrix" not in members:
+                raise ValueError(f"Cannot determine which array in {filepath} stores the matrix. Either store only one "
+                                 f"array next to the names or call it \"matrix\".")
+            else:
+                info = members.get("matrix", next(iter(members.values())))
+                if info.compress_type == zipfile.ZIP_STORED:
+                    matrix = _mmap_npz_member(filepath, info)
+                else:
+                    matrix = np.load(archive.open(info), allow_pickle=False)
+    else:
+        matrix = np.load(filepath, mmap_mode="r")
+
+    if names is None:
+        names_file = os.path.splitext(filepath)[0] + MATRIX_NAMES_SUFFIX
+        if os.path.isfile(names_file):
+            with open(names_file, "r") as data:
+                names = [line.strip() for line in data if line.strip() != ""]
+        else:
+            names = default_names
+
+    if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+        raise ValueError(f"The matrix in {filepath} has to be square, but has shape {matrix.shape}.")
+    if names is None or len(names) != matrix.shape[0]:
+        raise ValueError(f"The matrix in {filepath} has {matrix.shape[0]} rows, but "
+                         f"{0 if names is None else len(names)} names are given.")
+    if dtype is not None and matrix.dtype != dtype:
+        matrix = matrix.astype(dtype)
+    return names, matrix
+
+
+def read_pairs_matrix(
+        filepath: str, dtype: Optional[np.dtype] = None, default_names: Optional[List[str]] = None,
+) -> Tuple[List[str], sparse.csr_matrix]:
+    """
+    Read a sparse similarity matrix from a TSV file with a header and one triplet of two names and their similarity per
+    line. All pairs that are not listed have a similarity of zero. The matrix is symmetrized, i.e., every pair needs to
+    be listed only once.
+
+    Args:
+        filepath: Path to the file storing the triplets
+        dtype: Datatype of the values, float64 if None
+        default_names: Names of all entities, also the ones that do not occur in any pair
+
+    Returns:
+        A list of names of the entities and the sparse matrix of their similarities
+    """
+    first, second, values = read_columns(filepath, 3, id_columns=2)
+    known = np.asarray(default_names if default_names is not None else [], dtype=object)
+    codes, names = pd.factorize(np.concatenate([known, first.astype(str), second.astype(str)]).astype(object))
+    rows, cols = codes[len(known):len(known) + len(first)], codes[len(known) + len(first):]
+    matrix = sparse.csr_matrix((values.astype(dtype or np.float64), (rows, cols)), shape=(len(names), len(names)))
+    return names.tolist(), matrix.maximum(matrix.T).tocsr()
+
+
+def _mmap_npz_member(filepath: str, info: zipfile.ZipInfo) -> np.memmap:
+    """
+    Memory-map an uncompressed array from an NPZ archive by locating its data within the archive.
+
+    Args:
+        filepath: Path to the NPZ archive
+        info: Archive entry of the array
+
+    Returns:
+        The memory-mapped array
+    """
+    with open(filepath, "rb") as data:
+        # the local header has a fixed size of 30 bytes followed by the filename and an extra field
+        data.seek(info.header_offset + 26)
+        name_length, extra_length = struct.unpack("<HH", data.read(4))
+        data.seek(info.header_offset + 30 + name_length + extra_length)
+        if np.lib.format.read_magic(data) == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(data)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(data)
+        offset = data.tell()
+    return np.memmap(filepath, dtype=dtype, mode="r", offset=offset, shape=shape, order="F" if fortran_order else "C")
+
+
+def read_columns(filepath: str, num_columns: int = 2, id_columns: int = 1) -> Tuple[np.ndarray, ...]:
+    """
+    Read the first columns of a TSV file in one bulk operation instead of iterating over the rows of a DataFrame.
+    Parquet and Arrow files are read column-wise without parsing text. The leading ID columns are always read as
+    strings, so numeric IDs match the IDs read from the entity files.
+
+    Args:
+        filepath: Path to the TSV, Parquet, or Arrow file to read the columns from
+        num_columns: Number of leading columns to read, all other columns are skipped while parsing
+        id_columns: Number of leading columns storing IDs, they are returned as arrays of strings
+
+    Returns:
+        The requested columns of the file (without the header)
+    """
+    if is_columnar(filepath):
+        columns = read_columnar(filepath, num_columns)
+        return tuple(c.astype(str).astype(object) if i < id_columns else c for i, c in enumerate(columns))
+    df = pd.read_csv(filepath, sep="\t", usecols=range(num_columns), dtype={i: str for i in range(id_columns)})
+    return tuple(df.iloc[:, i].to_numpy(dtype=object if i < id_columns else None) for i in range(num_columns))
 
 
 def read_csv(filepath: str) -> Generator[Tuple[str, str], None, None]:
@@ -158,13 +494,14 @@ def read_csv(filepath: str) -> Generator[Tuple[str, str], None, None]:
     Yields:
         Pairs of strings from the file
     """
-    df = pd.read_csv(filepath, sep="\t")
-    for index in df.index:
-        yield df.iloc[index, :2]
+    yield from zip(*read_columns(filepath, id_columns=2))
 
 
 def read_matrix_input(
-        in_data: MATRIX_INPUT, max_val: float = 1.0, default_names: Optional[List[str]] = None
+        in_data: MATRIX_INPUT,
+        max_val: float = 1.0,
+        default_names: Optional[List[str]] = None,
+        dtype: Optional[np.dtype] = None,
 ) -> Tuple[List[str], Union[np.ndarray, str], float]:
     """
     Read the data from different types of similarity or distance.
@@ -173,6 +510,8 @@ def read_matrix_input(
         in_data: Matrix data encoding the similarities/distances and the names of the samples
         max_val: Maximal value of the used metric, either distance or similarity
         default_names: Names to use as default, if max_val specifies a clustering method
+        dtype: Datatype to read matrices from files as, e.g. np.float32 to halve the memory footprint. If None, text
+            files are read as float64 and binary files keep the datatype they have been stored with.
 
     Returns:
         Tuple of names of the data samples, a matrix holding their similarities/distances or a string encoding a method
@@ -180,7 +519,7 @@ def read_matrix_input(
     """
     if isinstance(in_data, str):
         if os.path.isfile(in_data):
-            names, similarity = read_clustering_file(in_data)
+            names, similarity = read_clustering_file(in_data, dtype=dtype, default_names=default_names)
             threshold = max_val
         else:
             names = default_names
@@ -203,10 +542,11 @@ def read_data(
         dist: MATRIX_INPUT,
         max_sim: float,
         max_dist: float,
-        inter: Optional[List[Tuple[str, str]]],
+        inter: Optional[Union[InteractionTable, List[Tuple[str, str]]]],
         index: Optional[int],
         tool_args: str,
         dataset: DataSet,
+        matrix_dtype: Optional[str] = None,
 ) -> DataSet:
     """
     Compute the weight and distances or similarities of every entity.
@@ -221,6 +561,7 @@ def read_data(
         index: Index of the entities in the interaction file
         tool_args: Additional arguments for the tool
         dataset: A dataset object storing information on the read
+        matrix_dtype: Datatype to read similarity and distance matrices from files as, None to keep their datatype
 
     Returns:
         A dataset storing all information on that datatype
@@ -228,7 +569,8 @@ def read_data(
     # parse the protein weights
     if weights is not None:
         if isinstance(weights, str):
-            dataset.weights = dict((n, float(w)) for n, w in read_csv(weights))
+            names, values = read_columns(weights)
+            dataset.weights = dict(zip(names, values.astype(float).tolist()))
         elif isinstance(weights, dict):
             dataset.weights = weights
         elif isinstance(weights, Callable):
@@ -247,10 +589,13 @@ def read_data(
         dataset.threshold = 1
     elif sim is not None:
         dataset.names, dataset.similarity, dataset.threshold = \
-            read_matrix_input(sim, max_sim, list(dataset.data.keys()))
+            read_matrix_input(sim, max_sim, list(dataset.data.keys()), matrix_dtype)
     elif dist is not None:
         dataset.names, dataset.distance, dataset.threshold = \
-            read_matrix_input(dist, max_dist, list(dataset.data.keys()))
+            read_matrix_input(dist, max_dist, list(dataset.data.keys()), matrix_dtype)
+        if sparse.issparse(dataset.distance):
+            raise ValueError("Sparse matrices are only supported for similarities as missing pairs would have a "
+                             "distance of zero.")
     else:
         if sim is not None:
             dataset.similarity = sim
@@ -265,20 +610,59 @@ def read_data(
     return dataset
 
 
-def read_folder(folder_path: str, file_extension: Optional[str] = None) -> Generator[Tuple[str, str], None, None]:
+def read_folder(
+        folder_path: str, file_extension: Optional[Union[str, Tuple[str, ...]]] = None
+) -> Generator[Tuple[str, str], None, None]:
     """
-    Read in all PDB file from a folder and ignore non-PDB files.
+    Read in all PDB file from a folder and ignore non-PDB files. Compressed files are matched and named by the
+    extension of their content, e.g., "1abc.pdb.gz" is named "1abc" and considered a PDB file.
 
     Args:
         folder_path: Path to the folder storing the PDB files
-        file_extension: File extension to parse, None if the files shall not be filtered
+        file_extension: File extension or tuple of file extensions to parse, None if the files shall not be filtered
 
     Yields:
         Pairs of the PDB files name and the path to the file
     """
-    for filename in os.listdir(folder_path):
-        if file_extension is None or filename.endswith(file_extension):
-            yield ".".join(filename.split(".")[:-1]), os.path.abspath(os.path.join(folder_path, filename))
+    folder_path = os.path.abspath(folder_path)
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            plain_name = strip_compression(entry.name)
+            if (file_extension is None or plain_name.endswith(file_extension)) and entry.is_file():
+                yield ".".join(plain_name.split(".")[:-1]), entry.path
+
+
+def file_digest(path: str) -> bytes:
+    """
+    Compute a digest of the (decompressed) content of a file by streaming it in blocks.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        SHA1 digest of the content of the file
+    """
+    digest = hashlib.sha1()
+    with open_file(path, "rb") as data:
+        for block in iter(lambda: data.read(FILE_DIGEST_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def file_digests(data: Dict[str, str], num_threads: int = 1) -> Dict[str, bytes]:
+    """
+    Replace the paths to files by digests of their content to deduplicate byte-identical files independent of their
+    names. The files are hashed in a thread pool as hashing and decompressing release the GIL.
+
+    Args:
+        data: Mapping from entity names to the paths of their files
+        num_threads: Number of threads to hash files in
+
+    Returns:
+        Mapping from entity names to values that are equal iff the contents of the files are equal
+    """
+    with ThreadPoolExecutor(max_workers=max(num_threads, 1)) as executor:
+        return dict(zip(data.keys(), executor.map(file_digest, data.values())))
 
 
 def get_prefix_args(prefix, **kwargs) -> Dict[str, Any]:
@@ -293,3 +677,47 @@ def get_prefix_args(prefix, **kwargs) -> Dict[str, Any]:
         A subset of the key-value-pairs
     """
     return {k[len(prefix):]: v for k, v in kwargs.items() if k.startswith(prefix)}
+
+
+def remove_duplicate_values(dataset: DataSet, data: Dict[str, Any]) -> DataSet:
+    """
+    Merge entities with equal values. The first entity with a value represents all others, it accumulates their
+    weights and is the only one kept in the names and matrices of the dataset. Entities without a value are removed.
+
+    Args:
+        dataset: The dataset to remove duplicates from
+        data: Mapping from entity names to the values that identify duplicates
+
+    Returns:
+        The dataset without duplicates and with an ID-map pointing every entity to its representative
+    """
+    keys = pd.Index(list(data.keys()))
+    codes, _ = pd.factorize(pd.Series(list(data.values()), dtype=object), use_na_sentinel=False)
+    first = np.unique(codes, return_index=True)[1][codes]
+    dataset.id_map = dict(zip(keys.tolist(), keys[first].tolist()))
+
+    # positions of the names in data and of their representatives, -1 for names without a value
+    names = np.asarray(dataset.names, dtype=object)
+    pos = keys.get_indexer(names)
+    rep = np.full(len(pos), -1, dtype=np.int64)
+    rep[pos >= 0] = first[pos[pos >= 0]]
+    keep = (pos >= 0) & (rep == pos)
+    duplicate = (pos >= 0) & (rep != pos)
+
+    if duplicate.any():
+        dups = names[duplicate].tolist()
+        added = pd.Series(dataset.weights).loc[dups].groupby(keys[rep[duplicate]].to_numpy()).sum()
+        for name, weight in zip(added.index.tolist(), added.tolist()):
+            dataset.weights[name] += weight
+        for name in dups:
+            del dataset.data[name]
+            del dataset.weights[name]
+
+    if not keep.all():
+        # select the remaining rows and columns at once, this copies a matrix once instead of once per axis
+        keep = np.flatnonzero(keep)
+        dataset.names = names[keep].tolist()
+        dataset.similarity = permute_matrix(dataset.similarity, keep)
+        dataset.distance = permute_matrix(dataset.distance, keep)
+
+    return dataset
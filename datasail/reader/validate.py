@@ -2,8 +2,9 @@ import os
 from argparse import Namespace
 from typing import Tuple, Union, Optional
 
-from datasail.parsers import MultiYAMLParser
-from datasail.settings import CDHIT, MMSEQS2, MASH, MASH_SKETCH, MASH_DIST, FOLDSEEK, MMSEQS, get_default, CDHIT_EST
+from datasail.parsers import get_yaml_parser
+from datasail.settings import CDHIT, MMSEQS2, MASH, MASH_SKETCH, MASH_DIST, FOLDSEEK, MMSEQS, get_default, CDHIT_EST, \
+    ECFP
 
 
 def validate_user_args(
@@ -38,10 +39,27 @@ def validate_user_args(
         return check_foldseek_arguments(tool_args)
     elif (dist_on and distance.lower().startswith(MASH)) or (both_none and get_default(dtype, dformat)[1] == MASH):
         return check_mash_arguments(tool_args)
+    elif (sim_on and similarity.lower() == ECFP) or (both_none and get_default(dtype, dformat)[0] == ECFP):
+        return check_ecfp_arguments(tool_args)
     else:
         return None
 
 
+def check_ecfp_arguments(args: str = "") -> Namespace:
+    """
+    Validate the custom arguments provided to DataSAIL for computing ECFP-based Tanimoto similarities.
+
+    Args:
+        args: String of the arguments that can be set by user
+    """
+    args = get_yaml_parser(ECFP).parse_args(args)
+    if not (0 <= args.threshold <= 1):
+        raise ValueError("Invalid value for --threshold. It should be between 0 and 1.")
+    if not (0 <= args.neighbors):
+        raise ValueError("Invalid value for --neighbors. It should be greater than or equal to 0.")
+    return args
+
+
 def check_cdhit_est_arguments(args: str = "") -> Namespace:
     """
     Validate the custom arguments provided to DataSAIL for executing CD-HIT-EST.
@@ -50,7 +68,7 @@ def check_cdhit_est_arguments(args: str = "") -> Namespace:
         args: String of the arguments that can be set by user
     """
     # args = args.split(" ") if " " in args else (args if isinstance(args, list) else [args])
-    args = MultiYAMLParser(CDHIT_EST).parse_args(args)
+    args = get_yaml_parser(CDHIT_EST).parse_args(args)
     # Check if -c, -s, -aL, -aS, -uL, -uS values are within the valid range
     if not (0 <= args.c <= 1):
         raise ValueError("Invalid value for -c. It should be between 0 and 1.")
@@ -125,7 +143,7 @@ def check_cdhit_arguments(args: str = "") -> Namespace:
         args: String of the arguments that can be set by user
     """
     # args = args.split(" ") if " " in args else (args if isinstance(args, list) else [args])
-    args = MultiYAMLParser(CDHIT).parse_args(args)
+    args = get_yaml_parser(CDHIT).parse_args(args)
     # Check if -c, -s, -aL, -aS, -uL, -uS values are within the valid range
     if not (0 <= args.c <= 1):
         raise ValueError("Invalid value for -c. It should be between 0 and 1.")
@@ -217,7 +235,7 @@ def check_mmseqs_arguments(args: str = "") -> Optional[Namespace]:
         The namespace containing the parsed and validated arguments.
     """
     # Reference: https://github.com/soedinglab/MMseqs2/blob/master/src/commons/Parameters.cpp
-    args = MultiYAMLParser(MMSEQS2).parse_args(args)
+    args = get_yaml_parser(MMSEQS2).parse_args(args)
 
     # Define a function to check valid range
     def check_valid_range(value, min_val, max_val, name):
@@ -315,7 +333,7 @@ def check_foldseek_arguments(args: str = "") -> Namespace:
     Returns:
         args: Validated Namespace object
     """
-    args = MultiYAMLParser(FOLDSEEK).parse_args(args)
+    args = get_yaml_parser(FOLDSEEK).parse_args(args)
 
     if not (0 <= args.comp_bias_corr <= 1):
         raise ValueError("Invalid value for comp_bias_corr. It should be between 0 and 1.")
@@ -487,7 +505,7 @@ def check_mash_sketch_arguments(args: str = "") -> Namespace:
         The namespace containing the parsed and validated arguments.
     """
     # args = args.split(" ") if " " in args else (args if isinstance(args, list) else [args])
-    args = MultiYAMLParser(MASH_SKETCH).parse_args(args)
+    args = get_yaml_parser(MASH_SKETCH).parse_args(args)
 
     # Check if _p is valid
     if args.p < 1:
@@ -589,7 +607,7 @@ def check_mash_dist_arguments(args: str = ""):
         The namespace containing the parsed and validated arguments.
     """
     # args = args.split(" ") if " " in args else (args if isinstance(args, list) else [args])
-    args = MultiYAMLParser(MASH_DIST).parse_args(args)
+    args = get_yaml_parser(MASH_DIST).parse_args(args)
 
     if not (0 <= args.v <= 1):
         raise ValueError("Invalid value for -v. It should be between 0 and 1.")
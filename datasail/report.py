@@ -4,11 +4,10 @@ from typing import Dict, List, Optional, Tuple, Set
 
 import numpy as np
 import pandas as pd
-from matplotlib import pyplot as plt
-from sklearn.manifold import TSNE
 
+from datasail.reader.columnar import write_columnar
 from datasail.reader.utils import DataSet, DictMap
-from datasail.settings import LOGGER, NOT_ASSIGNED, DIM_2, MODE_F, MODE_E, SRC_CL
+from datasail.settings import LOGGER, NOT_ASSIGNED, DIM_2, MODE_F, MODE_E, SRC_CL, OUTPUT_TSV, OUTPUT_PARQUET
 
 
 def report(
@@ -23,6 +22,7 @@ def report(
         runs: int,
         output_dir: str,
         split_names: List[str],
+        output_format: str = OUTPUT_TSV,
 ) -> None:
     """
     Central entrypoint to create reports on the computed splits. This stores t-SNE plots, histograms, cluster- and
@@ -40,6 +40,7 @@ def report(
         runs:
         output_dir: Output directory where to store the results
         split_names: Names of the splits
+        output_format: File format to store the assignments in
     """
     # create the output folder to store the results in
     os.makedirs(output_dir, exist_ok=True)
@@ -59,7 +60,7 @@ def report(
 
             # save mapping of interactions for this split if applicable
             if t in inter_split_map:
-                save_inter_assignment(save_dir, inter_split_map[t][run])
+                save_inter_assignment(save_dir, inter_split_map[t][run], output_format)
 
             # Compile report for first dataset if applies for this split
             if e_dataset.type is not None and ((mode is not None and mode == MODE_E) or t[-1] == DIM_2) and \
@@ -70,7 +71,8 @@ def report(
                     dict((t, e_name_split_map[t][run]) for t in e_name_split_map),
                     dict((t, e_cluster_split_map[t][run]) for t in e_cluster_split_map),
                     t,
-                    split_names
+                    split_names,
+                    output_format,
                 )
 
             # Compile report for second dataset if applies for this split
@@ -82,7 +84,8 @@ def report(
                     dict((t, f_name_split_map[t][run]) for t in f_name_split_map),
                     dict((t, f_cluster_split_map[t][run]) for t in f_cluster_split_map),
                     t,
-                    split_names
+                    split_names,
+                    output_format,
                 )
 
 
@@ -93,6 +96,7 @@ def individual_report(
         cluster_split_map: Dict[str, Dict[str, str]],
         technique: str,
         split_names: List[str],
+        output_format: str = OUTPUT_TSV,
 ) -> None:
     """
     Create all the report files for one dataset and one technique.
@@ -104,13 +108,14 @@ def individual_report(
         cluster_split_map: Mapping from cluster names to splits.
         technique: Technique to treat here.
         split_names: Names of the splits.
+        output_format: File format to store the assignments in.
     """
     # Save assignment of names to splits
-    save_assignment(save_dir, dataset, name_split_map.get(technique, None))
+    save_assignment(save_dir, dataset, name_split_map.get(technique, None), output_format)
 
     # Save clustering-related reports
     if technique[0] == SRC_CL:
-        save_clusters(save_dir, dataset)
+        save_clusters(save_dir, dataset, output_format)
         save_t_sne(save_dir, dataset, name_split_map.get(technique, None), cluster_split_map.get(technique, None),
                    split_names)
         save_cluster_hist(save_dir, dataset)
@@ -123,24 +128,44 @@ def individual_report(
     # print(stats_string(sum(dataset.weights.values()), split_counts))
 
 
-def save_inter_assignment(save_dir: str, inter_split_map: Optional[Dict[Tuple[str, str], str]]) -> None:
+def save_table(df: pd.DataFrame, filepath: str, output_format: str = OUTPUT_TSV) -> None:
     """
-    Save the assignment of interactions to splits in a TSV file.
+    Save a table in the requested format. The extension of the file is chosen according to the format.
+
+    Args:
+        df: Table to store
+        filepath: Path to the output file without extension
+        output_format: File format to store the table in, either tsv, parquet, or arrow
+    """
+    if output_format == OUTPUT_TSV:
+        df.to_csv(f"{filepath}.tsv", sep="\t", index=False)
+    else:
+        write_columnar(df, f"{filepath}.{'parquet' if output_format == OUTPUT_PARQUET else 'arrow'}")
+
+
+def save_inter_assignment(
+        save_dir: str, inter_split_map: Optional[Dict[Tuple[str, str], str]], output_format: str = OUTPUT_TSV
+) -> None:
+    """
+    Save the assignment of interactions to splits in a table.
 
     Args:
         save_dir: Directory to store the file in.
         inter_split_map: Mapping from interactions to the splits
+        output_format: File format to store the assignment in
     """
     if inter_split_map is None:
         return
 
-    pd.DataFrame(
+    save_table(pd.DataFrame(
         [(x1, x2, x3) for (x1, x2), x3 in inter_split_map.items()],
         columns=["E_ID", "F_ID", "Split"],
-    ).to_csv(os.path.join(save_dir, "inter.tsv"), sep="\t", columns=["E_ID", "F_ID", "Split"], index=False)
+    ), os.path.join(save_dir, "inter"), output_format)
 
 
-def save_assignment(save_dir: str, dataset: DataSet, name_split_map: Optional[Dict[str, str]]) -> None:
+def save_assignment(
+        save_dir: str, dataset: DataSet, name_split_map: Optional[Dict[str, str]], output_format: str = OUTPUT_TSV
+) -> None:
     """
     Save an assignment from data points to splits.
 
@@ -148,37 +173,39 @@ def save_assignment(save_dir: str, dataset: DataSet, name_split_map: Optional[Di
         save_dir: Directory to store the file in
         dataset: Dataset to store the sample assignment from
         name_split_map: Mapping from sample ids to their assigned splits.
+        output_format: File format to store the assignment in
     """
     if name_split_map is None:
         return
 
     filepath = os.path.join(
-        save_dir, f"{char2name(dataset.type)}_{dataset.location.split('/')[-1].split('.')[0]}_splits.tsv"
+        save_dir, f"{char2name(dataset.type)}_{dataset.location.split('/')[-1].split('.')[0]}_splits"
     )
 
-    pd.DataFrame(
+    save_table(pd.DataFrame(
         [(x1, name_split_map.get(x2, "")) for x1, x2 in dataset.id_map.items()],
         columns=["ID", "Split"]
-    ).to_csv(filepath, sep="\t", columns=["ID", "Split"], index=False)
+    ), filepath, output_format)
 
 
-def save_clusters(save_dir: str, dataset: DataSet) -> None:
+def save_clusters(save_dir: str, dataset: DataSet, output_format: str = OUTPUT_TSV) -> None:
     """
-    Save a clustering to a TSV file. The clustering is the mapping from data points to cluster representatives or names.
+    Save a clustering to a table. The clustering is the mapping from data points to cluster representatives or names.
 
     Args:
         save_dir: Directory to store the file in
         dataset: Dataset to store the cluster assignment from
+        output_format: File format to store the clustering in
     """
     if dataset.cluster_map is None:
         return
     filepath = os.path.join(
-        save_dir, f"{char2name(dataset.type)}_{dataset.location.split('/')[-1].split('.')[0]}_clusters.tsv"
+        save_dir, f"{char2name(dataset.type)}_{dataset.location.split('/')[-1].split('.')[0]}_clusters"
     )
-    pd.DataFrame(
+    save_table(pd.DataFrame(
         [(x1, dataset.cluster_map.get(x2, "")) for x1, x2 in dataset.id_map.items()],
         columns=["ID", "Cluster_ID"],
-    ).to_csv(filepath, sep="\t", columns=["ID", "Cluster_ID"], index=False)
+    ), filepath, output_format)
 
 
 def save_t_sne(
@@ -235,6 +262,9 @@ def save_matrix_tsne(
         save_dir: Directory where to save the computed tSNE plot
         postfix: Postfix for the filename
     """
+    from matplotlib import pyplot as plt
+    from sklearn.manifold import TSNE
+
     distances = distances if distances is not None else 1 - similarities
     output_file_name = os.path.join(
         save_dir, f"{char2name(dataset.type)}_{dataset.location.split('/')[-1].split('.')[0]}_{postfix}.png"
@@ -269,6 +299,8 @@ def save_cluster_hist(save_dir: str, dataset: DataSet) -> None:
         save_dir: Directory to store the image in
         dataset: Dataset to compute the visualization for
     """
+    from matplotlib import pyplot as plt
+
     clusters = set(dataset.cluster_map.values())
     clusters = dict((c, i) for i, c in enumerate(clusters))
     counts = [0] * len(clusters)
@@ -1,13 +1,15 @@
 import time
-from typing import Dict, Tuple
+from typing import Dict, Tuple, List, Optional
+
+import numpy as np
 
-from datasail.argparse_patch import remove_patch
 from datasail.cluster.clustering import cluster
 from datasail.reader.read import read_data
-from datasail.reader.utils import DataSet
+from datasail.reader.utils import DataSet, InteractionTable
 from datasail.report import report
 from datasail.settings import LOGGER, KW_TECHNIQUES, KW_EPSILON, KW_RUNS, KW_SPLITS, KW_NAMES, \
-    KW_MAX_SEC, KW_MAX_SOL, KW_SOLVER, KW_LOGDIR, NOT_ASSIGNED, KW_OUTDIR, MODE_E, MODE_F, DIM_2, SRC_CL
+    KW_MAX_SEC, KW_MAX_SOL, KW_SOLVER, KW_LOGDIR, NOT_ASSIGNED, KW_OUTDIR, KW_OUTPUT_FORMAT, OUTPUT_TSV, MODE_E, \
+    MODE_F, DIM_2, SRC_CL, TEC_R
 from datasail.solver.solve import run_solver, insert
 
 
@@ -18,7 +20,6 @@ def datasail_main(**kwargs) -> Tuple[Dict, Dict, Dict]:
     Args:
         **kwargs: Parsed commandline arguments to DataSAIL.
     """
-    kwargs = remove_patch(**kwargs)
     start = time.time()
     LOGGER.info("Read data")
 
@@ -40,15 +41,12 @@ def datasail_main(**kwargs) -> Tuple[Dict, Dict, Dict]:
         f_dataset = cluster(f_dataset, **kwargs)
 
     if inter is not None:
-        if e_dataset.type is not None and f_dataset.type is not None:
-            new_inter = [(e_dataset.id_map[x[0]], f_dataset.id_map[x[1]])
-                         for x in filter(lambda x: x[0] in e_dataset.id_map and x[1] in f_dataset.id_map, inter)]
-        elif e_dataset.type is not None:
-            new_inter = [(e_dataset.id_map[x[0]], x[1]) for x in filter(lambda x: x[0] in e_dataset.id_map, inter)]
-        elif f_dataset.type is not None:
-            new_inter = [(x[0], f_dataset.id_map[x[1]]) for x in filter(lambda x: x[1] in f_dataset.id_map, inter)]
-        else:
+        if e_dataset.type is None and f_dataset.type is None:
             raise ValueError()
+        new_inter = inter.map_names(
+            e_dataset.id_map if e_dataset.type is not None else None,
+            f_dataset.id_map if f_dataset.type is not None else None,
+        )
     else:
         new_inter = None
 
@@ -75,22 +73,26 @@ def datasail_main(**kwargs) -> Tuple[Dict, Dict, Dict]:
     # infer interaction assignment from entity assignment if necessary and possible
     output_inter_split_map = dict()
     if new_inter is not None:
+        pairs = list(inter)
+        e_reps, f_reps = None, None
         for technique in kwargs[KW_TECHNIQUES]:
             output_inter_split_map[technique] = []
             for run in range(kwargs[KW_RUNS]):
-                output_inter_split_map[technique].append(dict())
-                for e, f in inter:
-                    if technique.endswith(DIM_2) or technique == "R":
-                        output_inter_split_map[technique][-1][(e, f)] = inter_split_map[technique][run].get(
-                            (e_dataset.id_map.get(e, ""), f_dataset.id_map.get(f, "")), NOT_ASSIGNED)
-                    elif technique in e_name_split_map:
-                        output_inter_split_map[technique][-1][(e, f)] = e_name_split_map[technique][run].get(
-                            e_dataset.id_map.get(e, ""), NOT_ASSIGNED)
-                    elif technique in f_name_split_map:
-                        output_inter_split_map[technique][-1][(e, f)] = f_name_split_map[technique][run].get(
-                            f_dataset.id_map.get(f, ""), NOT_ASSIGNED)
-                    else:
-                        raise ValueError()
+                if technique.endswith(DIM_2) or technique == TEC_R:
+                    if e_reps is None:
+                        e_reps = inter.lookup(0, e_dataset.id_map, "") if e_dataset.id_map is not None \
+                            else inter.names(0)
+                        f_reps = inter.lookup(1, f_dataset.id_map, "") if f_dataset.id_map is not None \
+                            else inter.names(1)
+                    split_map = inter_split_map[technique][run]
+                    splits = [split_map.get(key, NOT_ASSIGNED) for key in zip(e_reps.tolist(), f_reps.tolist())]
+                elif technique in e_name_split_map:
+                    splits = map_splits(inter, 0, e_dataset.id_map, e_name_split_map[technique][run])
+                elif technique in f_name_split_map:
+                    splits = map_splits(inter, 1, f_dataset.id_map, f_name_split_map[technique][run])
+                else:
+                    raise ValueError()
+                output_inter_split_map[technique].append(dict(zip(pairs, splits)))
 
     LOGGER.info("BQP splitting finished and results stored.")
     LOGGER.info(f"Total runtime: {time.time() - start:.5f}s")
@@ -108,6 +110,7 @@ def datasail_main(**kwargs) -> Tuple[Dict, Dict, Dict]:
             runs=kwargs[KW_RUNS],
             output_dir=kwargs[KW_OUTDIR],
             split_names=kwargs[KW_NAMES],
+            output_format=kwargs.get(KW_OUTPUT_FORMAT, OUTPUT_TSV),
         )
     else:
         full_e_name_split_map = fill_split_maps(e_dataset, e_name_split_map)
@@ -115,6 +118,29 @@ def datasail_main(**kwargs) -> Tuple[Dict, Dict, Dict]:
         return full_e_name_split_map, full_f_name_split_map, output_inter_split_map
 
 
+def map_splits(
+        inter: InteractionTable, mode: int, id_map: Optional[Dict[str, str]], name_split_map: Dict[str, str]
+) -> List[str]:
+    """
+    Assign interactions to splits based on the split of one of their entities. The assignment is looked up once per
+    entity in the vocabulary of the interaction table and then broadcast to all interactions.
+
+    Args:
+        inter: Table of interactions to assign to splits
+        mode: Position of the entity to read the assignment from, 0 for the e-entities and 1 for the f-entities
+        id_map: Mapping from entity names to their representatives after deduplication
+        name_split_map: Mapping from representatives to their splits
+
+    Returns:
+        List of splits, one per interaction
+    """
+    names, index = (inter.e_names, inter.e_index) if mode == 0 else (inter.f_names, inter.f_index)
+    reps = names.tolist() if id_map is None else [id_map.get(name, "") for name in names.tolist()]
+    assignment = np.empty(len(reps), dtype=object)
+    assignment[:] = [name_split_map.get(rep, NOT_ASSIGNED) for rep in reps]
+    return assignment[index].tolist()
+
+
 def fill_split_maps(dataset: DataSet, name_split_map: Dict) -> Dict:
     """
     Convert structure of name split map.
@@ -1,11 +1,14 @@
 import os.path
-from typing import Dict, List, Callable, Union, Generator
+from importlib.util import find_spec
+from typing import Dict, List, Callable, Union, Generator, TYPE_CHECKING
 
 from datasail.parsers import parse_datasail_args
-from datasail.reader.utils import DATA_INPUT, MATRIX_INPUT
-from datasail.routine import datasail_main
 from datasail.settings import *
 
+if TYPE_CHECKING:
+    # the readers, clustering algorithms, and solvers are only imported once a split is computed to start quickly
+    from datasail.reader.utils import DATA_INPUT, MATRIX_INPUT
+
 
 def error(msg: str, error_code: int, cli: bool) -> None:
     """
@@ -28,7 +31,7 @@ def validate_args(**kwargs) -> Dict[str, object]:
     Validate the arguments given to the program.
 
     Notes:
-        next error code: 26
+        next error code: 30
 
     Args:
         **kwargs: Arguments in kwargs-format
@@ -98,6 +101,20 @@ def validate_args(**kwargs) -> Dict[str, object]:
     if kwargs[KW_RUNS] < 1:
         error("The number of runs cannot be lower than 1.", 25, kwargs[KW_CLI])
 
+    # check the identity to detect duplicate molecules by
+    if kwargs.get(KW_DEDUP_KEY, DEDUP_INCHIKEY) not in DEDUP_KEYS:
+        error(f"The key to detect duplicates has to be one of {', '.join(DEDUP_KEYS)}.", 26, kwargs[KW_CLI])
+
+    # check the format to store the assignments in
+    if kwargs.get(KW_OUTPUT_FORMAT, OUTPUT_TSV) not in OUTPUT_FORMATS:
+        error(f"The output format has to be one of {', '.join(OUTPUT_FORMATS)}.", 27, kwargs[KW_CLI])
+    if kwargs.get(KW_OUTPUT_FORMAT, OUTPUT_TSV) != OUTPUT_TSV and find_spec("pyarrow") is None:
+        error("Storing the assignments in Parquet or Arrow format requires the pyarrow package.", 28, kwargs[KW_CLI])
+
+    # check the datatype to read matrices as
+    if kwargs.get(KW_MATRIX_DTYPE, None) not in [None] + MATRIX_DTYPES:
+        error(f"The datatype of matrices has to be one of {', '.join(MATRIX_DTYPES)}.", 29, kwargs[KW_CLI])
+
     # check the input regarding the caching
     if kwargs[KW_CACHE] is not None and kwargs[KW_CACHE_DIR] is not None and isinstance(kwargs[KW_CACHE_DIR], str) and \
             not os.path.isdir(kwargs[KW_CACHE_DIR]):
@@ -148,6 +165,9 @@ def validate_args(**kwargs) -> Dict[str, object]:
 def datasail(
         techniques: Union[str, List[str], Callable[..., List[str]], Generator[str, None, None]] = None,
         inter: Union[str, List[Tuple[str, str]], Callable[..., List[str]], Generator[str, None, None]] = None,
+        weighted_inter: bool = False,
+        dedup_key: str = DEDUP_INCHIKEY,
+        matrix_dtype: str = None,
         max_sec: int = 100,
         max_sol: int = 1000,
         verbose: str = "W",
@@ -159,18 +179,18 @@ def datasail(
         cache: bool = False,
         cache_dir: str = None,
         e_type: str = None,
-        e_data: DATA_INPUT = None,
-        e_weights: DATA_INPUT = None,
-        e_sim: MATRIX_INPUT = None,
-        e_dist: MATRIX_INPUT = None,
+        e_data: "DATA_INPUT" = None,
+        e_weights: "DATA_INPUT" = None,
+        e_sim: "MATRIX_INPUT" = None,
+        e_dist: "MATRIX_INPUT" = None,
         e_args: str = "",
         e_max_sim: float = 1.0,
         e_max_dist: float = 1.0,
         f_type: str = None,
-        f_data: DATA_INPUT = None,
-        f_weights: DATA_INPUT = None,
-        f_sim: MATRIX_INPUT = None,
-        f_dist: MATRIX_INPUT = None,
+        f_data: "DATA_INPUT" = None,
+        f_weights: "DATA_INPUT" = None,
+        f_sim: "MATRIX_INPUT" = None,
+        f_dist: "MATRIX_INPUT" = None,
         f_args: str = "",
         f_max_sim: float = 1.0,
         f_max_dist: float = 1.0,
@@ -182,6 +202,9 @@ def datasail(
     Args:
         techniques: List of techniques to split based on
         inter: Filepath to a TSV file storing interactions of the e-entities and f-entities.
+        weighted_inter: Weight entities by the summed values of their interactions (third column of inter)
+        dedup_key: Identity to detect duplicate molecules by, either inchikey, smiles, or connectivity
+        matrix_dtype: Datatype to read similarity and distance matrices from files as, either float64 or float32
         max_sec: Maximal number of seconds to take for optimizing a found solution.
         max_sol: Maximal number of solutions to look at when optimizing.
         verbose: Verbosity level for logging.
@@ -214,13 +237,14 @@ def datasail(
         Three dictionaries mapping techniques to another dictionary. The inner dictionary maps input id to their splits.
     """
     kwargs = validate_args(
-        output=None, techniques=techniques, inter=inter, max_sec=max_sec, max_sol=max_sol, verbosity=verbose,
-        splits=splits, names=names, epsilon=epsilon, runs=runs, solver=solver, cache=cache,
-        cache_dir=cache_dir, e_type=e_type, e_data=e_data, e_weights=e_weights, e_sim=e_sim, e_dist=e_dist,
-        e_args=e_args, e_max_sim=e_max_sim, e_max_dist=e_max_dist, f_type=f_type, f_data=f_data, f_weights=f_weights,
-        f_sim=f_sim, f_dist=f_dist, f_args=f_args, f_max_sim=f_max_sim, f_max_dist=f_max_dist, threads=threads,
-        cli=False,
+        output=None, techniques=techniques, inter=inter, weighted_inter=weighted_inter, dedup_key=dedup_key,
+        matrix_dtype=matrix_dtype, max_sec=max_sec, max_sol=max_sol, verbosity=verbose, splits=splits, names=names,
+        epsilon=epsilon, runs=runs, solver=solver, cache=cache, cache_dir=cache_dir, e_type=e_type, e_data=e_data,
+        e_weights=e_weights, e_sim=e_sim, e_dist=e_dist, e_args=e_args, e_max_sim=e_max_sim, e_max_dist=e_max_dist,
+        f_type=f_type, f_data=f_data, f_weights=f_weights, f_sim=f_sim, f_dist=f_dist, f_args=f_args,
+        f_max_sim=f_max_sim, f_max_dist=f_max_dist, threads=threads, cli=False,
     )
+    from datasail.routine import datasail_main
     return datasail_main(**kwargs)
 
 
@@ -233,4 +257,5 @@ def sail(args=None, **kwargs) -> None:
         kwargs = parse_datasail_args(args or sys.argv[1:])
     kwargs[KW_CLI] = True
     kwargs = validate_args(**kwargs)
+    from datasail.routine import datasail_main
     datasail_main(**kwargs)
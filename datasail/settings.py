@@ -1,9 +1,8 @@
 import logging
 import shutil
 import sys
-from typing import Tuple, Optional
-
-import cvxpy
+from collections.abc import Mapping
+from typing import Tuple, Optional, Dict, Iterator
 
 
 def get_default(data_type: str, data_format: str) -> Tuple[Optional[str], Optional[str]]:
@@ -68,15 +67,45 @@ MASH_DIST = "mash"
 TMALIGN = "tmalign"
 SIM_ALGOS = [WLK, MMSEQS, MMSEQS2, FOLDSEEK, CDHIT, CDHIT_EST, ECFP, ]
 DIST_ALGOS = [MASH, ]
-INSTALLED = {
-    CDHIT: shutil.which("cd-hit") is not None,
-    CDHIT_EST: shutil.which("cd-hit-est") is not None,
-    MMSEQS: shutil.which("mmseqs") is not None,
-    MMSEQS2: shutil.which("mmseqs") is not None,
-    MASH: shutil.which("mash") is not None,
-    FOLDSEEK: shutil.which("foldseek") is not None,
-    TMALIGN: shutil.which("TMalign") is not None,
-}
+
+
+class ToolAvailability(Mapping):
+    """
+    Mapping from tools to flags indicating whether they are installed. The PATH is only searched for a tool when it is
+    requested for the first time, so importing DataSAIL does not look up every tool.
+    """
+
+    def __init__(self, executables: Dict[str, str]) -> None:
+        """
+        Initialize the mapping without looking up any tool.
+
+        Args:
+            executables: Mapping from tools to the names of their executables
+        """
+        self.executables = executables
+        self.installed = {}
+
+    def __getitem__(self, tool: str) -> bool:
+        if tool not in self.installed:
+            self.installed[tool] = shutil.which(self.executables[tool]) is not None
+        return self.installed[tool]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.executables)
+
+    def __len__(self) -> int:
+        return len(self.executables)
+
+
+INSTALLED = ToolAvailability({
+    CDHIT: "cd-hit",
+    CDHIT_EST: "cd-hit-est",
+    MMSEQS: "mmseqs",
+    MMSEQS2: "mmseqs",
+    MASH: "mash",
+    FOLDSEEK: "foldseek",
+    TMALIGN: "TMalign",
+})
 
 UNK_LOCATION = "unknown"
 P_TYPE = "P"
@@ -98,7 +127,7 @@ YAML_FILE_NAMES = {
     CDHIT: "args/cdhit.yaml",
     CDHIT_EST: "args/cdhit_est.yaml",
     FOLDSEEK: "args/foldseek.yaml",
-    ECFP: "args/.yaml",
+    ECFP: "args/ecfp.yaml",
     MASH_SKETCH: "args/mash_sketch.yaml",
     MASH_DIST: "args/mash_dist.yaml",
 }
@@ -141,6 +170,25 @@ KW_SPLITS = "splits"
 KW_TECHNIQUES = "techniques"
 KW_THREADS = "threads"
 KW_VERBOSE = "verbosity"
+KW_WEIGHTED_INTER = "weighted_inter"
+KW_DEDUP_KEY = "dedup_key"
+KW_OUTPUT_FORMAT = "output_format"
+KW_MATRIX_DTYPE = "matrix_dtype"
+
+# identities to detect duplicate molecules by
+DEDUP_INCHIKEY = "inchikey"
+DEDUP_SMILES = "smiles"
+DEDUP_CONNECTIVITY = "connectivity"
+DEDUP_KEYS = [DEDUP_INCHIKEY, DEDUP_SMILES, DEDUP_CONNECTIVITY]
+
+# file formats to store the assignments in
+OUTPUT_TSV = "tsv"
+OUTPUT_PARQUET = "parquet"
+OUTPUT_ARROW = "arrow"
+OUTPUT_FORMATS = [OUTPUT_TSV, OUTPUT_PARQUET, OUTPUT_ARROW]
+
+# datatypes to read similarity and distance matrices from files as
+MATRIX_DTYPES = ["float64", "float32"]
 
 SOLVER_SCIP = "SCIP"
 SOLVER_CPLEX = "CPLEX"
@@ -165,15 +213,16 @@ N_CLUSTERS = 10
 # 1 Working
 # 2 Hardly installable
 # 3 Not installable
+# the values are cvxpy's names of the solvers, they are spelled out to not import cvxpy when loading the settings
 SOLVERS = {
     # "CBC": cvxpy.CBC,  # extra: CBC
     # "COPT": cvxpy.COPT,
     # SOLVER_GLPK: cvxpy.GLPK_MI,  # not powerful enough
-    SOLVER_SCIP: cvxpy.SCIP,
-    SOLVER_CPLEX: cvxpy.CPLEX,
-    SOLVER_GUROBI: cvxpy.GUROBI,
-    SOLVER_MOSEK: cvxpy.MOSEK,
-    SOLVER_XPRESS: cvxpy.XPRESS,
+    SOLVER_SCIP: "SCIP",
+    SOLVER_CPLEX: "CPLEX",
+    SOLVER_GUROBI: "GUROBI",
+    SOLVER_MOSEK: "MOSEK",
+    SOLVER_XPRESS: "XPRESS",
     # 0 "CLARABEL": cvxpy.CLARABEL,
     # 0 "GLOP": cvxpy.GLOP,
     # 0 "GLPK": cvxpy.GLPK,
@@ -2,17 +2,18 @@ from typing import List, Tuple, Optional, Dict, Union
 
 import cvxpy
 import numpy as np
+from scipy import sparse
 
 from datasail.solver.utils import solve, interaction_contraints, cluster_y_constraints, collect_results_2d, \
-    leakage_loss, compute_limits
+    leakage_loss, compute_limits, cluster_pairs, is_uniform
 
 
 def solve_ccd_blp(
         e_clusters: List[Union[str, int]],
-        e_similarities: Optional[np.ndarray],
+        e_similarities: Optional[Union[np.ndarray, sparse.csr_matrix]],
         e_distances: Optional[np.ndarray],
         f_clusters: List[Union[str, int]],
-        f_similarities: Optional[np.ndarray],
+        f_similarities: Optional[Union[np.ndarray, sparse.csr_matrix]],
         f_distances: Optional[np.ndarray],
         inter: np.ndarray,
         epsilon: float,
@@ -52,14 +53,17 @@ def solve_ccd_blp(
     x_f = cvxpy.Variable((len(splits), len(f_clusters)), boolean=True)
     x_i = {(e, f): cvxpy.Variable(len(splits), boolean=True) for e in range(len(e_clusters)) for f in
            range(len(f_clusters)) if inter[e, f] != 0}
-    y_e = [[cvxpy.Variable(1, boolean=True) for _ in range(e)] for e in range(len(e_clusters))]
-    y_f = [[cvxpy.Variable(1, boolean=True) for _ in range(f)] for f in range(len(f_clusters))]
 
     # check if the cluster relations are uniform
     e_intra_weights = e_similarities if e_similarities is not None else e_distances
     f_intra_weights = f_similarities if f_similarities is not None else f_distances
-    e_uniform = e_intra_weights is not None and np.allclose(e_intra_weights, np.ones_like(e_intra_weights))
-    f_uniform = f_intra_weights is not None and np.allclose(f_intra_weights, np.ones_like(f_intra_weights))
+    e_uniform, f_uniform = is_uniform(e_intra_weights), is_uniform(f_intra_weights)
+
+    # helper variables are only needed for pairs of clusters that can leak information
+    e_pairs = {} if e_uniform else cluster_pairs(e_intra_weights, len(e_clusters))
+    f_pairs = {} if f_uniform else cluster_pairs(f_intra_weights, len(f_clusters))
+    y_e = {pair: cvxpy.Variable(1, boolean=True) for pair in e_pairs}
+    y_f = {pair: cvxpy.Variable(1, boolean=True) for pair in f_pairs}
 
     def index(x, y):
         return (x, y) if (x, y) in x_i else None
@@ -72,12 +76,12 @@ def solve_ccd_blp(
     interaction_contraints(e_clusters, f_clusters, x_i, constraints, splits, x_e, x_f, min_lim, lambda key: inter[key],
                            index)
 
-    constraints += cluster_y_constraints(e_uniform, e_clusters, y_e, x_e, splits) + \
-        cluster_y_constraints(f_uniform, f_clusters, y_f, x_f, splits)
+    constraints += cluster_y_constraints(e_uniform, y_e, x_e, splits) + \
+        cluster_y_constraints(f_uniform, y_f, x_f, splits)
 
     inter_loss = (np.sum(inter) - sum(cvxpy.sum(x) for x in x_i.values())) / np.sum(inter)
-    e_loss = leakage_loss(e_uniform, e_intra_weights, y_e, e_clusters, e_similarities)
-    f_loss = leakage_loss(f_uniform, f_intra_weights, y_f, f_clusters, f_similarities)
+    e_loss = leakage_loss(e_uniform, e_pairs, y_e, e_similarities)
+    f_loss = leakage_loss(f_uniform, f_pairs, y_f, f_similarities)
 
     problem = solve(inter_loss + e_loss + f_loss, constraints, max_sec, solver, log_file)
 
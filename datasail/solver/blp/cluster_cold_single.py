@@ -2,14 +2,15 @@ from typing import List, Union, Optional, Dict
 
 import cvxpy
 import numpy as np
+from scipy import sparse
 
-from datasail.solver.utils import solve, cluster_y_constraints, compute_limits
+from datasail.solver.utils import solve, cluster_y_constraints, compute_limits, cluster_pairs, leakage_loss
 
 
 def solve_ccs_blp(
         clusters: List[Union[str, int]],
         weights: List[float],
-        similarities: Optional[np.ndarray],
+        similarities: Optional[Union[np.ndarray, sparse.csr_matrix]],
         distances: Optional[np.ndarray],
         epsilon: float,
         splits: List[float],
@@ -25,7 +26,7 @@ def solve_ccs_blp(
     Args:
         clusters: List of cluster names to split
         weights: Weights of the clusters in the order of their names in e_clusters
-        similarities: Pairwise similarity matrix of clusters in the order of their names
+        similarities: Pairwise similarity matrix of clusters in the order of their names, may be sparse
         distances: Pairwise distance matrix of clusters in the order of their names.
         epsilon: Additive bound for exceeding the requested split size
         splits: List of split sizes
@@ -40,21 +41,19 @@ def solve_ccs_blp(
     """
     min_lim = compute_limits(epsilon, sum(weights), splits)
 
+    # helper variables are only needed for pairs of clusters that can leak information
+    pair_weights = cluster_pairs(similarities if similarities is not None else distances, len(clusters))
     x = cvxpy.Variable((len(splits), len(clusters)), boolean=True)
-    y = [[cvxpy.Variable(1, boolean=True) for _ in range(e)] for e in range(len(clusters))]
-    
+    y = {pair: cvxpy.Variable(1, boolean=True) for pair in pair_weights}
+
     constraints = [cvxpy.sum(x, axis=0) == np.ones((len(clusters)))]
 
     for s, split in enumerate(splits):
         constraints.append(min_lim[s] <= cvxpy.sum(cvxpy.multiply(x[s], weights)))
 
-    constraints += cluster_y_constraints(False, clusters, y, x, splits)
+    constraints += cluster_y_constraints(False, y, x, splits)
 
-    intra_weights = similarities if similarities is not None else distances
-    tmp = [[intra_weights[e1, e2] * y[e1][e2] for e2 in range(e1)] for e1 in range(len(clusters))]
-    loss = cvxpy.sum([t for tmp_list in tmp for t in tmp_list])
-    if distances is not None:
-        loss = -loss
+    loss = leakage_loss(False, pair_weights, y, similarities)
     problem = solve(loss, constraints, max_sec, solver, log_file)
 
     return None if problem is None else {
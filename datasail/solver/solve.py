@@ -5,7 +5,7 @@ import numpy as np
 from cvxpy import SolverError
 
 from datasail.cluster.clustering import reverse_clustering, cluster_interactions, reverse_interaction_clustering
-from datasail.reader.utils import DataSet, DictMap
+from datasail.reader.utils import DataSet, DictMap, InteractionTable
 from datasail.settings import LOGGER, MODE_F, TEC_R, TEC_I1, TEC_C1, TEC_I2, TEC_C2, MMSEQS, CDHIT, MMSEQS2
 from datasail.solver.blp.id_cold_single import solve_ics_blp
 from datasail.solver.blp.id_cold_double import solve_icd_blp
@@ -33,7 +33,7 @@ def run_solver(
         techniques: List[str],
         e_dataset: DataSet,
         f_dataset: DataSet,
-        inter: Optional[Union[np.ndarray, List[Tuple[str, str]]]],
+        inter: Optional[Union[InteractionTable, List[Tuple[str, str]]]],
         epsilon: float,
         runs: int,
         splits: List[float],
@@ -9,7 +9,9 @@ import cvxpy
 from cvxpy import Variable
 from cvxpy.constraints.constraint import Constraint
 import numpy as np
+from scipy import sparse
 
+from datasail.reader.utils import InteractionTable
 from datasail.settings import LOGGER, SOLVER_CPLEX, SOLVER_XPRESS, SOLVER_SCIP, SOLVER_MOSEK, \
     SOLVER_GUROBI, SOLVERS, NOT_ASSIGNED
 
@@ -172,7 +174,7 @@ def solve(loss, constraints: List, max_sec: int, solver: str, log_file: str) ->
 
 
 def sample_categorical(
-        inter: List[Tuple[str, str]],
+        inter: Union[InteractionTable, List[Tuple[str, str]]],
         splits: List[float],
         names: List[str],
 ) -> Dict[Tuple[str, str], str]:
@@ -180,24 +182,21 @@ def sample_categorical(
     Sample interactions randomly into splits. This is the random split. It relies on the idea of categorical sampling.
 
     Args:
-        inter: List of interactions to split
+        inter: Table of interactions to split
         splits: List of splits given by their relative size
         names: List of names given by their relative size
 
-    Yields:
-        Chunks of interactions in order of the splits
+    Returns:
+        Mapping from interactions to the names of their splits
     """
-    np.random.shuffle(inter)
-
-    def gen():
-        for index in range(len(splits) - 1):
-            yield inter[int(sum(splits[:index]) * len(inter)):int(sum(splits[:(index + 1)]) * len(inter))]
-        yield inter[int(sum(splits[:-1]) * len(inter)):]
+    pairs = list(inter)
+    permutation = np.random.permutation(len(pairs))
+    bounds = [int(sum(splits[:index]) * len(pairs)) for index in range(len(splits))] + [len(pairs)]
 
-    output = {}
-    for i, split in enumerate(gen()):
-        output.update({(d, p): names[i] for d, p in split})
-    return output
+    assignment = np.empty(len(pairs), dtype=object)
+    for i, name in enumerate(names[:len(splits)]):
+        assignment[permutation[bounds[i]:bounds[i + 1]]] = name
+    return dict(zip(pairs, assignment.tolist()))
 
 
 def generate_baseline(
@@ -290,10 +289,48 @@ def interaction_contraints(
                     constraints.append(x_i[index][s] <= 0.75 * (x_e[s][i] + x_f[s][j]))
 
 
+def is_uniform(intra_weights: Optional[Union[np.ndarray, sparse.csr_matrix]]) -> bool:
+    """
+    Check if all pairs of clusters have a similarity or distance of one, i.e., the metric carries no information.
+
+    Args:
+        intra_weights: Dense or sparse matrix of pairwise similarities or distances, None if there is none
+
+    Returns:
+        True if the metric is given and uniform
+    """
+    if intra_weights is None:
+        return False
+    if sparse.issparse(intra_weights):
+        return intra_weights.nnz == np.prod(intra_weights.shape) and np.allclose(intra_weights.data, 1)
+    return np.allclose(intra_weights, np.ones_like(intra_weights))
+
+
+def cluster_pairs(
+        intra_weights: Optional[Union[np.ndarray, sparse.csr_matrix]], num_clusters: int
+) -> Dict[Tuple[int, int], float]:
+    """
+    Collect the pairs of clusters that contribute to the leakage. For dense matrices, these are all pairs, for sparse
+    matrices only the stored non-zero entries are considered as all other pairs cannot leak information.
+
+    Args:
+        intra_weights: Dense or sparse matrix of pairwise similarities or distances
+        num_clusters: Number of clusters
+
+    Returns:
+        Mapping from pairs of cluster indices (c1, c2) with c2 < c1 to their similarity or distance
+    """
+    if sparse.issparse(intra_weights):
+        lower = sparse.tril(intra_weights, k=-1, format="coo")
+        return {(int(c1), int(c2)): float(w) for c1, c2, w in zip(lower.row, lower.col, lower.data) if w != 0}
+    if intra_weights is None:
+        return {(c1, c2): 0 for c1 in range(num_clusters) for c2 in range(c1)}
+    return {(c1, c2): intra_weights[c1, c2] for c1 in range(num_clusters) for c2 in range(c1)}
+
+
 def cluster_y_constraints(
         uniform: bool,
-        clusters: List[str],
-        y: List[List[Variable]],
+        y: Dict[Tuple[int, int], Variable],
         x: Variable,
         splits: List[float],
 ) -> List[Constraint]:
@@ -302,8 +339,7 @@ def cluster_y_constraints(
 
     Args:
         uniform: Boolean flag if the cluster metric is uniform
-        clusters: List of cluster names
-        y: List of helper variables
+        y: Helper variables for the pairs of clusters, see cluster_pairs
         x: Optimization variables
         splits: List of splits
 
@@ -312,8 +348,8 @@ def cluster_y_constraints(
     """
     if uniform:
         return []
-    return [y[c1][c2] >= cvxpy.max(cvxpy.vstack([x[s, c1] - x[s, c2] for s in range(len(splits))]))
-            for c1 in range(len(clusters)) for c2 in range(c1)]
+    return [y[c1, c2] >= cvxpy.max(cvxpy.vstack([x[s, c1] - x[s, c2] for s in range(len(splits))]))
+            for c1, c2 in y]
 
 
 def collect_results_2d(
@@ -368,28 +404,25 @@ def collect_results_2d(
 
 def leakage_loss(
         uniform: bool,
-        intra_weights,
-        y,
-        clusters,
-        similarities
+        pair_weights: Dict[Tuple[int, int], float],
+        y: Dict[Tuple[int, int], Variable],
+        similarities,
 ):
     """
-    Compute the leakage loss for the cluster-based double-cold splitting.
+    Compute the leakage loss for the cluster-based splitting.
 
     Args:
         uniform: Boolean flag if the cluster metric is uniform
-        intra_weights: Weights of the intra-cluster edges
-        y: Helper variables
-        clusters: List of cluster names
+        pair_weights: Weights of the intra-cluster edges, see cluster_pairs
+        y: Helper variables for the pairs of clusters
         similarities: Pairwise similarity matrix of clusters in the order of their names
 
     Returns:
         Loss describing the leakage between clusters
     """
-    if uniform:
+    if uniform or len(y) == 0:
         return 0
-    else:
-        tmp = [intra_weights[c1, c2] * y[c1][c2] for c1 in range(len(clusters)) for c2 in range(c1)]
-        e_loss = cvxpy.sum(tmp)
-        if similarities is None:
-            return -e_loss
+    e_loss = cvxpy.sum([pair_weights[key] * y[key] for key in y])
+    if similarities is None:
+        return -e_loss
+    return e_loss
@@ -1,7 +1,9 @@
 import pytest
 
+from datasail.parsers import get_yaml_parser
 from datasail.reader.validate import check_cdhit_arguments, check_foldseek_arguments, check_mmseqs_arguments, \
-    check_mash_dist_arguments, check_mash_sketch_arguments, check_mash_arguments
+    check_mash_dist_arguments, check_mash_sketch_arguments, check_mash_arguments, check_ecfp_arguments
+from datasail.settings import CDHIT, MMSEQS2
 
 
 @pytest.mark.parametrize("args", [
@@ -128,7 +130,28 @@ def test_mash_dist_parser_valid(args):
     assert check_mash_dist_arguments(args) is not None
 
 
+@pytest.mark.parametrize("args", ["", "--threshold 0.0", "--threshold 1.0", "--neighbors 0", "--threshold 0.5 --neighbors 10"])
+def test_ecfp_parser_valid(args):
+    assert check_ecfp_arguments(args) is not None
+
+
+@pytest.mark.parametrize("args", ["--threshold -0.1", "--threshold 1.1", "--neighbors -1"])
+def test_ecfp_parser_invalid(args):
+    with pytest.raises(ValueError):
+        check_ecfp_arguments(args)
+
+
 def test_check_booleans():
     args = check_foldseek_arguments()
     assert args.diag_score  # Example for default positive value
     assert not args.exhaustive_search  # Example for default negative value
+
+
+def test_cached_yaml_parser():
+    assert get_yaml_parser(CDHIT) is get_yaml_parser(CDHIT)
+    assert get_yaml_parser(CDHIT) is not get_yaml_parser(MMSEQS2)
+
+    args = check_cdhit_arguments("-c 0.9 -n 5 -G 0")
+    assert get_yaml_parser(CDHIT).get_user_arguments(args, ["c", "n"]) == "-G 0"
+    assert get_yaml_parser(CDHIT).get_user_arguments(check_cdhit_arguments(""), []) == ""
+    assert get_yaml_parser(CDHIT).get_user_arguments(args, ["c", "n"]) == "-G 0"
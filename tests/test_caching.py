@@ -23,7 +23,10 @@ def test_caching(size):
 
     store_to_cache(dataset, **{"cache": True, "cache_dir": "./test_cache/"})
 
-    assert load_from_cache(dataset, **{"cache": True, "cache_dir": "./test_cache/"}) is not None
+    cached = load_from_cache(dataset, **{"cache": True, "cache_dir": "./test_cache/"})
+    assert cached is not None
+    assert cached.data is dataset.data
+    assert cached.cluster_map == dataset.cluster_map
 
 
 @pytest.mark.parametrize("size", ["perf_7_3", "perf_70_30"])
@@ -1,21 +1,30 @@
+import copy
+import os
 import platform
 
 import numpy as np
 import pytest
+from rdkit import rdBase
+from scipy import sparse
 
 from datasail.cluster.cdhit import run_cdhit
 from datasail.cluster.clustering import stable_additional_clustering, cluster
-from datasail.cluster.ecfp import run_ecfp
+from datasail.cluster.ecfp import run_ecfp, pack_fingerprints, ECFP_BITS
+from datasail.cluster.fingerprint_store import FingerprintStore, FINGERPRINT_STORE_DIR
 from datasail.cluster.foldseek import run_foldseek
+from datasail.cluster.incremental import extend_similarities, similarity_store_path
 from datasail.cluster.mash import run_mash
 from datasail.cluster.mmseqs2 import run_mmseqs
+from datasail.cluster.tanimoto import tanimoto_matrix, tanimoto_graph
 from datasail.cluster.tmalign import run_tmalign
+from datasail.cluster.utils import extract_fasta, FASTA_STORE_DIR
 from datasail.cluster.wlk import run_wlk
 from datasail.reader.read_proteins import parse_fasta, read_folder
-from datasail.reader.utils import DataSet, read_csv
+from datasail.reader.utils import DataSet, read_csv, read_binary_matrix
 from datasail.reader.validate import check_cdhit_arguments, check_foldseek_arguments, check_mmseqs_arguments, \
-    check_mash_arguments
-from datasail.settings import P_TYPE, FORM_FASTA, MMSEQS, CDHIT, KW_LOGDIR, KW_THREADS, FOLDSEEK, TMALIGN
+    check_mash_arguments, check_ecfp_arguments
+from datasail.settings import P_TYPE, FORM_FASTA, MMSEQS, CDHIT, KW_LOGDIR, KW_THREADS, FOLDSEEK, TMALIGN, \
+    UNK_LOCATION
 
 
 @pytest.mark.todo
@@ -151,7 +160,167 @@ def test_cdhit_genome(genome_fasta_data):
 
 
 def test_ecfp_molecule(molecule_data):
+    log_status = rdBase.LogStatus()
     check_clustering(*run_ecfp(molecule_data), dataset=molecule_data)
+    assert rdBase.LogStatus() == log_status
+
+
+def test_ecfp_parallel(molecule_data, monkeypatch):
+    names, mapping, matrix = run_ecfp(copy.deepcopy(molecule_data))
+    monkeypatch.setattr("datasail.reader.molecule_store.MIN_CHUNK_SIZE", 5)
+    par_names, par_mapping, par_matrix = run_ecfp(molecule_data, threads=2)
+    assert par_names == names
+    assert par_mapping == mapping
+    assert np.array_equal(par_matrix, matrix)
+
+
+@pytest.mark.parametrize("args", ["--threshold 0.3", "--neighbors 3", "--threshold 0.2 --neighbors 2"])
+def test_ecfp_sparse(molecule_data, args):
+    _, _, dense = run_ecfp(copy.deepcopy(molecule_data))
+    molecule_data.args = check_ecfp_arguments(args)
+    names, mapping, matrix = run_ecfp(molecule_data)
+    assert sparse.issparse(matrix)
+    check_clustering(names, mapping, matrix.toarray(), molecule_data)
+    assert (matrix != matrix.T).nnz == 0
+    assert np.allclose(matrix.diagonal(), 1)
+
+    # all stored pairs have their exact similarity and reach the threshold
+    rows, cols = matrix.nonzero()
+    assert np.allclose(matrix[rows, cols].A1, dense[rows, cols], atol=1e-6)
+    assert np.all(matrix[rows, cols].A1 >= molecule_data.args.threshold)
+    if molecule_data.args.neighbors == 0:
+        assert matrix.nnz == np.count_nonzero(dense >= molecule_data.args.threshold)
+
+
+def test_tanimoto_neighbors():
+    rng = np.random.default_rng(42)
+    fps = np.packbits(rng.random((100, 256)) < rng.random((100, 1)) * 0.5, axis=1).view(np.uint64)
+    dense = tanimoto_matrix(fps)
+    np.fill_diagonal(dense, 0)
+    kth = -np.sort(-dense, axis=1)[:, 2]
+
+    # the running selection over many small tiles keeps all pairs that are strictly among the three most similar ones
+    graph = tanimoto_graph(fps, neighbors=3, tile_size=8).toarray()
+    np.fill_diagonal(graph, 0)
+    assert np.array_equal(graph[graph > 0], dense[graph > 0])
+    for i in range(len(fps)):
+        assert np.all(graph[i, dense[i] > kth[i]] > 0)
+        assert np.count_nonzero(graph[i] >= kth[i]) >= min(3, np.count_nonzero(dense[i]))
+
+
+def test_fingerprint_store(tmp_path):
+    computed = []
+
+    def compute(keys):
+        computed.append(keys)
+        return np.array([[len(key), i] for i, key in enumerate(keys)], dtype=np.uint64)
+
+    store = FingerprintStore(str(tmp_path), 2)
+    first = store.fingerprints(["a", "bb", ""], compute)
+    assert (store.hits, store.misses) == (0, 3)
+
+    # a second store on the same directory only computes the new keys
+    other = FingerprintStore(str(tmp_path), 2)
+    second = other.fingerprints(["cccc", "bb", "a"], compute)
+    assert (other.hits, other.misses) == (2, 1)
+    assert computed[-1] == ["cccc"]
+    assert np.array_equal(second[1:], first[[1, 0]])
+
+    # incomplete lines of crashed writers are ignored and overwritten
+    with open(other.index_file, "ab") as index:
+        index.write(b"ddd")
+    with open(other.data_file, "ab") as data:
+        data.write(b"\0" * 8)
+    assert FingerprintStore(str(tmp_path), 2).read_index()[0] == {"a": 0, "bb": 1, "": 2, "cccc": 3}
+    third = FingerprintStore(str(tmp_path), 2)
+    assert np.array_equal(third.fingerprints(["ddd", "cccc"], compute), [[3, 0], [4, 0]])
+    assert third.read_index()[0]["ddd"] == 4
+    assert os.path.getsize(third.data_file) == 5 * 2 * 8
+
+
+def test_ecfp_fingerprint_cache(molecule_data, tmp_path):
+    names, mapping, matrix = run_ecfp(copy.deepcopy(molecule_data))
+    for _ in range(2):
+        cached_names, cached_mapping, cached_matrix = run_ecfp(copy.deepcopy(molecule_data), cache_dir=str(tmp_path))
+        assert cached_names == names
+        assert cached_mapping == mapping
+        assert np.array_equal(cached_matrix, matrix)
+    store = FingerprintStore(str(tmp_path / FINGERPRINT_STORE_DIR / f"ecfp_{ECFP_BITS}"), ECFP_BITS // 64)
+    assert len(store.read_index()[0]) == len(names)
+
+
+def test_extend_similarities(tmp_path):
+    keys = [str(i) for i in range(10)]
+    full = np.random.default_rng(42).random((10, 10)).astype(np.float32)
+    full = (full + full.T) / 2
+    requested = []
+
+    def compute_block(new):
+        requested.append([keys[i] for i in new])
+        return full[np.ix_(new, range(6))]
+
+    path = str(tmp_path / "sim.npz")
+    assert np.array_equal(extend_similarities(path, keys[:6], compute_block), full[:6, :6])
+    assert requested[-1] == keys[:6]
+
+    # only the rows of new entities are computed, reordered and dropped entities are handled
+    order = [8, 2, 9, 0, 5, 3, 7]
+    def compute_reordered(new):
+        requested.append([keys[order[i]] for i in new])
+        return full[np.ix_([order[i] for i in new], order)]
+
+    extended = extend_similarities(path, [keys[i] for i in order], compute_reordered)
+    assert np.array_equal(extended, full[np.ix_(order, order)])
+    assert requested[-1] == ["8", "9", "7"]
+    assert read_binary_matrix(path)[0] == [keys[i] for i in order]
+
+    # datasets without a location are not stored as unrelated datasets would share the same path
+    assert similarity_store_path(str(tmp_path), "ecfp", UNK_LOCATION) is None
+    assert similarity_store_path(str(tmp_path), "ecfp", "drugs.tsv") != similarity_store_path(
+        str(tmp_path), "ecfp", "other.tsv")
+
+
+def _subset(dataset, names):
+    subset = copy.deepcopy(dataset)
+    subset.names = list(names)
+    subset.data = dict((name, dataset.data[name]) for name in names)
+    return subset
+
+
+def test_ecfp_incremental(molecule_data, tmp_path):
+    names, mapping, matrix = run_ecfp(copy.deepcopy(molecule_data))
+    run_ecfp(_subset(molecule_data, molecule_data.names[:30]), cache_dir=str(tmp_path))
+    inc_names, inc_mapping, inc_matrix = run_ecfp(copy.deepcopy(molecule_data), cache_dir=str(tmp_path))
+    assert inc_names == names
+    assert inc_mapping == mapping
+    assert np.allclose(inc_matrix, matrix, atol=1e-6)
+
+
+def test_wlk_incremental(molecule_data, tmp_path):
+    names, _, matrix = run_wlk(copy.deepcopy(molecule_data))
+    run_wlk(_subset(molecule_data, molecule_data.names[10:]), cache_dir=str(tmp_path))
+    inc_names, _, inc_matrix = run_wlk(copy.deepcopy(molecule_data), cache_dir=str(tmp_path))
+    assert inc_names == names
+    assert np.allclose(inc_matrix, matrix)
+
+
+def test_tanimoto_matrix(molecule_data):
+    from rdkit import Chem, DataStructs
+    from rdkit.Chem import AllChem
+
+    mols = [Chem.MolFromSmiles(s) for s in molecule_data.data.values()]
+    fps = [AllChem.GetMorganFingerprintAsBitVect(m, 2, nBits=1024) for m in mols if m is not None]
+    expected = np.array([DataStructs.BulkTanimotoSimilarity(fp, fps) for fp in fps])
+
+    # small tiles to cover partial tiles at the borders and tiles off the diagonal
+    sim = tanimoto_matrix(pack_fingerprints(fps), num_threads=2, tile_size=7)
+    assert sim.dtype == np.float32
+    assert np.allclose(sim, expected, atol=1e-6)
+    assert np.array_equal(sim, sim.T)
+
+    quantized = tanimoto_matrix(pack_fingerprints(fps), dtype=np.uint8, tile_size=7)
+    assert quantized.dtype == np.uint8
+    assert np.abs(quantized / 255 - expected).max() <= 0.5 / 255 + 1e-6
 
 
 @pytest.mark.nowin
@@ -195,6 +364,12 @@ def test_wlkernel_molecule(molecule_data):
     check_clustering(*run_wlk(molecule_data), dataset=molecule_data)
 
 
+def test_wlkernel_single_molecule(molecule_data):
+    names, _, matrix = run_wlk(_subset(molecule_data, molecule_data.names[:1]))
+    assert names == molecule_data.names[:1]
+    assert np.allclose(matrix, [[1]])
+
+
 @pytest.mark.parametrize("algo", [CDHIT, MMSEQS])
 def test_force_clustering(algo):
     dataset = cluster(DataSet(
@@ -216,3 +391,22 @@ def check_clustering(names, mapping, matrix, dataset):
     assert np.min(matrix) >= 0
     assert np.max(matrix) <= 1
     assert len(names) <= len(dataset.names)
+
+
+def test_extract_fasta(tmp_path):
+    seqs = parse_fasta("data/pipeline/seqs.fasta")
+    dataset = DataSet(type=P_TYPE, location=UNK_LOCATION, data=dict(seqs))
+    extract_fasta(dataset, str(tmp_path))
+    assert os.path.basename(dataset.location) == "unknown.fasta"
+    assert os.path.dirname(os.path.dirname(dataset.location)) == str(tmp_path / FASTA_STORE_DIR)
+    assert parse_fasta(dataset.location) == seqs
+
+    # the same data is exported only once, plain FASTA inputs are not exported at all
+    mtime = os.stat(dataset.location).st_mtime_ns
+    other = DataSet(type=P_TYPE, location=UNK_LOCATION, data=dict(seqs))
+    extract_fasta(other, str(tmp_path))
+    assert other.location == dataset.location
+    assert os.stat(dataset.location).st_mtime_ns == mtime
+    plain = DataSet(type=P_TYPE, location="data/pipeline/seqs.fasta", data=dict(seqs))
+    extract_fasta(plain, str(tmp_path))
+    assert plain.location == "data/pipeline/seqs.fasta"
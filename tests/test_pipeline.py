@@ -1,5 +1,7 @@
 import os.path
 import shutil
+import subprocess
+import sys
 
 import pytest
 
@@ -291,3 +293,11 @@ def test_issue1():
 def test_issue2():
     test_pipeline(True, False, "data/pipeline/prot_sim.tsv", None, "data/pipeline/drugs.tsv", False, None,
                   "data/pipeline/drug_dist.tsv", True, "C2")
+
+
+def test_lazy_imports():
+    heavy = ["cvxpy", "rdkit", "sklearn", "grakel", "matplotlib", "pip"]
+    code = f"import sys, datasail.sail; print(' '.join(m for m in {heavy} if m in sys.modules))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=root)
+    assert result.stdout.strip() == ""
@@ -1,9 +1,13 @@
+import os
+import shutil
 from typing import Tuple, Optional, List
 
+import numpy as np
 from pytest_cases import lazy_value
 
 from datasail.reader.read import read_data
-from datasail.reader.utils import DataSet
+from datasail.reader.structures import load_structure
+from datasail.reader.utils import DataSet, read_clustering_file
 from datasail.sail import datasail
 from tests.pipeline_package_fixtures import *
 
@@ -188,3 +192,133 @@ def check_assignment_tsv(pairs):
             assert parts[0] != parts[1]
             assert parts[1] not in ["train", "test", "not_selected"]
         assert parts[-1] in ["train", "test", "not selected"]
+
+
+def test_sparse_similarity(tmp_path):
+    names, matrix = read_clustering_file("data/pipeline/drug_sim.tsv")
+    filename = str(tmp_path / "drug_sim.pairs")
+    with open(filename, "w") as out:
+        print("Drug1\tDrug2\tSimilarity", file=out)
+        for i, j in zip(*np.nonzero(np.triu(matrix > 0.5, k=1))):
+            print(names[i], names[j], matrix[i, j], sep="\t", file=out)
+
+    e_name_split_map, _, _ = datasail(
+        techniques=["C1e"],
+        splits=[0.7, 0.3],
+        names=["train", "test"],
+        epsilon=0.25,
+        max_sec=10,
+        e_type="M",
+        e_data="data/pipeline/drugs.tsv",
+        e_sim=filename,
+        solver="SCIP",
+    )
+
+    assert "C1e" in e_name_split_map
+    assert set(e_name_split_map["C1e"][0].values()) == {"train", "test"}
+
+
+def test_sparse_ecfp():
+    e_name_split_map, _, _ = datasail(
+        techniques=["C1e"],
+        splits=[0.7, 0.3],
+        names=["train", "test"],
+        epsilon=0.25,
+        max_sec=10,
+        e_type="M",
+        e_data="data/pipeline/drugs.tsv",
+        e_sim="ecfp",
+        e_args="--threshold 0.3 --neighbors 5",
+        solver="SCIP",
+    )
+
+    assert "C1e" in e_name_split_map
+    assert set(e_name_split_map["C1e"][0].values()) == {"train", "test"}
+
+
+def test_numeric_ids(tmp_path):
+    smiles = ["CCO", "c1ccccc1", "CCO", "CC(=O)O", "c1ccncc1", "CCN"]
+    with open(tmp_path / "drugs.tsv", "w") as out:
+        print("ID\tSMILES", file=out)
+        for i, s in enumerate(smiles, start=1):
+            print(i, s, sep="\t", file=out)
+    with open(tmp_path / "weights.tsv", "w") as out:
+        print("ID\tWeight", file=out)
+        for i in range(1, len(smiles) + 1):
+            print(i, i, sep="\t", file=out)
+    with open(tmp_path / "inter.tsv", "w") as out:
+        print("Drug\tTarget", file=out)
+        for i in range(1, len(smiles) + 1):
+            print(i, 10 + i % 2, sep="\t", file=out)
+
+    for weights, inter in [(str(tmp_path / "weights.tsv"), None), (None, str(tmp_path / "inter.tsv"))]:
+        e_name_split_map, _, _ = datasail(
+            techniques=["I1e"],
+            inter=inter,
+            splits=[0.7, 0.3],
+            names=["train", "test"],
+            epsilon=0.25,
+            max_sec=10,
+            e_type="M",
+            e_data=str(tmp_path / "drugs.tsv"),
+            e_weights=weights,
+            solver="SCIP",
+        )
+
+        assert set(e_name_split_map["I1e"][0].keys()) == {str(i) for i in range(1, len(smiles) + 1)}
+
+
+def test_mmcif_folder(tmp_path):
+    names = sorted(name[:-4] for name in os.listdir("data/pipeline/pdbs") if name.endswith(".pdb"))
+    for i, name in enumerate(names):
+        if i % 2 == 0:
+            shutil.copy(f"data/pipeline/pdbs/{name}.pdb", tmp_path / f"{name}.pdb")
+            continue
+        structure = load_structure(f"data/pipeline/pdbs/{name}.pdb")
+        with open(tmp_path / f"{name}.cif", "w") as out:
+            out.write(f"data_{name}\nloop_\n")
+            out.write("".join(f"_atom_site.{field}\n" for field in [
+                "group_PDB", "label_atom_id", "label_comp_id", "label_asym_id", "auth_seq_id", "Cartn_x", "Cartn_y",
+                "Cartn_z"]))
+            for res_name, num, chain, (x, y, z) in zip(structure.res_names, structure.res_nums, structure.chains,
+                                                       structure.coords):
+                out.write(f"ATOM CA {res_name} {chain} {num} {x} {y} {z}\n")
+            out.write("#\n")
+
+    _, f_name_split_map, _ = datasail(
+        techniques=["I1f"],
+        splits=[0.7, 0.3],
+        names=["train", "test"],
+        epsilon=0.25,
+        max_sec=10,
+        f_type="P",
+        f_data=str(tmp_path),
+        solver="SCIP",
+    )
+
+    assert "I1f" in f_name_split_map
+    assert set(f_name_split_map["I1f"][0].keys()) == set(names)
+
+
+def test_matrix_dtype():
+    for matrix_dtype, expected in [(None, np.float64), ("float32", np.float32)]:
+        e_dataset, _, _ = read_data(
+            inter=None, matrix_dtype=matrix_dtype, e_type="M", e_data="data/pipeline/drugs.tsv", e_weights=None,
+            e_sim="data/pipeline/drug_sim.tsv", e_dist=None, e_max_sim=1, e_max_dist=1, e_args="", f_type=None,
+            f_data=None, f_weights=None, f_sim=None, f_dist=None, f_max_sim=1, f_max_dist=1, f_args="",
+        )
+        assert e_dataset.similarity.dtype == expected
+
+    e_name_split_map, _, _ = datasail(
+        techniques=["C1e"],
+        splits=[0.7, 0.3],
+        names=["train", "test"],
+        epsilon=0.25,
+        max_sec=10,
+        e_type="M",
+        e_data="data/pipeline/drugs.tsv",
+        e_sim="data/pipeline/drug_sim.tsv",
+        matrix_dtype="float32",
+        solver="SCIP",
+    )
+    assert set(e_name_split_map["C1e"][0].values()) == {"train", "test"}
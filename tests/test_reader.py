@@ -0,0 +1,421 @@
+import bz2
+import copy
+import gzip
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+from rdkit import Chem, rdBase
+from scipy import sparse
+
+from datasail.reader.columnar import pyarrow, write_columnar
+from datasail.reader.fasta import FastaIndex, FASTA_INDEX_SUFFIX
+from datasail.reader.file_index import FileIndex
+from datasail.reader.tsv import TsvIndex, TSV_INDEX_SUFFIX, open_tsv, spool_tsv
+from datasail.reader.molecule_store import MoleculeStore, MOLECULE_STORE_DIR
+from datasail.reader.read_genomes import read_genome_data
+from datasail.reader.read_molecules import read_molecule_folder, read_molecule_data, remove_duplicate_values
+from datasail.reader.read_other import read_other_data
+from datasail.reader.read_proteins import read_protein_data, extract_pdb_seqs, check_pdb_pair, seqs_equality, \
+    structure_digest
+from datasail.reader.structures import load_structure, parse_mmcif, STRUCTURE_STORE_DIR
+from datasail.reader.utils import read_columns, read_csv, count_inter, read_clustering_file, read_matrix_input, \
+    InteractionTable, DataSet, file_digests
+
+
+def test_fasta_index(tmp_path):
+    path = os.path.join(tmp_path, "seqs.fasta")
+    shutil.copy("data/pipeline/seqs.fasta", path)
+    with open("data/pipeline/seqs.fasta", "r") as data:
+        expected, name = {}, None
+        for line in data:
+            line = line.strip()
+            if line.startswith(">"):
+                name = line[1:]
+                expected[name] = ""
+            elif len(line) > 0:
+                expected[name] += line
+
+    index = FastaIndex(path)
+    assert os.path.isfile(path + FASTA_INDEX_SUFFIX)
+    assert dict(index.items()) == expected
+    assert dict(FastaIndex(path).items()) == expected  # read from the sidecar index
+    assert dict(copy.deepcopy(index).items()) == expected
+    assert dict(pickle.loads(pickle.dumps(index)).items()) == expected
+
+
+def test_fasta_protein_reading():
+    dataset = read_protein_data("data/pipeline/seqs.fasta")
+    assert isinstance(dataset.data, FastaIndex)
+    assert set(dataset.names) == set(dataset.data.keys())
+    assert set(dataset.id_map.values()) == set(dataset.names)
+
+
+def test_tsv_index(tmp_path):
+    path = os.path.join(tmp_path, "drugs.tsv")
+    with open(path, "w") as out:
+        out.write("ID\tSMILES\tComment\nD1\tCCO\tethanol\r\nD2\tc1ccccc1\n\nD3\tCC\tmore\tcolumns\nD4\tO")
+    expected = {"D1": "CCO", "D2": "c1ccccc1", "D3": "CC", "D4": "O"}
+
+    index = TsvIndex(path)
+    assert os.path.isfile(path + TSV_INDEX_SUFFIX)
+    assert dict(index.items()) == expected
+    assert dict(TsvIndex(path).items()) == expected  # read from the sidecar index
+    assert index.digest("D1") != index.digest("D2")
+    with pytest.raises(TypeError):
+        FileIndex(path)
+
+    # rewriting a payload with one of the same length keeps the offsets but changes the hash
+    old_hash = hash(index)
+    with open(path, "r") as data:
+        content = data.read()
+    with open(path, "w") as out:
+        out.write(content.replace("CCO", "CCN"))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert hash(index) != old_hash
+
+    ids, smiles = read_columns("data/pipeline/drugs.tsv")
+    dataset = read_molecule_data("data/pipeline/drugs.tsv")
+    assert isinstance(dataset.data, TsvIndex)
+    assert all(dataset.data[name] == smile for name, smile in zip(ids, smiles) if name in dataset.data)
+
+    # every reader accepts an index as lazy mapping from IDs to payloads
+    for reader in [read_molecule_data, read_other_data]:
+        lazy = reader(TsvIndex("data/pipeline/drugs.tsv"))
+        assert isinstance(lazy.data, TsvIndex)
+        assert len(lazy.names) > 0
+
+
+def test_read_columns():
+    drugs, targets = read_columns("data/pipeline/inter.tsv")
+    with open("data/pipeline/inter.tsv", "r") as data:
+        expected = [tuple(line.strip().split("\t")[:2]) for line in data.readlines()[1:]]
+    assert list(zip(drugs, targets)) == expected
+    assert list(read_csv("data/pipeline/inter.tsv")) == expected
+
+
+def test_interaction_table():
+    pairs = [("D1", "P1"), ("D1", "P2"), ("D2", "P1"), ("D3", "P3"), ("D2", "P2")]
+    table = InteractionTable.from_pairs(pairs)
+    assert len(table) == 5
+    assert list(table) == pairs
+    assert table.count(0) == {"D1": 2, "D2": 2, "D3": 1}
+    assert table.count(1) == {"P1": 2, "P2": 2, "P3": 1}
+
+    mapped = table.map_names({"D1": "D1", "D2": "D1"}, None)
+    assert list(mapped) == [("D1", "P1"), ("D1", "P2"), ("D1", "P1"), ("D1", "P2")]
+    assert mapped.count(0) == {"D1": 4}
+
+
+def test_weighted_interaction_counting(tmp_path):
+    triples = [("D1", "P1", 0.5), ("D1", "P2", 1.5), ("D2", "P1", 0.0), ("D3", "P2", 2.0)]
+    table = InteractionTable.from_pairs(triples, weighted=True)
+    assert table.count(0) == {"D1": 2.0, "D2": 0.0, "D3": 2.0}
+    assert table.count(1) == {"P1": 0.5, "P2": 3.5}
+    assert table.map_names(None, {"P2": "P2"}).count(0) == {"D1": 1.5, "D3": 2.0}
+    assert dict(count_inter(triples, 0)) == {"D1": 2, "D2": 1, "D3": 1}
+
+    filename = tmp_path / "inter.tsv"
+    with open(filename, "w") as out:
+        print("Drug\tProtein\tAffinity", file=out)
+        for triple in triples:
+            print(*triple, sep="\t", file=out)
+    assert InteractionTable.from_columns(*read_columns(filename, 3)).count(1) == {"P1": 0.5, "P2": 3.5}
+
+
+def test_binary_matrix_input(tmp_path):
+    names, matrix = read_clustering_file("data/pipeline/drug_sim.tsv")
+    assert matrix.shape == (len(names), len(names))
+
+    np.save(tmp_path / "sim.npy", matrix.astype(np.float32))
+    with open(tmp_path / "sim.names", "w") as out:
+        print(*names, sep="\n", file=out)
+    npy_names, npy_matrix = read_clustering_file(str(tmp_path / "sim.npy"))
+    assert isinstance(npy_matrix, np.memmap)
+    assert npy_names == names
+    assert npy_matrix.dtype == np.float32
+    assert np.allclose(npy_matrix, matrix)
+
+    np.savez(tmp_path / "sim.npz", names=np.array(names), matrix=matrix)
+    npz_names, npz_matrix, threshold = read_matrix_input(str(tmp_path / "sim.npz"), 0.5)
+    assert isinstance(npz_matrix, np.memmap)
+    assert npz_names == names
+    assert np.array_equal(npz_matrix, matrix)
+    assert threshold == 0.5
+
+    np.savez_compressed(tmp_path / "compressed.npz", matrix)
+    _, compressed = read_clustering_file(str(tmp_path / "compressed.npz"), dtype=np.float32, default_names=names)
+    assert compressed.dtype == np.float32
+    assert np.allclose(compressed, matrix)
+
+
+def test_pairs_matrix_input(tmp_path):
+    filename = str(tmp_path / "sim.pairs")
+    with open(filename, "w") as out:
+        print("Name1\tName2\tSimilarity", file=out)
+        print("A\tB\t0.5", file=out)
+        print("C\tB\t0.25", file=out)
+    names, matrix = read_clustering_file(filename, default_names=["A", "B", "C", "D"])
+    assert names == ["A", "B", "C", "D"]
+    assert sparse.issparse(matrix)
+    assert matrix.nnz == 4
+    assert np.array_equal(matrix.toarray(), [[0, 0.5, 0, 0], [0.5, 0, 0.25, 0], [0, 0.25, 0, 0], [0, 0, 0, 0]])
+
+
+def test_molecule_folder(tmp_path):
+    smiles = ["CCO", "c1ccccc1", "CC(=O)O", "CCN"]
+    writer = Chem.SDWriter(str(tmp_path / "shard.sdf"))
+    for s in smiles[:3]:
+        writer.write(Chem.MolFromSmiles(s))
+    writer.close()
+    Chem.MolToMolFile(Chem.MolFromSmiles(smiles[3]), str(tmp_path / "single.mol"))
+    with open(tmp_path / "broken.mol", "w") as out:
+        out.write("no molecule\n")
+    with open(tmp_path / "notes.txt", "w") as out:
+        out.write("not a molecule file\n")
+
+    expected = {f"shard.sdf_{i}": Chem.CanonSmiles(s) for i, s in enumerate(smiles[:3])}
+    expected["single.mol"] = Chem.CanonSmiles(smiles[3])
+    assert read_molecule_folder(str(tmp_path), 1) == expected
+    assert read_molecule_folder(str(tmp_path), 2) == expected
+
+    dataset = read_molecule_data(str(tmp_path), num_threads=2)
+    assert set(dataset.names) == set(expected)
+
+
+def test_molecule_store(tmp_path):
+    smiles = ["OCC", "CCO", "c1ccccc1", "not a molecule"]
+    log_status = rdBase.LogStatus()
+    store = MoleculeStore.for_encodings(smiles, str(tmp_path), keep_mols=True)
+    assert rdBase.LogStatus() == log_status
+    assert len(store) == 4
+    assert store.canonical("OCC") == store.canonical("CCO") == "CCO"
+    assert store.inchikey("OCC") == store.inchikey("CCO")
+    assert store.canonical("not a molecule") is None
+    assert Chem.MolToSmiles(store.mol("c1ccccc1")) == "c1ccccc1"
+    assert len(os.listdir(tmp_path / MOLECULE_STORE_DIR)) == 1
+
+    cached = MoleculeStore.for_encodings(reversed(smiles), str(tmp_path))
+    assert cached.keep_mols
+    assert cached.record("OCC") == store.record("OCC")
+
+    dataset = read_molecule_data(dict(zip(["A", "B", "C", "D"], smiles)), cache_dir=str(tmp_path))
+    assert dataset.names == ["A", "C"]
+    assert dataset.id_map == {"A": "A", "B": "A", "C": "C"}
+
+
+def test_molecule_dedup_keys():
+    # L- and D-alanine only differ in their stereo-center
+    smiles = {"A": "C[C@@H](N)C(=O)O", "B": "C[C@H](N)C(=O)O", "C": "N[C@H](C)C(=O)O", "D": "CCO"}
+    for key, names in [("inchikey", ["A", "B", "D"]), ("smiles", ["A", "B", "D"]), ("connectivity", ["A", "D"])]:
+        dataset = read_molecule_data(dict(smiles), dedup_key=key)
+        assert dataset.names == names
+        assert dataset.id_map["C"] == "A"
+
+    store = MoleculeStore(with_inchi=False)
+    store.parse(list(smiles.values()) * 3, num_threads=2, chunk_size=2)
+    assert len(store) == 4
+    assert store.record("CCO")[1] is None
+    assert store.inchikey("CCO") == "LFQSCWFLJHTTHZ-UHFFFAOYSA-N"
+    assert store.key("CCO", "connectivity") == "LFQSCWFLJHTTHZ"
+
+
+def test_remove_duplicate_values():
+    matrix = np.arange(25, dtype=float).reshape(5, 5)
+    dataset = DataSet(
+        names=["E", "D", "C", "B", "A"],
+        data={name: name for name in "ABCDE"},
+        weights={"A": 1, "B": 2, "C": 3, "D": 4, "E": 5},
+        similarity=matrix,
+    )
+    dataset = remove_duplicate_values(dataset, {"A": "x", "B": "y", "C": "x", "D": "y"})
+    assert dataset.id_map == {"A": "A", "B": "B", "C": "A", "D": "B"}
+    assert dataset.names == ["B", "A"]
+    assert dataset.weights == {"A": 4, "B": 6, "E": 5}
+    assert set(dataset.data) == {"A", "B", "E"}
+    assert np.array_equal(dataset.similarity, matrix[np.ix_([3, 4], [3, 4])])
+
+
+def test_structure_formats(tmp_path):
+    pdb_file = "data/pipeline/pdbs/1CYN_A.pdb"
+    structure = load_structure(pdb_file)
+    assert len(structure) == len(structure.coords) == len(extract_pdb_seqs(pdb_file)["A"]) // 3
+    assert (structure.res_names[0], structure.res_nums[0], structure.chains[0]) == ("GLY", 7, "A")
+    assert np.allclose(structure.coords[0], [8.453, -0.578, 48.787])
+
+    with open(pdb_file, "rb") as data, gzip.open(tmp_path / "1CYN_A.pdb.gz", "wb") as out:
+        out.write(data.read())
+    with open(tmp_path / "1CYN_A.cif", "w") as out:
+        out.write("data_1CYN\nloop_\n")
+        out.write("".join(f"_atom_site.{field}\n" for field in [
+            "group_PDB", "label_atom_id", "label_comp_id", "label_asym_id", "auth_seq_id", "Cartn_x", "Cartn_y",
+            "Cartn_z"]))
+        for name, num, chain, (x, y, z) in zip(structure.res_names, structure.res_nums, structure.chains,
+                                               structure.coords):
+            out.write(f"ATOM CA {name} {chain} {num} {x} {y} {z}\n")
+            out.write(f"ATOM CB {name} {chain} {num} {x} {y} {z}\n")
+        out.write("#\n")
+
+    for path in [tmp_path / "1CYN_A.pdb.gz", tmp_path / "1CYN_A.cif"]:
+        other = load_structure(str(path), cache_dir=str(tmp_path))
+        for field in ["res_names", "res_nums", "chains", "coords"]:
+            assert np.array_equal(getattr(structure, field), getattr(other, field))
+    assert len(os.listdir(tmp_path / STRUCTURE_STORE_DIR)) == 2
+
+    cached = load_structure(str(tmp_path / "1CYN_A.cif"), cache_dir=str(tmp_path))
+    assert np.array_equal(cached.coords, structure.coords)
+
+
+def test_mmcif_quoting_and_models():
+    content = "\n".join([
+        "data_TEST", "loop_", "_atom_site.group_PDB", "_atom_site.label_atom_id", "_atom_site.label_comp_id",
+        "_atom_site.note", "_atom_site.auth_asym_id", "_atom_site.auth_seq_id", "_atom_site.Cartn_x",
+        "_atom_site.Cartn_y", "_atom_site.Cartn_z", "_atom_site.pdbx_PDB_model_num",
+        "ATOM CA GLY 'alpha carbon' A 1 1.0 2.0 3.0 1",
+        "ATOM CB GLY \"beta carbon, the 'next' one\" A 1 1.5 2.5 3.5 1",
+        "ATOM CA ALA 'it''s' A 2 4.0 5.0 6.0 1",
+        "ATOM CA GLY 'alpha carbon' A 1 7.0 8.0 9.0 2",
+        "ATOM CA ALA 'alpha carbon' A 2 7.0 8.0 9.0 2",
+        "#",
+    ]).encode()
+    structure = parse_mmcif(content)
+    assert structure.res_names.tolist() == ["GLY", "ALA"]
+    assert structure.res_nums.tolist() == [1, 2]
+    assert np.array_equal(structure.coords, [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+
+
+def test_structure_identity(tmp_path):
+    assert structure_digest(["AB", "C"]) == structure_digest(["C", "AB"]) != structure_digest(["AB", "C", "C"])
+    for equality in [None, seqs_equality]:
+        assert check_pdb_pair(["A", "B", "A"], ["A", "A", "B"], equality)
+        assert not check_pdb_pair(["A", "B"], ["C", "A"], equality)
+        assert not check_pdb_pair(["A", "B"], ["A", "B", "B"], equality)
+    assert check_pdb_pair(["AA", "B"], ["B", "AC"], lambda x, y: float(x[0] == y[0]))
+
+    for name in ["1CYN_A", "1XO7_A"]:
+        shutil.copy(f"data/pipeline/pdbs/{name}.pdb", tmp_path / f"{name}.pdb")
+    with open("data/pipeline/pdbs/1CYN_A.pdb", "r") as data, open(tmp_path / "copy.pdb", "w") as out:
+        for line in data:
+            # same protein, but a different chain ID
+            out.write(line[:21] + "B" + line[22:] if line.startswith("ATOM") else line)
+    dataset = read_protein_data(str(tmp_path))
+    assert len(dataset.names) == 2
+    assert dataset.id_map["1CYN_A"] == dataset.id_map["copy"] != dataset.id_map["1XO7_A"]
+
+    # structures without C-alpha atoms, e.g., only ligands, are never merged
+    for name in ["lig1", "lig2"]:
+        with open(tmp_path / f"{name}.pdb", "w") as out:
+            out.write("HETATM    1  C1  LIG A   1       0.000   0.000   0.000  1.00  0.00           C\nEND\n")
+    dataset = read_protein_data(str(tmp_path))
+    assert len(dataset.names) == 4
+    assert dataset.id_map["lig1"] == "lig1" and dataset.id_map["lig2"] == "lig2"
+
+
+def test_compressed_inputs(tmp_path):
+    with open(tmp_path / "sim.pairs", "w") as out:
+        out.write("Name1\tName2\tSimilarity\nA\tB\t0.5\n")
+    for src, name in [("data/pipeline/seqs.fasta", "seqs.fasta"), ("data/pipeline/drugs.tsv", "drugs.tsv"),
+                      (tmp_path / "sim.pairs", "sim.pairs")]:
+        with open(src, "rb") as data:
+            content = data.read()
+        with gzip.open(tmp_path / f"{name}.gz", "wb") as out:
+            out.write(content)
+        with bz2.open(tmp_path / f"{name}.bz2", "wb") as out:
+            out.write(content)
+
+    plain = read_protein_data("data/pipeline/seqs.fasta")
+    for suffix in [".gz", ".bz2"]:
+        dataset = read_protein_data(str(tmp_path / f"seqs.fasta{suffix}"))
+        assert dict(dataset.data.items()) == dict(plain.data.items())
+        assert not os.path.exists(tmp_path / f"seqs.fasta{suffix}{FASTA_INDEX_SUFFIX}")
+        dataset = read_molecule_data(str(tmp_path / f"drugs.tsv{suffix}"))
+        assert dict(dataset.data.items()) == dict(zip(*read_columns("data/pipeline/drugs.tsv")))
+        names, matrix = read_clustering_file(str(tmp_path / f"sim.pairs{suffix}"), default_names=["A", "B"])
+        assert np.array_equal(matrix.toarray(), [[0, 0.5], [0.5, 0]])
+
+    os.mkdir(tmp_path / "mols")
+    writer = Chem.SDWriter(str(tmp_path / "mols" / "shard.sdf"))
+    for s in ["CCO", "c1ccccc1"]:
+        writer.write(Chem.MolFromSmiles(s))
+    writer.close()
+    Chem.MolToMolFile(Chem.MolFromSmiles("CCN"), str(tmp_path / "mols" / "single.mol"))
+    expected = read_molecule_folder(str(tmp_path / "mols"))
+    for file in os.listdir(tmp_path / "mols"):
+        with open(tmp_path / "mols" / file, "rb") as data, gzip.open(tmp_path / "mols" / f"{file}.gz", "wb") as out:
+            out.write(data.read())
+        os.remove(tmp_path / "mols" / file)
+    assert read_molecule_folder(str(tmp_path / "mols")) == expected
+
+
+def test_compressed_numeric_ids(tmp_path):
+    with open(tmp_path / "numeric.tsv", "w") as out:
+        out.write("ID\tValue\n1\t10\n2\t20\n")
+    with gzip.open(tmp_path / "numeric.tsv.gz", "wt") as out:
+        out.write("ID\tValue\n1\t10\n2\t20\n")
+    plain = open_tsv(str(tmp_path / "numeric.tsv"))
+    assert isinstance(plain, TsvIndex)
+    assert dict(open_tsv(str(tmp_path / "numeric.tsv.gz"))) == dict(plain.items()) == {"1": "10", "2": "20"}
+
+
+def test_columnar_inputs(tmp_path):
+    df = pd.DataFrame({"ID": ["A", "B", "C"], "Value": [0.5, 1.0, 2.0], "Ignored": ["x", "y", "z"]})
+    if pyarrow is None:
+        with pytest.raises(ValueError):
+            write_columnar(df, str(tmp_path / "table.parquet"))
+        with pytest.raises(ValueError):
+            read_columns(str(tmp_path / "table.parquet"))
+        return
+
+    for suffix in [".parquet", ".arrow"]:
+        filename = str(tmp_path / f"table{suffix}")
+        write_columnar(df, filename)
+        names, values = read_columns(filename)
+        assert names.tolist() == ["A", "B", "C"]
+        assert values.tolist() == [0.5, 1.0, 2.0]
+        assert values.dtype == np.float64
+        inter = InteractionTable.from_columns(*read_columns(filename, 3))
+        assert len(inter) == 3
+
+
+def test_genome_folder_dedup(tmp_path):
+    genomes = {"g1": ">chr1\nACGTACGT\n", "g2": ">chr1\nACGTACGA\n", "copy": ">chr1\nACGTACGT\n"}
+    for name, content in genomes.items():
+        with open(tmp_path / f"{name}.fna", "w") as out:
+            out.write(content)
+    with gzip.open(tmp_path / "packed.fna.gz", "wt") as out:
+        out.write(genomes["g2"])
+    os.mkdir(tmp_path / "subfolder.fna")
+
+    paths = {name: str(tmp_path / f"{name}.fna") for name in genomes}
+    digests = file_digests(paths, num_threads=2)
+    assert digests["g1"] == digests["copy"] != digests["g2"]
+
+    dataset = read_genome_data(str(tmp_path), num_threads=2)
+    assert sorted(dataset.id_map) == ["copy", "g1", "g2", "packed"]
+    assert len(dataset.names) == 2
+    assert dataset.id_map["g1"] == dataset.id_map["copy"] != dataset.id_map["g2"] == dataset.id_map["packed"]
+    assert sum(dataset.weights.values()) == 4
+
+
+def test_spooled_generator_input():
+    seqs = dict(read_csv("data/pipeline/drugs.tsv"))
+    spooled = spool_tsv(((k, v) for k, v in seqs.items()), chunk_size=3)
+    assert isinstance(spooled, TsvIndex)
+    assert dict(spooled.items()) == seqs
+    respooled = spool_tsv(((k, v) for k, v in seqs.items()), chunk_size=5)
+    assert respooled.path != spooled.path
+    assert hash(respooled) == hash(spooled)
+    assert hash(spool_tsv(list(seqs.items())[1:])) != hash(spooled)
+
+    with pytest.raises(ValueError):
+        spool_tsv([("A", "B\tC")])
+
+    pairs = [("P1", "MKVLA"), ("P2", "MKVLA"), ("P3", "GGHHW")]
+    dataset = read_protein_data((p for p in pairs))
+    assert isinstance(dataset.data, TsvIndex)
+    assert dataset.id_map["P1"] == dataset.id_map["P2"] != dataset.id_map["P3"]
+    assert read_protein_data(lambda: (p for p in pairs)).id_map == dataset.id_map